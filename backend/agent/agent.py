@@ -1,6 +1,6 @@
 from google.adk.agents import LlmAgent
 from agent.prompt import *
-from agent.tools import get_cars, update_car_by_name,delete_car_by_name,log_update,get_last_updated_car,create_booking,get_customer_with_most_rentals,get_most_rented_model,introduce_booking_model
+from agent.registry import tool_registry
 from constants import AGENT_NAME, AGENT_DESCRIPTION, AGENT_MODEL
 
 root_agent = LlmAgent(
@@ -8,6 +8,6 @@ root_agent = LlmAgent(
     model=AGENT_MODEL,
     description=AGENT_DESCRIPTION, 
     instruction=ROOT_AGENT_PROMPT,
-    tools= [
-    get_cars,update_car_by_name,delete_car_by_name,log_update,get_last_updated_car,create_booking,get_customer_with_most_rentals,get_most_rented_model,introduce_booking_model]
+    # Every async function in agent/tools.py, discovered once by the registry
+    tools=tool_registry.functions
 )
\ No newline at end of file
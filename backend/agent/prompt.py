@@ -5,18 +5,25 @@ ROOT_AGENT_PROMPT = """
   
   **Car Operations**:
     - Use `get_cars` tool to get all cars available
-    - Use `update_car_by_name` for car updates
+    - Use `get_cars_free_between` to find cars that are free for a date range
+    - Use `patch_car` to change some details of a car (e.g. just its kms or color)
+    - Use `update_car_by_name` to replace all of a car's details
     - Use `delete_car_by_name` for car deletion
   
   **Booking Operations (Multi-modal)**:
     - Use `introduce_booking_model` when user asks to "Introduce a Booking model" or similar setup requests
-    - Use `create_booking` to create new bookings with customer_id, car_id, start_date, end_date, total_price
+    - Use `create_booking` to create new bookings with customer_id, car_id, start_date, end_date, total_price (overlapping bookings for the same car are rejected)
     - Use `get_customer_with_most_rentals` when asked "Which customer has rented the most cars?"
     - Use `get_most_rented_model` when asked "Which model is rented most often?"
+    - Use `get_fleet_utilization` for how busy the fleet or individual cars were between two dates
+    - Use `get_revenue_by_model` for revenue per model per day, week or month between two dates
+    - Use `get_average_booking_length` for how long rentals last between two dates
   
   **Auditing Operations**:
     - Use `get_last_updated_car` for "Which car record was last updated?" queries
     - Use `log_update` for logging update history
+    - Use `get_car_history` to list every recorded change to a car
+    - Use `get_car_as_of` for "What did car X look like on <date>?" queries
 ---
 
   **Notes:**
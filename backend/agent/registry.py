@@ -0,0 +1,149 @@
+"""
+Tool registry built once from the async functions in agent/tools.py.
+
+root_agent, the Gemini function declarations and the /tools REST endpoints all read
+from the same table, so a tool's signature and docstring are its only definition.
+Tools marked as writing (agent/tools.py's @_writes) run each call in one unit of work
+on the module's repo, so their reads and writes commit or roll back together.
+"""
+import functools
+import inspect
+import re
+from types import ModuleType
+from typing import Any, Callable, Dict, List, Optional
+from pydantic import ConfigDict, create_model
+from agent import tools
+from services.serialization import to_jsonable
+
+ARG_LINE_RE = re.compile(r"^\s{2,}(\w+)\s*(?:\([^)]*\))?:\s*(.*)$")
+
+
+def parse_docstring(fn: Callable) -> tuple:
+    """Summary text and per-argument descriptions from a Google-style docstring."""
+    doc = inspect.getdoc(fn) or ""
+    summary, _, args_block = doc.partition("\nArgs:\n")
+    descriptions: Dict[str, str] = {}
+    name = None
+    for line in args_block.splitlines():
+        match = ARG_LINE_RE.match(line)
+        if match:
+            name = match.group(1)
+            descriptions[name] = match.group(2).strip()
+        elif name and line.strip():
+            descriptions[name] += " " + line.strip()
+        elif not line.strip():
+            name = None
+    return " ".join(summary.split()) or fn.__name__.replace("_", " "), descriptions
+
+
+def _simplify(schema: dict, defs: dict) -> dict:
+    """Reduce a pydantic JSON schema to the OpenAPI subset function declarations accept."""
+    if "$ref" in schema:
+        schema = {**defs[schema["$ref"].split("/")[-1]], **{k: v for k, v in schema.items() if k != "$ref"}}
+    if "anyOf" in schema:
+        # Optional[X] is anyOf [X, null]; the declaration just leaves it out of `required`
+        variants = [variant for variant in schema["anyOf"] if variant.get("type") != "null"]
+        schema = {**_simplify(variants[0], defs), **{k: v for k, v in schema.items() if k != "anyOf"}}
+    result = {key: schema[key] for key in ("type", "description", "enum") if key in schema}
+    if "properties" in schema:
+        result["properties"] = {name: _simplify(prop, defs) for name, prop in schema["properties"].items()}
+        result["required"] = schema.get("required", [])
+    elif result.get("type") == "object":
+        result["properties"] = {}
+    if "items" in schema:
+        result["items"] = _simplify(schema["items"], defs)
+    return result
+
+
+class Tool:
+    """One async tool function with its argument model and declaration, built once."""
+
+    def __init__(self, fn: Callable, repo=None):
+        self.fn = fn
+        self.name = fn.__name__
+        # Only writing tools pay for a unit of work; it holds the writer until the call returns
+        self.repo = repo if getattr(fn, "writes", False) else None
+        self.description, arg_descriptions = parse_docstring(fn)
+        fields = {}
+        for param in inspect.signature(fn).parameters.values():
+            annotation = Any if param.annotation is inspect.Parameter.empty else param.annotation
+            default = ... if param.default is inspect.Parameter.empty else param.default
+            fields[param.name] = (annotation, default)
+        # Unknown keys from the model are dropped rather than failing the whole call
+        self.arguments: type = create_model(
+            f"{self.name}_arguments", __config__=ConfigDict(extra="ignore"), **fields
+        )
+        schema = self.arguments.model_json_schema()
+        self.parameters = _simplify(schema, schema.get("$defs", {}))
+        for name, prop in self.parameters["properties"].items():
+            if name in arg_descriptions:
+                prop["description"] = arg_descriptions[name]
+
+    def validate(self, arguments: Optional[dict]) -> dict:
+        """Coerce raw arguments to the function's annotations; raises pydantic.ValidationError."""
+        # Iterating the model keeps nested models (e.g. Car) intact instead of dumping them to dicts
+        return dict(self.arguments.model_validate(arguments or {}))
+
+    async def __call__(self, arguments: Optional[dict] = None):
+        return await self.run(**self.validate(arguments))
+
+    async def run(self, **arguments):
+        """Call the function with validated arguments, in a unit of work if the tool writes."""
+        if self.repo is None:
+            return await self.fn(**arguments)
+        async with self.repo.unit_of_work():
+            return await self.fn(**arguments)
+
+    @property
+    def function(self) -> Callable:
+        """The function as handed to root_agent: the same signature and docstring, calling run()."""
+        if self.repo is None:
+            return self.fn
+
+        @functools.wraps(self.fn)
+        async def call(**arguments):
+            return await self.run(**arguments)
+        return call
+
+    def declaration(self) -> dict:
+        return {"name": self.name, "description": self.description, "parameters": self.parameters}
+
+
+class ToolRegistry:
+    """Name -> Tool table in definition order."""
+
+    def __init__(self, functions: List[Callable], repo=None):
+        self.tools: Dict[str, Tool] = {fn.__name__: Tool(fn, repo) for fn in functions}
+
+    @classmethod
+    def from_module(cls, module: ModuleType) -> "ToolRegistry":
+        """Every public coroutine function defined (not just imported) in `module`, writing through its `repo`."""
+        return cls([
+            value for name, value in vars(module).items()
+            if not name.startswith("_")
+            and inspect.iscoroutinefunction(value)
+            and value.__module__ == module.__name__
+        ], getattr(module, "repo", None))
+
+    def get(self, name: str) -> Optional[Tool]:
+        return self.tools.get(name)
+
+    @property
+    def functions(self) -> List[Callable]:
+        return [tool.function for tool in self.tools.values()]
+
+    def function_declarations(self) -> List[dict]:
+        return [tool.declaration() for tool in self.tools.values()]
+
+    async def execute(self, name: str, arguments: Optional[dict] = None) -> dict:
+        """Run a tool for a model function call: {"result": ...} or {"error": ...}, never raises."""
+        tool = self.get(name)
+        if tool is None:
+            return {"error": f"Unknown function: {name}"}
+        try:
+            return {"result": to_jsonable(await tool(arguments))}
+        except Exception as e:
+            return {"error": f"Function execution failed: {str(e)}"}
+
+
+tool_registry = ToolRegistry.from_module(tools)
@@ -1,32 +1,181 @@
 import requests, os, random, json
-from typing import Dict
+from typing import Dict, Optional
 from services.service import Service
 from repos.repo import Repo
-from constants import DB_NAME
-from models.data_models import Car
+from constants import DB_NAME, DEFAULT_PAGE_SIZE
+from models.data_models import Booking, Car, CarFilter, parse_date
 
 repo = Repo(DB_NAME)     
 service = Service(repo) 
 
-async def get_cars() -> dict:
-    return await service.get_all_cars()
+def _writes(fn):
+    """Mark a tool that writes: each call runs in one unit of work on repo (see agent/registry.py)."""
+    fn.writes = True
+    return fn
 
+async def get_cars(
+    company: Optional[str] = None,
+    model: Optional[str] = None,
+    color: Optional[str] = None,
+    available: Optional[bool] = None,
+    year_min: Optional[int] = None,
+    year_max: Optional[int] = None,
+    kms_min: Optional[int] = None,
+    kms_max: Optional[int] = None,
+    sort: str = "id",
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None
+) -> dict:
+    """List cars matching the filters; pass next_cursor back as cursor for the next page
+
+    Args:
+        company: Car company (case-insensitive)
+        model: Car model (case-insensitive)
+        color: Car color (case-insensitive)
+        available: Only cars with this availability
+        year_min: Earliest model year
+        year_max: Latest model year
+        kms_min: Minimum kilometres driven
+        kms_max: Maximum kilometres driven
+        sort: id, year, kms, company or model; prefix '-' for descending
+        limit: Page size
+        cursor: next_cursor from the previous page
+    """
+    filters = CarFilter(
+        company=company,
+        model=model,
+        color=color,
+        available=available,
+        year_min=year_min,
+        year_max=year_max,
+        kms_min=kms_min,
+        kms_max=kms_max
+    )
+    cars, next_cursor = await service.list_cars(filters, sort, limit, cursor)
+    return {"cars": cars, "next_cursor": next_cursor}
+
+async def get_cars_free_between(
+    start_date: str,
+    end_date: str,
+    company: Optional[str] = None,
+    model: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None
+) -> dict:
+    """List cars with no booking overlapping start_date..end_date (inclusive)
+
+    Args:
+        start_date: First day (YYYY-MM-DD)
+        end_date: Last day, inclusive (YYYY-MM-DD)
+        company: Car company (case-insensitive)
+        model: Car model (case-insensitive)
+        limit: Page size
+        cursor: next_cursor from the previous page
+    """
+    filters = CarFilter(company=company, model=model)
+    cars, next_cursor = await service.list_free_cars(
+        parse_date(start_date), parse_date(end_date), filters, limit=limit, cursor=cursor
+    )
+    return {"cars": cars, "next_cursor": next_cursor}
+
+@_writes
 async def update_car_by_name(car_id: str, car: Car) -> dict:
+    """Replace a car's details and record the changed fields in its update history
+
+    Args:
+        car_id: ID of the car to update
+        car: The car's new details
+    """
     return await service.update_car(car_id, car)
     
+@_writes
+async def patch_car(
+    car_id: int,
+    company: Optional[str] = None,
+    model: Optional[str] = None,
+    kms: Optional[int] = None,
+    year: Optional[int] = None,
+    color: Optional[str] = None,
+    available: Optional[bool] = None,
+    expected_version: Optional[int] = None
+) -> dict:
+    """Change only the given details of a car, leaving the rest as they are, and record them in its update history
+
+    Args:
+        car_id: ID of the car to update
+        company: New company
+        model: New model
+        kms: New kilometres driven
+        year: New model year
+        color: New color
+        available: New availability
+        expected_version: row_version from an earlier result; the update is refused if the car changed since
+    """
+    fields = {
+        "company": company,
+        "model": model,
+        "kms": kms,
+        "year": year,
+        "color": color,
+        "available": available,
+    }
+    return await service.patch_car(car_id, {name: value for name, value in fields.items() if value is not None}, expected_version)
+
+@_writes
 async def delete_car_by_name(car_id:str) -> dict:
+    """Delete a car
+
+    Args:
+        car_id: ID of the car to delete
+    """
     return await service.delete_car(car_id)
 
+@_writes
 async def log_update(car_id:str,updated_by:str,changes:dict) -> dict:
+    """Record changes to a car in its update history
+
+    Args:
+        car_id: ID of the car that changed
+        updated_by: Who made the change
+        changes: Field name -> [old value, new value]
+    """
     return await service.log_update_history(car_id,updated_by,changes)
 
 async def get_last_updated_car() -> dict:
     """Get the car record that was last updated"""
     return await service.get_last_updated_car()
 
+async def get_car_history(car_id: int, limit: int = 20, cursor: Optional[str] = None) -> dict:
+    """List the recorded changes to a car, newest first; pass next_cursor back as cursor for older ones
+
+    Args:
+        car_id: Car ID
+        limit: Page size
+        cursor: next_cursor from the previous page
+    """
+    history, next_cursor = await service.get_car_history(car_id, limit, cursor)
+    return {"history": history, "next_cursor": next_cursor}
+
+async def get_car_as_of(car_id: int, at: str) -> dict:
+    """Show what a car's details were at a past date or time
+
+    Args:
+        car_id: Car ID
+        at: ISO date (YYYY-MM-DD, meaning the end of that day) or timestamp, in UTC
+    """
+    return await service.get_car_as_of(car_id, at)
+
+@_writes
 async def create_booking(customer_id: int, car_id: int, start_date: str, end_date: str, total_price: float) -> dict:
-    """Create a new booking"""
-    from models.data_models import Booking
+    """Create a new booking
+
+    Args:
+        customer_id: Customer ID
+        car_id: Car ID to book
+        start_date: Start date (YYYY-MM-DD)
+        end_date: End date (YYYY-MM-DD)
+        total_price: Total booking price
+    """
     booking = Booking(
         customer_id=customer_id,
         car_id=car_id,
@@ -36,25 +185,61 @@ async def create_booking(customer_id: int, car_id: int, start_date: str, end_dat
     )
     return await service.create_booking(booking)
 
-async def get_customer_with_most_rentals() -> dict:
-    """Get the customer who has rented the most cars"""
-    return await service.get_customer_with_most_rentals()
+async def get_customer_with_most_rentals(top: int = 1) -> dict:
+    """Get the customer who has rented the most cars, with a ranking that includes ties
+
+    Args:
+        top: How many places to rank; customers tied with the last place are included
+    """
+    return await service.get_customer_with_most_rentals(top)
+
+async def get_most_rented_model(top: int = 1) -> dict:
+    """Get the car model that is rented most often, with a ranking that includes ties
+
+    Args:
+        top: How many places to rank; models tied with the last place are included
+    """
+    return await service.get_most_rented_model(top)
 
-async def get_most_rented_model() -> dict:
-    """Get the car model that is rented most often"""
-    return await service.get_most_rented_model()
+async def get_fleet_utilization(start_date: str, end_date: str, limit: int = 20) -> dict:
+    """Share of days each car was booked between start_date and end_date, busiest cars first
 
+    Args:
+        start_date: First day (YYYY-MM-DD)
+        end_date: Last day, inclusive (YYYY-MM-DD)
+        limit: Number of cars to list
+    """
+    return await service.get_utilization(parse_date(start_date), parse_date(end_date), limit)
+
+async def get_revenue_by_model(start_date: str, end_date: str, period: str = "month", model: Optional[str] = None) -> dict:
+    """Booking revenue per car model per day, week or month between start_date and end_date
+
+    Args:
+        start_date: First day (YYYY-MM-DD)
+        end_date: Last day, inclusive (YYYY-MM-DD)
+        period: day, week or month
+        model: Only this car model (case-insensitive)
+    """
+    return await service.get_revenue(parse_date(start_date), parse_date(end_date), period, model)
+
+async def get_average_booking_length(start_date: str, end_date: str) -> dict:
+    """Average rental length in days, overall and per model, for bookings starting between start_date and end_date
+
+    Args:
+        start_date: First day (YYYY-MM-DD)
+        end_date: Last day, inclusive (YYYY-MM-DD)
+    """
+    return await service.get_booking_length(parse_date(start_date), parse_date(end_date))
+
+@_writes
 async def introduce_booking_model() -> dict:
     """Introduce and set up the Booking model with sample data"""
     try:
-        # Initialize database with booking table
-        await repo.init_db()
-        
-        # Add sample bookings if none exist
+        # Add sample bookings if none exist; the call's unit of work commits the check and them together
         existing_customer = await service.get_customer_with_most_rentals()
         if "No bookings found" in str(existing_customer):
-            # Get available cars
-            cars = await service.get_all_cars()
+            # Only the first two cars are needed for the samples
+            cars = (await get_cars(limit=2))["cars"]
             if cars:
                 # Create sample bookings
                 sample_bookings = [
@@ -62,9 +247,9 @@ async def introduce_booking_model() -> dict:
                     {"customer_id": 102, "car_id": cars[0].id if len(cars) > 0 else 1, "start_date": "2024-01-10", "end_date": "2024-01-15", "total_price": 250.0},
                     {"customer_id": 101, "car_id": cars[1].id if len(cars) > 1 else 1, "start_date": "2024-01-20", "end_date": "2024-01-25", "total_price": 300.0}
                 ]
-                
-                for booking_data in sample_bookings:
-                    await create_booking(**booking_data)
+            
+                # One batched transaction; samples clashing with existing bookings are skipped
+                await repo.insert_bookings_many([Booking(**data) for data in sample_bookings])
         
         return {
             "message": "Booking model introduced successfully!",
@@ -0,0 +1,94 @@
+"""
+Utilization, revenue per model per month and average booking length over a one-year
+window at 1M bookings: the NumPy snapshot versus the same questions in SQL over the
+TEXT date columns.
+
+Run from the backend directory:
+    python -m benchmarks.bench_analytics --cars 10000 --bookings 1000000
+"""
+import argparse
+import asyncio
+import sqlite3
+import time
+from datetime import date
+from models.data_models import Booking
+from repos.repo import Repo
+from services.analytics import BookingAnalytics
+from constants import TABLE_NAME
+from benchmarks.bench_bookings import seed, EPOCH
+from benchmarks.common import temp_db_path, summarize
+
+START, END = EPOCH, date(EPOCH.year, 12, 31)
+
+SQL_QUERIES = {
+    "utilization per car": f"""
+        SELECT c.id, SUM(MAX(0, julianday(MIN(b.end_date, :end)) - julianday(MAX(b.start_date, :start)) + 1))
+        FROM {TABLE_NAME} c LEFT JOIN bookings b ON b.car_id = c.id
+            AND b.start_date <= :end AND b.end_date >= :start
+        GROUP BY c.id
+    """,
+    "revenue per model per month": f"""
+        SELECT strftime('%Y-%m', b.start_date) AS month, c.model, SUM(b.total_price), COUNT(*)
+        FROM bookings b JOIN {TABLE_NAME} c ON c.id = b.car_id
+        WHERE b.start_date BETWEEN :start AND :end
+        GROUP BY month, c.model
+    """,
+    "average booking length": """
+        SELECT AVG(julianday(end_date) - julianday(start_date) + 1), COUNT(*)
+        FROM bookings WHERE start_date BETWEEN :start AND :end
+    """,
+}
+
+
+async def main(args):
+    db_path = temp_db_path()
+    repo = Repo(db_path)
+    await repo.open()
+    started = time.perf_counter()
+    seed(db_path, args.cars, args.bookings)
+    print(f"seeded {args.bookings} bookings in {time.perf_counter() - started:.1f}s")
+
+    db = sqlite3.connect(db_path)
+    params = {"start": START.isoformat(), "end": END.isoformat()}
+    for label, query in SQL_QUERIES.items():
+        latencies = []
+        for _ in range(args.sql_repeat):
+            began = time.perf_counter()
+            db.execute(query, params).fetchall()
+            latencies.append(time.perf_counter() - began)
+        summarize(f"{label}, SQL", latencies, sum(latencies))
+    db.close()
+
+    analytics = BookingAnalytics(repo)
+    started = time.perf_counter()
+    await analytics.current()
+    print(f"snapshot built in {time.perf_counter() - started:.2f}s")
+
+    for label, call in (
+        ("utilization per car", lambda: analytics.utilization(START, END)),
+        ("revenue per model per month", lambda: analytics.revenue(START, END, "month")),
+        ("average booking length", lambda: analytics.booking_length(START, END)),
+    ):
+        latencies = []
+        for _ in range(args.repeat):
+            began = time.perf_counter()
+            await call()
+            latencies.append(time.perf_counter() - began)
+        summarize(f"{label}, NumPy", latencies, sum(latencies))
+
+    # A new booking only appends to the snapshot
+    await repo.insert_booking(Booking(customer_id=1, car_id=1, start_date="2030-01-01",
+                                      end_date="2030-01-02", total_price=10.0))
+    started = time.perf_counter()
+    await analytics.revenue(START, END, "month")
+    print(f"first query after an insert {1000 * (time.perf_counter() - started):.1f} ms  {analytics.stats}")
+    await repo.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cars", type=int, default=10000)
+    parser.add_argument("--bookings", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--sql-repeat", type=int, default=3)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,97 @@
+"""
+Audited car updates: the old get + update + one INSERT per field (three pool checkouts,
+three commits) versus one transaction with executemany, and versus queued audit rows
+group-committed by the background writer.
+
+Run from the backend directory:
+    python -m benchmarks.bench_audit --updates 5000 --concurrency 32
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime
+from models.data_models import Car
+from repos.audit import AuditWriter
+from repos.repo import Repo
+from services.service import Service
+from constants import TABLE_NAME
+from benchmarks.common import temp_db_path, summarize
+
+COLORS = ["Red", "Blue", "Green", "Black", "White"]
+
+
+class LegacyService(Service):
+    """The previous update_car: separate read, update and per-field audit inserts."""
+
+    async def update_car(self, car_id: str, car: Car) -> Car:
+        old_car = await self.repo.get(car_id)
+        car.id = int(car_id)
+        async with self.repo.pool.writer() as db:
+            await db.execute(f"""
+                UPDATE {TABLE_NAME} SET company = ?, model = ?, kms = ?, year = ?, color = ?, available = ?
+                WHERE id = ?
+            """, (car.company, car.model, car.kms, car.year, car.color, car.available, car.id))
+            await db.commit()
+        changes = {}
+        for field in ("company", "model", "kms", "year", "color", "available"):
+            if getattr(old_car, field) != getattr(car, field):
+                changes[field] = (getattr(old_car, field), getattr(car, field))
+        async with self.repo.pool.writer() as db:
+            for field, (old_value, new_value) in changes.items():
+                await db.execute("""
+                    INSERT INTO update_history (car_id, field, old_value, new_value, updated_by, timestamp)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """, (car_id, field, str(old_value), str(new_value), "system", datetime.utcnow().isoformat()))
+            await db.commit()
+        return car
+
+
+async def run(service: Service, label: str, updates: int, concurrency: int, cars: int) -> dict:
+    rng = random.Random(3)
+    latencies = []
+    queue = list(range(updates))
+
+    async def worker():
+        while queue:
+            i = queue.pop()
+            car = Car(company="Honda", model="Civic", kms=rng.randint(0, 10 ** 6), year=2020,
+                      color=rng.choice(COLORS), available=bool(i % 2))
+            started = time.perf_counter()
+            await service.update_car(str(rng.randint(1, cars)), car)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(label, latencies, time.perf_counter() - started)
+
+
+async def main(args):
+    for label, service_class, queued in (
+        ("legacy: 3 transactions", LegacyService, False),
+        ("one transaction, executemany", Service, False),
+        ("queued group-commit audit", Service, True),
+    ):
+        repo = Repo(temp_db_path())
+        await repo.open()
+        repo.audit = AuditWriter(repo.pool) if queued else None
+        await repo.insert_many([
+            Car(company="Honda", model="Civic", kms=0, year=2020, color="Red", available=True)
+            for _ in range(args.cars)
+        ])
+        await run(service_class(repo), label, args.updates, args.concurrency, args.cars)
+        if queued:
+            await repo.audit.flush()
+            print(f"{'':<32} {repo.audit.stats()}")
+        async with repo.pool.reader() as db:
+            async with db.execute("SELECT COUNT(*) FROM update_history") as cursor:
+                print(f"{'':<32} {(await cursor.fetchone())[0]} audit rows")
+        await repo.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--updates", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--cars", type=int, default=1000)
+    asyncio.run(main(parser.parse_args()))
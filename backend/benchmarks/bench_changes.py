@@ -0,0 +1,90 @@
+"""
+Keeping a client's copy of the fleet in sync: re-downloading every car (/cars/export)
+versus applying GET /changes?since=<seq> after a burst of updates, plus the change
+log's size after many updates (compaction keeps one entry per car).
+
+Run from the backend directory:
+    python -m benchmarks.bench_changes --cars 20000 --updates 10 100 1000
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+from benchmarks.common import temp_db_path
+
+os.environ.setdefault("DB_NAME", temp_db_path())
+
+import httpx
+from fastapi import FastAPI
+from models.data_models import Car
+from routers import cars, changes
+
+
+async def full_sync(client: httpx.AsyncClient) -> tuple:
+    started = time.perf_counter()
+    response = await client.get("/cars/export")
+    replica = {car["id"]: car for car in response.json()}
+    return time.perf_counter() - started, len(response.content), replica
+
+
+async def incremental_sync(client: httpx.AsyncClient, replica: dict, since: int) -> tuple:
+    started = time.perf_counter()
+    transferred = 0
+    while True:
+        response = await client.get("/changes", params={"since": since})
+        transferred += len(response.content)
+        page = response.json()
+        for change in page["changes"]:
+            if change["op"] == "delete":
+                replica.pop(change["car_id"], None)
+            else:
+                replica[change["car_id"]] = change["car"]
+        since = page["next"]
+        if not page["changes"] or since >= page["latest"]:
+            return time.perf_counter() - started, transferred, since
+
+
+async def log_size(repo) -> int:
+    async with repo.pool.reader() as db:
+        async with db.execute("SELECT COUNT(*) FROM car_changes") as cursor:
+            return (await cursor.fetchone())[0]
+
+
+async def main(args):
+    rng = random.Random(args.seed)
+    app = FastAPI()
+    app.include_router(cars.router, prefix="/cars")
+    app.include_router(changes.router, prefix="/changes")
+    repo = cars.repo
+    await repo.open()
+    await repo.insert_many([
+        Car(company="Honda", model=f"Civic {i}", kms=17 * i, year=2000 + i % 25, color="Red", available=True)
+        for i in range(args.cars)
+    ])
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=None) as client:
+        _, _, replica = await full_sync(client)
+        since = (await client.get("/changes", params={"limit": 1})).json()["latest"]
+        print(f"{args.cars} cars")
+        for updates in args.updates:
+            for _ in range(updates):
+                car_id = rng.randrange(1, args.cars + 1)
+                car = Car(**{**replica[car_id], "kms": replica[car_id]["kms"] + rng.randrange(1, 500)})
+                await repo.update(car)
+            full_time, full_bytes, current = await full_sync(client)
+            sync_time, sync_bytes, since = await incremental_sync(client, replica, since)
+            assert replica == current, "replica diverged"
+            print(
+                f"after {updates:>5} updates: full export {full_time * 1000:8.1f} ms {full_bytes / 1024:8.1f} KiB"
+                f"   /changes {sync_time * 1000:7.1f} ms {sync_bytes / 1024:7.1f} KiB"
+            )
+        print(f"change log rows: {await log_size(repo)} for {args.cars} cars after {sum(args.updates)} updates")
+    await repo.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cars", type=int, default=20000)
+    parser.add_argument("--updates", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--seed", type=int, default=7)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,63 @@
+"""
+Polling GET /cars/ the way the frontend does: a full download every time, versus
+revalidating with If-None-Match (304 while nothing changed), with and without gzip.
+
+Run from the backend directory:
+    python -m benchmarks.bench_conditional --cars 1000 --requests 500
+"""
+import argparse
+import asyncio
+import os
+import time
+from benchmarks.common import temp_db_path, summarize
+
+os.environ.setdefault("DB_NAME", temp_db_path())
+
+import httpx
+from fastapi import FastAPI
+from models.data_models import Car
+from routers import cars
+
+
+async def poll(client: httpx.AsyncClient, label: str, requests: int, limit: int, conditional: bool, encoding: str) -> dict:
+    latencies = []
+    transferred = 0
+    etag = None
+    started = time.perf_counter()
+    for _ in range(requests):
+        headers = {"accept-encoding": encoding}
+        if conditional and etag:
+            headers["if-none-match"] = etag
+        request_started = time.perf_counter()
+        # Stream so the wire size is measured before httpx decompresses it
+        async with client.stream("GET", "/cars/", params={"limit": limit}, headers=headers) as response:
+            async for chunk in response.aiter_raw():
+                transferred += len(chunk)
+        latencies.append(time.perf_counter() - request_started)
+        etag = response.headers.get("etag", etag)
+    result = summarize(label, latencies, time.perf_counter() - started)
+    print(f"{'':<32} {transferred / requests / 1024:.1f} KiB per poll")
+    return result
+
+
+async def main(args):
+    app = FastAPI()
+    app.include_router(cars.router, prefix="/cars")
+    repo = cars.repo
+    await repo.open()
+    await repo.insert_many([
+        Car(company="Honda", model=f"Civic {i}", kms=17 * i, year=2000 + i % 25, color="Red", available=True)
+        for i in range(args.cars)
+    ])
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=None) as client:
+        await poll(client, "full download", args.requests, args.cars, False, "identity")
+        await poll(client, "full download, gzip", args.requests, args.cars, False, "gzip")
+        await poll(client, "If-None-Match (304)", args.requests, args.cars, True, "gzip")
+    await repo.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cars", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=500)
+    asyncio.run(main(parser.parse_args()))
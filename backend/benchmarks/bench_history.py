@@ -0,0 +1,118 @@
+"""
+update_history reads at 1M audit rows: the last updated car and one page of a car's
+history with the new indexes versus a full scan, and "car as of T" from the nearest
+snapshot versus replaying the car's whole log.
+
+Run from the backend directory:
+    python -m benchmarks.bench_history --cars 1000 --rows 1000000
+"""
+import argparse
+import asyncio
+import json
+import random
+import sqlite3
+import time
+from datetime import datetime, timedelta
+from repos.audit import take_snapshots
+from repos.repo import Repo
+from constants import TABLE_NAME
+from benchmarks.common import temp_db_path, summarize
+
+START = datetime(2024, 1, 1)
+FIELDS = {"kms": lambda rng: rng.randint(0, 200000), "color": lambda rng: rng.choice(["Red", "Blue", "Black"]),
+          "available": lambda rng: rng.choice([True, False])}
+
+
+def seed(db_path: str, cars: int, rows: int):
+    """Cars plus `rows` audit rows spread over them, one per minute, with baseline snapshots."""
+    rng = random.Random(11)
+    db = sqlite3.connect(db_path)
+    db.executemany(
+        f"INSERT INTO {TABLE_NAME} (company, model, kms, year, color, available) VALUES ('Honda', 'Civic', 0, 2020, 'Red', 1)",
+        [()] * cars
+    )
+    db.executemany(
+        "INSERT INTO car_snapshots (car_id, history_id, timestamp, state) VALUES (?, 0, '', ?)",
+        ((car_id, json.dumps({"id": car_id, "company": "Honda", "model": "Civic", "kms": 0, "year": 2020,
+                              "color": "Red", "available": True})) for car_id in range(1, cars + 1))
+    )
+
+    def history():
+        for i in range(rows):
+            field = rng.choice(list(FIELDS))
+            yield (rng.randint(1, cars), field, "?", str(FIELDS[field](rng)), "system",
+                   (START + timedelta(minutes=i)).isoformat())
+
+    db.executemany(
+        "INSERT INTO update_history (car_id, field, old_value, new_value, updated_by, timestamp) VALUES (?, ?, ?, ?, ?, ?)",
+        history()
+    )
+    db.commit()
+    db.close()
+
+
+async def timed_loop(label: str, repeat: int, call) -> dict:
+    latencies = []
+    for _ in range(repeat):
+        began = time.perf_counter()
+        await call()
+        latencies.append(time.perf_counter() - began)
+    return summarize(label, latencies, sum(latencies))
+
+
+async def main(args):
+    db_path = temp_db_path()
+    repo = Repo(db_path)
+    await repo.open()
+    started = time.perf_counter()
+    seed(db_path, args.cars, args.rows)
+    async with repo.pool.writer() as db:
+        for car_id in range(1, args.cars + 1):
+            await take_snapshots(db, car_id)
+        await db.commit()
+    print(f"seeded {args.rows} audit rows and snapshots in {time.perf_counter() - started:.1f}s")
+
+    rng = random.Random(2)
+    end = START + timedelta(minutes=args.rows)
+
+    def random_time() -> str:
+        return (START + (end - START) * rng.random()).isoformat(timespec="microseconds")
+
+    db = sqlite3.connect(db_path)
+    scans = {
+        "last updated, full scan": lambda: db.execute(
+            "SELECT car_id FROM update_history NOT INDEXED ORDER BY timestamp DESC, id DESC LIMIT 1").fetchall(),
+        "car history page, full scan": lambda: db.execute(
+            "SELECT * FROM update_history NOT INDEXED WHERE car_id = ? ORDER BY timestamp DESC, id DESC LIMIT 20",
+            (rng.randint(1, args.cars),)).fetchall(),
+    }
+    for label, query in scans.items():
+        latencies = []
+        for _ in range(args.scan_repeat):
+            began = time.perf_counter()
+            query()
+            latencies.append(time.perf_counter() - began)
+        summarize(label, latencies, sum(latencies))
+
+    await timed_loop("last updated, indexed", args.repeat, repo.get_last_updated_car)
+    await timed_loop("car history page, indexed", args.repeat,
+                     lambda: repo.car_history(rng.randint(1, args.cars), 20))
+    await timed_loop("car as of T, from snapshot", args.repeat,
+                     lambda: repo.car_as_of(rng.randint(1, args.cars), random_time()))
+
+    # Without snapshots the state is rebuilt by undoing every later change
+    db.execute("DELETE FROM car_snapshots")
+    db.commit()
+    await timed_loop("car as of T, full replay", args.repeat,
+                     lambda: repo.car_as_of(rng.randint(1, args.cars), random_time()))
+    db.close()
+    await repo.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cars", type=int, default=1000)
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=500)
+    parser.add_argument("--scan-repeat", type=int, default=5)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,76 @@
+"""
+Stream large NDJSON fleets and booking histories through POST /cars/bulk and
+POST /bookings/bulk.
+
+Run from the backend directory:
+    python -m benchmarks.bench_import --cars 500000 --bookings 500000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from datetime import date, timedelta
+from benchmarks.common import temp_db_path
+
+os.environ.setdefault("DB_NAME", temp_db_path())
+
+import httpx
+from fastapi import FastAPI
+from routers import bookings, cars
+
+
+async def car_lines(count: int, batch: int = 1000):
+    rng = random.Random(3)
+    for offset in range(0, count, batch):
+        yield "".join(
+            json.dumps({"company": rng.choice(["Toyota", "Honda", "BMW"]), "model": f"Model {rng.randint(1, 40)}",
+                        "kms": rng.randint(0, 200000), "year": rng.randint(2005, 2025), "color": "Blue",
+                        "available": True}) + "\n"
+            for _ in range(min(batch, count - offset))
+        ).encode()
+
+
+async def booking_lines(count: int, cars: int, batch: int = 1000):
+    """Sequential, non-overlapping bookings per car, interleaved across the fleet."""
+    rng = random.Random(5)
+    next_free = {}
+    for offset in range(0, count, batch):
+        chunk = []
+        for i in range(offset, min(offset + batch, count)):
+            car_id = i % cars + 1
+            start = next_free.get(car_id, date(2023, 1, 1))
+            end = start + timedelta(days=rng.randint(0, 5))
+            next_free[car_id] = end + timedelta(days=1)
+            chunk.append(json.dumps({"customer_id": rng.randint(1, 20000), "car_id": car_id,
+                                     "start_date": start.isoformat(), "end_date": end.isoformat(),
+                                     "total_price": 75.0}) + "\n")
+        yield "".join(chunk).encode()
+
+
+async def main(args):
+    app = FastAPI()
+    app.include_router(cars.router, prefix="/cars")
+    app.include_router(bookings.router, prefix="/bookings")
+    await cars.repo.open()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for label, path, body, rows in (
+            ("cars", "/cars/bulk", car_lines(args.cars), args.cars),
+            ("bookings", "/bookings/bulk", booking_lines(args.bookings, args.cars), args.bookings),
+        ):
+            started = time.perf_counter()
+            response = await client.post(path, content=body, headers={"content-type": "application/x-ndjson"})
+            elapsed = time.perf_counter() - started
+            summary = response.json()
+            print(f"{label:<10} {rows} rows in {elapsed:.2f}s ({rows / elapsed:,.0f} rows/s)  "
+                  f"inserted={summary['inserted']} failed={summary['failed']}")
+    await cars.repo.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cars", type=int, default=500000)
+    parser.add_argument("--bookings", type=int, default=500000)
+    asyncio.run(main(parser.parse_args()))
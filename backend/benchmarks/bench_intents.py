@@ -0,0 +1,74 @@
+"""
+Classify the labelled chat corpus with the compiled intent router and with the old
+if/elif substring chain, reporting messages/sec and accuracy for each.
+
+Run from the backend directory:
+    python -m benchmarks.bench_intents --rounds 2000
+"""
+import argparse
+import json
+import os
+import time
+from services.intents import classify
+
+CORPUS = os.path.join(os.path.dirname(__file__), "intent_corpus.jsonl")
+
+
+def legacy_classify(user_text: str) -> str:
+    """The keyword chain chat_with_ai used before the intent router."""
+    user_lower = user_text.lower()
+    if any(word in user_lower for word in ["show", "list", "see", "view"]) and "car" in user_lower:
+        return "list_cars"
+    elif any(word in user_lower for word in ["book", "booking", "reserve", "rent"]):
+        if "create" in user_lower or "new" in user_lower or "make" in user_lower:
+            return "start_booking"
+        return "book_car"
+    elif any(word in user_lower for word in ["customer", "top", "most rental", "best customer"]):
+        return "top_customer"
+    elif any(word in user_lower for word in ["popular", "most rented", "best model", "top model"]):
+        return "most_rented_model"
+    elif any(word in user_lower for word in ["hello", "hi", "hey", "help"]):
+        return "greeting"
+    return "unknown"
+
+
+def load_corpus(path: str = CORPUS):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def run(label: str, classifier, corpus, rounds: int) -> dict:
+    correct = sum(classifier(row["text"]) == row["intent"] for row in corpus)
+    texts = [row["text"] for row in corpus]
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for text in texts:
+            classifier(text)
+    elapsed = time.perf_counter() - started
+    result = {
+        "label": label,
+        "messages": rounds * len(texts),
+        "messages_per_s": round(rounds * len(texts) / elapsed, 1),
+        "accuracy": round(correct / len(corpus), 3),
+    }
+    print(f"{label:<24} {result['messages_per_s']:>12} msg/s   accuracy {correct}/{len(corpus)}")
+    return result
+
+
+def main(args):
+    corpus = load_corpus(args.corpus)
+    run("if/elif chain", legacy_classify, corpus, args.rounds)
+    run("compiled router", classify, corpus, args.rounds)
+    if args.show_misses:
+        for row in corpus:
+            legacy, compiled = legacy_classify(row["text"]), classify(row["text"])
+            if legacy != row["intent"] or compiled != row["intent"]:
+                print(f"  {row['text']!r}: expected {row['intent']}, chain {legacy}, router {compiled}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=2000)
+    parser.add_argument("--corpus", default=CORPUS)
+    parser.add_argument("--show-misses", action="store_true")
+    main(parser.parse_args())
@@ -0,0 +1,85 @@
+"""
+Keyset-paginated car listing versus loading the whole fleet.
+
+Seeds N cars, then times fetching pages near the start and near the end of the
+fleet through Service.list_cars. With keyset cursors both should cost the same.
+
+Run from the backend directory:
+    python -m benchmarks.bench_listing --cars 100000
+"""
+import argparse
+import asyncio
+import random
+import sqlite3
+import time
+from models.data_models import CarFilter
+from repos.repo import Repo
+from services.service import Service
+from constants import TABLE_NAME
+from benchmarks.common import temp_db_path, summarize
+
+COMPANIES = ["Toyota", "Honda", "BMW", "Ford", "Hyundai", "Kia", "Tata", "Mahindra"]
+COLORS = ["Red", "Blue", "White", "Black", "Silver", "Grey"]
+
+
+def seed(db_path: str, cars: int):
+    rng = random.Random(42)
+    db = sqlite3.connect(db_path)
+    db.executemany(
+        f"INSERT INTO {TABLE_NAME} (company, model, kms, year, color, available) VALUES (?, ?, ?, ?, ?, ?)",
+        ((rng.choice(COMPANIES), f"Model {rng.randint(1, 40)}", rng.randint(0, 250000),
+          rng.randint(2005, 2025), rng.choice(COLORS), rng.random() < 0.6) for _ in range(cars))
+    )
+    db.commit()
+    db.close()
+
+
+async def cursor_at(service: Service, filters, sort: str, offset: int, page: int) -> str:
+    """Walk the cursor chain once (untimed) to find the cursor `offset` rows in."""
+    cursor = None
+    for _ in range(offset // page):
+        _, cursor = await service.list_cars(filters, sort, page, cursor)
+    return cursor
+
+
+async def time_pages(service: Service, label: str, filters, sort: str, cursor, page: int, repeat: int) -> dict:
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await service.list_cars(filters, sort, page, cursor)
+        latencies.append(time.perf_counter() - started)
+    return summarize(label, latencies, sum(latencies))
+
+
+async def main(args):
+    db_path = temp_db_path()
+    repo = Repo(db_path)
+    # Every timed page repeats the same query; bypass the list cache so SQL is measured
+    repo.cache.lists.max_size = 0
+    await repo.open()
+    seed(db_path, args.cars)
+    service = Service(repo)
+
+    scenarios = [
+        ("all cars", None, "id"),
+        ("available, newest first", CarFilter(available=True), "-year"),
+        ("Toyota by model", CarFilter(company="toyota"), "model"),
+        ("2015-2020 under 50k km", CarFilter(year_min=2015, year_max=2020, kms_max=50000), "year"),
+    ]
+    for name, filters, sort in scenarios:
+        late = await cursor_at(service, filters, sort, args.cars // 4, args.page)
+        await time_pages(service, f"{name}: first page", filters, sort, None, args.page, args.repeat)
+        await time_pages(service, f"{name}: deep page", filters, sort, late, args.page, args.repeat)
+
+    started = time.perf_counter()
+    everything = await repo.list()
+    summarize(f"full list() of {len(everything)}", [time.perf_counter() - started], time.perf_counter() - started)
+    await repo.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cars", type=int, default=100000)
+    parser.add_argument("--page", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=200)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,96 @@
+"""
+GET /cars/ latency while chats that call a slow LLM are in flight: the old blocking
+generate_content call versus the thread-pooled LLM client, using the fake model.
+
+Run from the backend directory:
+    python -m benchmarks.bench_llm --chats 4 --latency 0.2 --duration 5
+"""
+import argparse
+import asyncio
+import os
+import time
+from benchmarks.common import temp_db_path, summarize
+
+os.environ.setdefault("DB_NAME", temp_db_path())
+os.environ["LLM_BACKEND"] = "fake"
+
+import httpx
+from fastapi import FastAPI
+from models.data_models import Car
+from routers import cars, chat_new
+from services.llm import FakeModel, LLMClient
+
+
+class BlockingLLMClient(LLMClient):
+    """The old behaviour: the SDK call runs directly on the event loop."""
+
+    async def generate(self, prompt: str, timeout=None) -> str:
+        return self.model.generate(prompt, timeout)
+
+    async def stream(self, prompt: str, timeout=None):
+        yield self.model.generate(prompt, timeout)
+
+
+async def chat_loop(client: httpx.AsyncClient, stop: asyncio.Event, session: int) -> int:
+    sent = 0
+    while not stop.is_set():
+        await client.post("/run_sse", json={
+            "sessionId": f"bench-{session}",
+            "newMessage": {"role": "user", "parts": [{"text": "tell me something interesting"}]},
+        })
+        sent += 1
+        # In-process transport never touches a socket, so yield like a real client would
+        await asyncio.sleep(0)
+    return sent
+
+
+async def run(client: httpx.AsyncClient, label: str, chats: int, duration: float) -> dict:
+    stop = asyncio.Event()
+    chatters = [asyncio.create_task(chat_loop(client, stop, i)) for i in range(chats)]
+    latencies = []
+    started = time.perf_counter()
+    while time.perf_counter() - started < duration:
+        request_started = time.perf_counter()
+        response = await client.get("/cars/", params={"limit": 20})
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - request_started)
+    elapsed = time.perf_counter() - started
+    stop.set()
+    sent = sum(await asyncio.gather(*chatters))
+    result = summarize(label, latencies, elapsed)
+    print(f"{'':<32} {sent} chat replies while measuring")
+    return result
+
+
+async def main(args):
+    app = FastAPI()
+    app.include_router(cars.router, prefix="/cars")
+    app.include_router(chat_new.router)
+    repo = cars.repo
+    await repo.open()
+    await repo.insert_many([
+        Car(company="Honda", model=f"Civic {i}", kms=100 * i, year=2020, color="Red", available=True)
+        for i in range(args.cars)
+    ])
+    # Measure the handler, not the list cache
+    repo.cache.lists.max_size = 0
+
+    model = FakeModel(latency=args.latency)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=None) as client:
+        await run(client, "no chats", 0, args.duration)
+        chat_new.llm_client = BlockingLLMClient(model)
+        await run(client, "blocking generate_content", args.chats, args.duration)
+        chat_new.llm_client = LLMClient(model, max_concurrency=args.chats)
+        await run(client, "thread-pooled LLM client", args.chats, args.duration)
+        print(chat_new.llm_client.stats())
+        chat_new.llm_client.close()
+    await repo.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chats", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--cars", type=int, default=200)
+    asyncio.run(main(parser.parse_args()))
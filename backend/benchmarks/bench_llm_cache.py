@@ -0,0 +1,84 @@
+"""
+Chat turns that need the LLM, replayed with the reply cache off, exact-only and with
+the similarity tier on, using the fake model. Reports latency and hit rates.
+
+Run from the backend directory:
+    python -m benchmarks.bench_llm_cache --turns 200 --latency 0.2 --similarity 0.85
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+from benchmarks.common import temp_db_path, summarize
+
+os.environ.setdefault("DB_NAME", temp_db_path())
+os.environ["LLM_BACKEND"] = "fake"
+
+import httpx
+from fastapi import FastAPI
+from models.data_models import Car
+from routers import chat_new
+from services.llm import FakeModel, LLMClient
+from services.response_cache import ResponseCache
+
+# Repeated questions in slightly different words, as users actually type them
+MESSAGES = [
+    "what can you do", "What can you do?", "what can you do for me",
+    "how does this work", "How does this work?", "how does this thing work",
+    "i need help", "I need help!", "need help please",
+    "create booking", "Create booking", "create booking please", "create a booking for me",
+    "what are your opening hours", "tell me about insurance", "do you deliver cars",
+]
+
+
+async def run(client: httpx.AsyncClient, label: str, turns: list) -> dict:
+    latencies = []
+    started = time.perf_counter()
+    for i, text in enumerate(turns):
+        request_started = time.perf_counter()
+        response = await client.post("/run_sse", json={
+            "sessionId": f"bench-{i % 20}",
+            "newMessage": {"role": "user", "parts": [{"text": text}]},
+        })
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - request_started)
+    return summarize(label, latencies, time.perf_counter() - started)
+
+
+async def main(args):
+    repo = chat_new.repo
+    await repo.open()
+    await repo.insert_many([
+        Car(company="Honda", model=f"Civic {i}", kms=100 * i, year=2020, color="Red", available=True)
+        for i in range(20)
+    ])
+    random.seed(args.seed)
+    turns = [random.choice(MESSAGES) for _ in range(args.turns)]
+    app = FastAPI()
+    app.include_router(chat_new.router)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=None) as client:
+        for label, cache in (
+            ("no cache", ResponseCache(max_size=0, similarity=0)),
+            ("exact cache", ResponseCache(similarity=0)),
+            (f"exact + similar >= {args.similarity}", ResponseCache(similarity=args.similarity)),
+        ):
+            model = FakeModel(latency=args.latency)
+            chat_new.llm_client = LLMClient(model)
+            chat_new.response_cache = cache
+            await run(client, label, turns)
+            stats = cache.stats()
+            print(f"{'':<32} model calls {model.calls}   exact hits {stats['exact_hits']}   "
+                  f"similar hits {stats['similar_hits']}   hit rate {stats['hit_rate']:.2f}")
+            chat_new.llm_client.close()
+    await repo.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--similarity", type=float, default=0.85)
+    parser.add_argument("--seed", type=int, default=7)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,97 @@
+"""
+A compound chat question ("show available cars and our top customer and most rented
+model") answered one intent after another, as separate turns used to need, versus the
+planned turn that runs the three handlers concurrently; plus each intent on its own.
+--tool-latency adds a delay to every tool call, standing in for slower tools.
+
+Run from the backend directory:
+    python -m benchmarks.bench_multi_intent --turns 50 --tool-latency 0.05
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+from benchmarks.common import temp_db_path, summarize
+
+os.environ.setdefault("DB_NAME", temp_db_path())
+
+from datetime import date, timedelta
+from models.data_models import Booking, Car
+from agent.registry import tool_registry
+from services.intents import plan
+from routers import cars
+from routers.chat_gemini import INTENT_HANDLERS, compound_events
+
+QUESTION = "show available cars and our top customer and most rented model"
+
+
+def add_latency(seconds: float):
+    for tool in tool_registry.tools.values():
+        async def slow(*args, _fn=tool.fn, **kwargs):
+            await asyncio.sleep(seconds)
+            return await _fn(*args, **kwargs)
+        tool.fn = slow
+
+
+async def drain(events) -> str:
+    final = None
+    async for event in events:
+        final = event
+    return final["content"]["parts"][0]["text"]
+
+
+async def sequential(intents):
+    return [await drain(INTENT_HANDLERS[name](QUESTION)) for name in intents]
+
+
+async def concurrent(intents):
+    return await drain(compound_events(intents, QUESTION))
+
+
+async def measure(label: str, turn, turns: int):
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(turns):
+        turn_started = time.perf_counter()
+        await turn()
+        latencies.append(time.perf_counter() - turn_started)
+    summarize(label, latencies, time.perf_counter() - started)
+
+
+async def main(args):
+    repo = cars.repo
+    await repo.open()
+    rng = random.Random(args.seed)
+    await repo.insert_many([
+        Car(company="Honda", model=f"Civic {i % 40}", kms=17 * i, year=2000 + i % 25, color="Red", available=True)
+        for i in range(args.cars)
+    ])
+    bookings = []
+    for _ in range(args.bookings):
+        start = date(2024, 1, 1) + timedelta(days=rng.randrange(3650))
+        bookings.append(Booking(
+            customer_id=rng.randint(1, 500), car_id=rng.randint(1, args.cars),
+            start_date=start.isoformat(), end_date=(start + timedelta(days=2)).isoformat(), total_price=100.0
+        ))
+    await repo.insert_bookings_many(bookings)
+    if args.tool_latency:
+        add_latency(args.tool_latency)
+
+    intents = plan(QUESTION)
+    print(f"{QUESTION!r} -> {intents}")
+    for name in intents:
+        await measure(f"  {name} alone", lambda: drain(INTENT_HANDLERS[name](QUESTION)), args.turns)
+    await measure("one intent after another", lambda: sequential(intents), args.turns)
+    await measure("planned turn, concurrent", lambda: concurrent(intents), args.turns)
+    await repo.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=50)
+    parser.add_argument("--tool-latency", type=float, default=0.05)
+    parser.add_argument("--cars", type=int, default=2000)
+    parser.add_argument("--bookings", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=7)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,105 @@
+"""
+Concurrent edits to the same cars, where each client owns one field (kms, color or
+model) of one car, three ways:
+
+- read-modify-write: GET the car, change the field, PUT the whole car back
+- the same with If-Match, retrying on 412
+- PATCH with only the changed field
+
+Reports edits/s, latency, 412 retries and lost updates (a client's last value that is
+no longer in the car at the end).
+
+Run from the backend directory:
+    python -m benchmarks.bench_patch --cars 20 --duration 3
+"""
+import argparse
+import asyncio
+import os
+import time
+from benchmarks.common import temp_db_path, summarize
+
+os.environ.setdefault("DB_NAME", temp_db_path())
+
+import httpx
+from fastapi import FastAPI
+from models.data_models import Car
+from routers import cars
+
+FIELDS = {"kms": lambda n: n, "color": lambda n: f"color {n}", "model": lambda n: f"model {n}"}
+
+
+async def put_edit(client: httpx.AsyncClient, car_id: int, field: str, value, conditional: bool) -> int:
+    """GET + PUT until it sticks; returns the number of 412 retries"""
+    retries = 0
+    while True:
+        response = await client.get(f"/cars/{car_id}")
+        car = {**response.json(), field: value}
+        headers = {"if-match": response.headers["etag"]} if conditional else {}
+        response = await client.put(f"/cars/{car_id}", json=car, headers=headers)
+        if response.status_code != 412:
+            response.raise_for_status()
+            return retries
+        retries += 1
+
+
+async def patch_edit(client: httpx.AsyncClient, car_id: int, field: str, value, conditional: bool) -> int:
+    response = await client.patch(f"/cars/{car_id}", json={field: value})
+    response.raise_for_status()
+    return 0
+
+
+async def editor(client, edit, conditional, car_id, field, stop, latencies, retries, last):
+    n = 0
+    while not stop.is_set():
+        n += 1
+        value = FIELDS[field](n)
+        started = time.perf_counter()
+        retries.append(await edit(client, car_id, field, value, conditional))
+        latencies.append(time.perf_counter() - started)
+        last[(car_id, field)] = value
+
+
+async def run(client: httpx.AsyncClient, label: str, edit, conditional: bool, args):
+    stop = asyncio.Event()
+    latencies, retries, last = [], [], {}
+    tasks = [
+        asyncio.create_task(editor(client, edit, conditional, car_id, field, stop, latencies, retries, last))
+        for car_id in range(1, args.cars + 1)
+        for field in FIELDS
+    ]
+    started = time.perf_counter()
+    await asyncio.sleep(args.duration)
+    stop.set()
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+
+    lost = 0
+    for car_id in range(1, args.cars + 1):
+        car = (await client.get(f"/cars/{car_id}")).json()
+        lost += sum(car[field] != last[(car_id, field)] for field in FIELDS if (car_id, field) in last)
+    summarize(label, latencies, elapsed)
+    print(f"{'':<32} {sum(retries)} retries on 412, {lost} of {len(last)} last edits lost")
+
+
+async def main(args):
+    app = FastAPI()
+    app.include_router(cars.router, prefix="/cars")
+    repo = cars.repo
+    await repo.open()
+    await repo.insert_many([
+        Car(company="Honda", model=f"Civic {i}", kms=17 * i, year=2000 + i % 25, color="Red", available=True)
+        for i in range(args.cars)
+    ])
+    print(f"{args.cars} cars, {args.cars * len(FIELDS)} clients, one field each")
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=None) as client:
+        await run(client, "GET + PUT", put_edit, False, args)
+        await run(client, "GET + PUT If-Match, retry", put_edit, True, args)
+        await run(client, "PATCH", patch_edit, False, args)
+    await repo.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cars", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=3.0)
+    asyncio.run(main(parser.parse_args()))
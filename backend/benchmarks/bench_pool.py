@@ -0,0 +1,76 @@
+"""
+Compare requests/sec of pooled Repo reads against the old connect-per-call behaviour.
+
+Run from the backend directory:
+    python -m benchmarks.bench_pool --requests 5000 --concurrency 32
+"""
+import argparse
+import asyncio
+import random
+import time
+import aiosqlite
+from models.data_models import Car
+from repos.repo import Repo
+from constants import TABLE_NAME
+from benchmarks.common import temp_db_path, summarize
+
+
+class ConnectPerCallRepo(Repo):
+    """The pre-pool behaviour: every call opens (and closes) its own connection."""
+
+    async def get(self, car_id):
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute(
+                f"SELECT id, company, model, kms, year, color, available FROM {TABLE_NAME} WHERE id = ?",
+                (car_id,),
+            )
+            row = await cursor.fetchone()
+            if row:
+                return Car(id=row[0], company=row[1], model=row[2], kms=row[3],
+                           year=row[4], color=row[5], available=row[6])
+            return None
+
+
+async def seed(repo: Repo, cars: int):
+    await repo.init_db()
+    for i in range(cars):
+        await repo.insert(Car(company="Toyota", model=f"Model {i}", kms=1000 * i,
+                              year=2015 + i % 10, color="Blue", available=True))
+
+
+async def run(repo: Repo, label: str, requests: int, concurrency: int, cars: int) -> dict:
+    latencies = []
+    queue = list(range(requests))
+
+    async def worker():
+        while queue:
+            queue.pop()
+            started = time.perf_counter()
+            await repo.get(random.randint(1, cars))
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(label, latencies, time.perf_counter() - started)
+
+
+async def main(args):
+    db_path = temp_db_path()
+    pooled = Repo(db_path)
+    # Measure the pool itself, not the read-through cache in front of it
+    pooled.cache.cars.max_size = 0
+    await seed(pooled, args.cars)
+
+    legacy = await run(ConnectPerCallRepo(db_path), "connect-per-call", args.requests, args.concurrency, args.cars)
+    pooled_result = await run(pooled, "pooled", args.requests, args.concurrency, args.cars)
+    print(f"speedup: {pooled_result['rps'] / legacy['rps']:.1f}x")
+    print(f"pool stats: {pooled.pool.stats()}")
+    await pooled.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--cars", type=int, default=200)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,100 @@
+"""
+Top customer / most rented model at 1M bookings: the maintained rental counters
+versus the original GROUP BY over bookings (joined to cars for the model).
+
+Also reports the cost the counters add to a booking insert and a full rebuild.
+
+Run from the backend directory:
+    python -m benchmarks.bench_rentals --cars 10000 --bookings 1000000
+"""
+import argparse
+import asyncio
+import random
+import sqlite3
+import time
+from fastapi import HTTPException
+from models.data_models import Booking
+from repos.repo import Repo
+from services.service import Service
+from constants import TABLE_NAME
+from benchmarks.bench_bookings import seed, random_window
+from benchmarks.common import temp_db_path, summarize
+
+LEGACY_QUERIES = {
+    "top customer": """
+        SELECT customer_id, COUNT(*) as rental_count
+        FROM bookings
+        GROUP BY customer_id
+        ORDER BY rental_count DESC
+        LIMIT 1
+    """,
+    "most rented model": f"""
+        SELECT c.model, COUNT(*) as rental_count
+        FROM bookings b
+        JOIN {TABLE_NAME} c ON b.car_id = c.id
+        GROUP BY c.model
+        ORDER BY rental_count DESC
+        LIMIT 1
+    """,
+}
+
+
+async def main(args):
+    db_path = temp_db_path()
+    repo = Repo(db_path)
+    await repo.open()
+    started = time.perf_counter()
+    horizon = seed(db_path, args.cars, args.bookings)
+    print(f"seeded {args.bookings} bookings in {time.perf_counter() - started:.1f}s")
+
+    started = time.perf_counter()
+    counts = await repo.rebuild_rental_counts()
+    print(f"rebuild_rental_counts {time.perf_counter() - started:.2f}s  {counts}")
+
+    db = sqlite3.connect(db_path)
+    for label, query in LEGACY_QUERIES.items():
+        latencies = []
+        for _ in range(args.legacy_repeat):
+            began = time.perf_counter()
+            db.execute(query).fetchall()
+            latencies.append(time.perf_counter() - began)
+        summarize(f"{label}, GROUP BY", latencies, sum(latencies))
+    db.close()
+
+    for label, fn in (("top customer", repo.get_customer_with_most_rentals),
+                      ("most rented model", repo.get_most_rented_model)):
+        for k in (1, 10):
+            latencies = []
+            for _ in range(args.repeat):
+                began = time.perf_counter()
+                await fn(k)
+                latencies.append(time.perf_counter() - began)
+            summarize(f"{label}, counters, top {k}", latencies, sum(latencies))
+    print(f"  top 10 customers with ties: {len((await repo.get_customer_with_most_rentals(10))['ranking'])} rows")
+
+    # Insert cost with the counter upserts folded into the same transaction
+    service = Service(repo)
+    rng = random.Random(1)
+    latencies, conflicts = [], 0
+    for _ in range(args.repeat):
+        start, end = random_window(rng, horizon)
+        booking = Booking(customer_id=rng.randint(1, 50000), car_id=rng.randint(1, args.cars),
+                          start_date=start.isoformat(), end_date=end.isoformat(), total_price=50.0)
+        began = time.perf_counter()
+        try:
+            await service.create_booking(booking)
+        except HTTPException:
+            conflicts += 1
+        latencies.append(time.perf_counter() - began)
+    summarize("create_booking + counters", latencies, sum(latencies))
+    print(f"  {conflicts} of {args.repeat} rejected as overlapping")
+    await repo.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cars", type=int, default=10000)
+    parser.add_argument("--bookings", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=500)
+    parser.add_argument("--legacy-repeat", type=int, default=5)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,84 @@
+"""
+GET /cars/ latency with per-request schema initialization (old Service) versus
+migrations applied once at startup.
+
+Run from the backend directory:
+    python -m benchmarks.bench_schema --requests 2000
+"""
+import argparse
+import asyncio
+import os
+import time
+from benchmarks.common import temp_db_path, summarize
+
+os.environ.setdefault("DB_NAME", temp_db_path())
+
+import httpx
+from fastapi import FastAPI
+from models.data_models import Car
+from services.service import Service
+from routers import cars
+from constants import TABLE_NAME
+
+
+class InitPerCallService(Service):
+    """The old hot path: three CREATE TABLE IF NOT EXISTS and two commits before every read."""
+
+    async def get_all_cars(self):
+        async with self.repo.pool.writer() as db:
+            await db.execute(f"""CREATE TABLE IF NOT EXISTS {TABLE_NAME} (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, company VARCHAR(100), model VARCHAR(100),
+                kms INTEGER, year INTEGER, color VARCHAR(100), available BOOLEAN)""")
+            await db.commit()
+            await db.execute("""CREATE TABLE IF NOT EXISTS update_history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, car_id INTEGER, field TEXT, old_value TEXT,
+                new_value TEXT, updated_by TEXT, timestamp TEXT)""")
+            await db.execute("""CREATE TABLE IF NOT EXISTS bookings (
+                booking_id INTEGER PRIMARY KEY AUTOINCREMENT, customer_id INTEGER, car_id INTEGER,
+                start_date TEXT, end_date TEXT, total_price REAL)""")
+            await db.commit()
+        return await self.repo.list()
+
+
+async def run(client: httpx.AsyncClient, label: str, requests: int, concurrency: int) -> dict:
+    latencies = []
+    remaining = [requests]
+
+    async def worker():
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            started = time.perf_counter()
+            response = await client.get("/cars/")
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(label, latencies, time.perf_counter() - started)
+
+
+async def main(args):
+    app = FastAPI()
+    app.include_router(cars.router, prefix="/cars")
+    repo = cars.repo
+    await repo.open()
+    for i in range(args.cars):
+        await repo.insert(Car(company="Honda", model=f"Civic {i}", kms=100 * i, year=2020,
+                              color="Red", available=True))
+
+    migrated_service = cars.service
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        cars.service = InitPerCallService(repo)
+        before = await run(client, "init_db per request", args.requests, args.concurrency)
+        cars.service = migrated_service
+        after = await run(client, "migrated at startup", args.requests, args.concurrency)
+    print(f"p50 improvement: {before['p50_ms'] / after['p50_ms']:.1f}x")
+    await repo.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--cars", type=int, default=20)
+    asyncio.run(main(parser.parse_args()))
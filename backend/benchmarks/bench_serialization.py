@@ -0,0 +1,86 @@
+"""
+Listing every car as JSON: the old path (validated Car objects through FastAPI's
+response_model and jsonable_encoder) versus FastJSONResponse over model_construct'ed
+rows, and the streaming /cars/export endpoint (JSON array and NDJSON).
+
+Every variant reads the same rows, so the difference is validation and encoding.
+
+Run from the backend directory:
+    python -m benchmarks.bench_serialization --cars 50000 --requests 20
+"""
+import argparse
+import asyncio
+import os
+import time
+from typing import List
+from benchmarks.common import temp_db_path, summarize
+
+os.environ.setdefault("DB_NAME", temp_db_path())
+
+import httpx
+from fastapi import FastAPI
+from models.data_models import Car
+from repos.repo import CAR_FIELDS
+from routers import cars
+from services.serialization import FastJSONResponse, JSON_BACKEND
+
+
+async def all_rows() -> list:
+    rows = []
+    async for batch in cars.repo.iter_car_rows():
+        rows.extend(batch)
+    return rows
+
+
+def bench_app() -> FastAPI:
+    app = FastAPI()
+    app.include_router(cars.router, prefix="/cars")
+
+    @app.get("/legacy", response_model=List[Car])
+    async def legacy():
+        # What list endpoints used to do: build validated models, then validate and encode them again
+        return [Car(**{**dict(zip(CAR_FIELDS, row)), "available": bool(row[6])}) for row in await all_rows()]
+
+    @app.get("/fast")
+    async def fast():
+        return FastJSONResponse([cars.repo._row_to_car(row) for row in await all_rows()])
+
+    return app
+
+
+async def run(client: httpx.AsyncClient, label: str, path: str, requests: int, headers=None) -> dict:
+    latencies = []
+    size = 0
+    started = time.perf_counter()
+    for _ in range(requests):
+        request_started = time.perf_counter()
+        response = await client.get(path, headers=headers)
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - request_started)
+        size = len(response.content)
+    result = summarize(label, latencies, time.perf_counter() - started)
+    print(f"{'':<32} {size / 1e6:.1f} MB per response")
+    return result
+
+
+async def main(args):
+    repo = cars.repo
+    await repo.open()
+    await repo.insert_many([
+        Car(company="Honda", model=f"Civic {i}", kms=17 * i, year=2000 + i % 25, color="Red", available=i % 3 != 0)
+        for i in range(args.cars)
+    ])
+    print(f"{args.cars} cars, JSON backend: {JSON_BACKEND}")
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=bench_app()), base_url="http://bench", timeout=None) as client:
+        await run(client, "response_model + validated Car", "/legacy", args.requests)
+        await run(client, "FastJSONResponse", "/fast", args.requests)
+        await run(client, "streamed JSON array (/export)", "/cars/export", args.requests)
+        await run(client, "streamed NDJSON (/export)", "/cars/export", args.requests, {"accept": "application/x-ndjson"})
+    await repo.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cars", type=int, default=50000)
+    parser.add_argument("--requests", type=int, default=20)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,92 @@
+"""
+Time to first byte and to first reply text on /run_sse: the single JSON body versus
+Server-Sent Events, for an LLM reply (fake model) and for a page of cars.
+
+Run from the backend directory:
+    python -m benchmarks.bench_sse --requests 20 --latency 0.5
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from benchmarks.common import temp_db_path, percentile
+
+os.environ.setdefault("DB_NAME", temp_db_path())
+os.environ["LLM_BACKEND"] = "fake"
+
+import httpx
+import uvicorn
+from fastapi import FastAPI
+from models.data_models import Car
+from routers import cars, chat_gemini, chat_new
+from services.llm import FakeModel, LLMClient
+
+
+async def measure(client: httpx.AsyncClient, text: str, stream: bool) -> tuple:
+    """(first byte, first reply text, complete) in seconds for one chat turn."""
+    headers = {"Accept": "text/event-stream"} if stream else {}
+    body = {"sessionId": "bench", "newMessage": {"role": "user", "parts": [{"text": text}]}}
+    started = time.perf_counter()
+    first_byte = first_text = None
+    async with client.stream("POST", "/run_sse", json=body, headers=headers) as response:
+        async for line in response.aiter_lines():
+            now = time.perf_counter() - started
+            first_byte = first_byte if first_byte is not None else now
+            if first_text is None and '"text"' in line:
+                first_text = now
+    return first_byte, first_text, time.perf_counter() - started
+
+
+async def run(client: httpx.AsyncClient, label: str, text: str, stream: bool, requests: int) -> dict:
+    samples = [await measure(client, text, stream) for _ in range(requests)]
+    result = {"label": label}
+    for i, name in enumerate(("first_byte", "first_text", "complete")):
+        values = [sample[i] for sample in samples]
+        result[f"{name}_p50_ms"] = round(percentile(values, 50) * 1000, 2)
+        result[f"{name}_mean_ms"] = round(statistics.fmean(values) * 1000, 2)
+    print(f"{label:<28} first byte p50 {result['first_byte_p50_ms']:>9} ms   "
+          f"first text p50 {result['first_text_p50_ms']:>9} ms   complete p50 {result['complete_p50_ms']:>9} ms")
+    return result
+
+
+async def serve(app: FastAPI) -> tuple:
+    """Run `app` on a free local port; httpx's ASGI transport buffers whole bodies, so TTFB needs a socket."""
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning", lifespan="off"))
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    return server, task, f"http://127.0.0.1:{port}"
+
+
+async def main(args):
+    repo = cars.repo
+    await repo.open()
+    await repo.insert_many([
+        Car(company="Honda", model=f"Civic {i}", kms=100 * i, year=2020, color="Red", available=True)
+        for i in range(args.cars)
+    ])
+    llm_app = FastAPI()
+    llm_app.include_router(chat_new.router)
+    list_app = FastAPI()
+    list_app.include_router(chat_gemini.router)
+    chat_new.llm_client = LLMClient(FakeModel(latency=args.latency))
+
+    for app, label, text in ((llm_app, "LLM reply", "tell me about your service"), (list_app, "car list", "show me all cars")):
+        server, task, base_url = await serve(app)
+        async with httpx.AsyncClient(base_url=base_url, timeout=None) as client:
+            await run(client, f"{label}, JSON", text, False, args.requests)
+            await run(client, f"{label}, SSE", text, True, args.requests)
+        server.should_exit = True
+        await task
+    chat_new.llm_client.close()
+    await repo.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--cars", type=int, default=1000)
+    asyncio.run(main(parser.parse_args()))
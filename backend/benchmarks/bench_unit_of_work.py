@@ -0,0 +1,78 @@
+"""
+A multi-step tool call (look the car up, book it, log its kms) from concurrent clients:
+every Repo call on its own (a pooled read plus two separately committed writes) versus
+the whole call in one unit of work (one connection, one commit).
+
+Run from the backend directory:
+    python -m benchmarks.bench_unit_of_work --clients 50 --calls 2000
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import date, timedelta
+from models.data_models import Booking, Car
+from repos.repo import Repo
+from benchmarks.common import temp_db_path, summarize
+
+
+async def book_and_log(repo: Repo, rng: random.Random, cars: int) -> bool:
+    car_id = rng.randint(1, cars)
+    car = await repo.get(car_id)
+    start = date(2030, 1, 1) + timedelta(days=rng.randrange(3650))
+    booking_id = await repo.insert_booking(Booking(
+        customer_id=rng.randint(1, 1000), car_id=car_id,
+        start_date=start.isoformat(), end_date=(start + timedelta(days=2)).isoformat(), total_price=100.0
+    ))
+    if booking_id:
+        await repo.patch(car_id, {"kms": car.kms + 100}, updated_by="bench")
+    return booking_id is not None
+
+
+async def unit_of_work(repo: Repo, rng: random.Random, cars: int) -> bool:
+    async with repo.unit_of_work():
+        return await book_and_log(repo, rng, cars)
+
+
+async def run(label: str, call, args):
+    repo = Repo(temp_db_path())
+    await repo.open()
+    await repo.insert_many([
+        Car(company="Honda", model=f"Civic {i}", kms=17 * i, year=2000 + i % 25, color="Red", available=True)
+        for i in range(args.cars)
+    ])
+    rng = random.Random(args.seed)
+    remaining = args.calls
+    latencies = []
+
+    async def client():
+        nonlocal remaining
+        client_rng = random.Random(rng.random())
+        while remaining > 0:
+            remaining -= 1
+            started = time.perf_counter()
+            await call(repo, client_rng, args.cars)
+            latencies.append(time.perf_counter() - started)
+
+    before = repo.pool.stats()["group_commits"]
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(args.clients)))
+    elapsed = time.perf_counter() - started
+    commits = repo.pool.stats()["group_commits"] - before
+    summarize(label, latencies, elapsed)
+    print(f"{'':<32} {commits} commits, {commits / args.calls:.2f} per tool call")
+    await repo.close()
+
+
+async def main(args):
+    await run("one commit per write", book_and_log, args)
+    await run("unit of work", unit_of_work, args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--cars", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=7)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,108 @@
+"""
+Booking throughput with 100 concurrent clients (plus a few readers searching for free
+cars), under three write setups:
+
+- rollback journal, synchronous=FULL, one commit per write (the old defaults)
+- WAL with the tuned pragmas, one commit per write
+- WAL with the pool's group commit (every write queued during a commit shares the next)
+
+Run from the backend directory:
+    python -m benchmarks.bench_writes --clients 100 --duration 5
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import timedelta
+from models.data_models import Booking
+from repos import pool as pool_module
+from repos.pool import ConnectionPool, PRAGMAS
+from repos.repo import Repo
+from benchmarks.bench_bookings import seed, random_window
+from benchmarks.common import temp_db_path, summarize
+from constants import GROUP_COMMIT_MAX_OPS
+
+SETUPS = [
+    ("rollback journal, commit each", {"journal_mode": "DELETE", "synchronous": "FULL"}, 1),
+    ("WAL, commit each", PRAGMAS, 1),
+    ("WAL, group commit", PRAGMAS, GROUP_COMMIT_MAX_OPS),
+]
+
+
+async def booking_client(repo: Repo, rng: random.Random, cars: int, horizon, stop: asyncio.Event, latencies: list, errors: list):
+    while not stop.is_set():
+        start, end = random_window(rng, horizon + timedelta(days=365))
+        booking = Booking(
+            customer_id=rng.randint(1, 50000), car_id=rng.randint(1, cars),
+            start_date=start.isoformat(), end_date=end.isoformat(), total_price=100.0
+        )
+        started = time.perf_counter()
+        try:
+            await repo.insert_booking(booking)
+        except Exception as e:
+            errors.append(e)
+            continue
+        latencies.append(time.perf_counter() - started)
+
+
+async def reader_client(repo: Repo, rng: random.Random, horizon, stop: asyncio.Event, latencies: list, errors: list, pause: float):
+    while not stop.is_set():
+        # Think time, so readers share the event loop with writers instead of saturating it
+        await asyncio.sleep(pause)
+        started = time.perf_counter()
+        try:
+            await repo.list(limit=20, free_between=random_window(rng, horizon))
+        except Exception as e:
+            errors.append(e)
+            continue
+        latencies.append(time.perf_counter() - started)
+
+
+async def run(label: str, pragmas: dict, max_batch: int, args):
+    db_path = temp_db_path()
+    pool = ConnectionPool(db_path, pragmas=pragmas, max_batch=max_batch)
+    pool_module._pools[db_path] = pool
+    repo = Repo(db_path)
+    await repo.open()
+    horizon = seed(db_path, args.cars, args.bookings)
+
+    rng = random.Random(args.seed)
+    stop = asyncio.Event()
+    writes, reads, write_errors, read_errors = [], [], [], []
+    tasks = [
+        asyncio.create_task(booking_client(repo, random.Random(rng.random()), args.cars, horizon, stop, writes, write_errors))
+        for _ in range(args.clients)
+    ] + [
+        asyncio.create_task(reader_client(repo, random.Random(rng.random()), horizon, stop, reads, read_errors, args.read_pause))
+        for _ in range(args.readers)
+    ]
+    started = time.perf_counter()
+    await asyncio.sleep(args.duration)
+    stop.set()
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+
+    print(label)
+    summarize("  bookings", writes, elapsed)
+    summarize("  free-car searches", reads, elapsed)
+    stats = pool.stats()
+    print(f"{'':<32} {stats['group_commits']} commits, {stats['ops_per_group_commit']:.1f} writes per commit, "
+          f"{len(write_errors)} write / {len(read_errors)} read errors")
+    await repo.close()
+
+
+async def main(args):
+    for label, pragmas, max_batch in SETUPS:
+        await run(label, pragmas, max_batch, args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--read-pause", type=float, default=0.01)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--cars", type=int, default=2000)
+    parser.add_argument("--bookings", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=7)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,39 @@
+import os
+import statistics
+import tempfile
+import time
+
+
+def temp_db_path(name: str = "bench.db") -> str:
+    """Fresh SQLite file in a throwaway directory."""
+    return os.path.join(tempfile.mkdtemp(prefix="cars-bench-"), name)
+
+
+def percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(label: str, latencies, elapsed: float) -> dict:
+    """Throughput and latency percentiles (milliseconds) for one benchmark run."""
+    result = {
+        "label": label,
+        "requests": len(latencies),
+        "elapsed_s": round(elapsed, 4),
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3) if latencies else 0.0,
+    }
+    print(f"{label:<32} {result['rps']:>10} req/s   p50 {result['p50_ms']:>8} ms   p99 {result['p99_ms']:>8} ms")
+    return result
+
+
+async def timed(fn, *args, **kwargs):
+    started = time.perf_counter()
+    await fn(*args, **kwargs)
+    return time.perf_counter() - started
@@ -0,0 +1,243 @@
+"""
+Deterministic synthetic fleet for load tests: N cars, M customers, K bookings and the
+cars' update histories. The same arguments and --seed always produce the same rows (the
+printed fingerprint says so), so results from benchmarks.load can be diffed between
+versions of the code.
+
+- cars: makes and models from a weighted catalogue, model years skewed recent, kms
+  growing with age, weighted colours, a few cars out of service
+- customers: activity follows a Zipf curve, so a handful of regulars rent a lot
+- bookings: back to back per car with idle gaps (shorter in summer), starts leaning
+  towards Fridays and Saturdays, mostly 2-5 days, priced at the model's daily rate
+- history: a kms reading after most rentals, the odd repaint, and the out-of-service
+  flag, timestamped through the period; every car ends in its latest state
+
+Derived tables (rental counters, snapshots, change log, row versions, table versions)
+are filled in to match, as if every row had been written through Repo.
+
+Run from the backend directory, to keep the database:
+    python -m benchmarks.datagen --db fleet.db --cars 2000 --customers 5000 --bookings 100000
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import time
+from bisect import bisect
+from collections import Counter
+from datetime import date, datetime, timedelta
+from itertools import accumulate
+from repos.repo import Repo
+from repos.schema import CAR_STATE_JSON, REBUILD_RENTAL_COUNTS
+from constants import TABLE_NAME, HISTORY_SNAPSHOT_EVERY
+
+# company, model, daily rate, share of the fleet
+CATALOGUE = [
+    ("Toyota", "Corolla", 45, 10), ("Toyota", "Camry", 55, 8), ("Toyota", "RAV4", 65, 7),
+    ("Honda", "Civic", 45, 9), ("Honda", "Accord", 55, 6), ("Honda", "CR-V", 65, 6),
+    ("Ford", "Focus", 40, 6), ("Ford", "Explorer", 80, 3), ("Ford", "Mustang", 95, 2),
+    ("Hyundai", "Elantra", 40, 6), ("Kia", "Sportage", 55, 4), ("Nissan", "Altima", 50, 5),
+    ("Mazda", "CX-5", 60, 4), ("Volkswagen", "Golf", 45, 5), ("Tesla", "Model 3", 100, 3),
+    ("BMW", "3 Series", 90, 3), ("BMW", "X5", 120, 2), ("Mercedes", "C-Class", 95, 2),
+]
+COLORS = [("White", 25), ("Black", 20), ("Grey", 15), ("Silver", 15), ("Blue", 10), ("Red", 10), ("Green", 3), ("Yellow", 2)]
+# Rental length in days -> weight
+LENGTHS = {1: 8, 2: 16, 3: 18, 4: 15, 5: 12, 6: 7, 7: 9, 8: 3, 9: 2, 10: 3, 12: 2, 14: 5}
+# Idle time between rentals by month; summer is busy, January quiet
+SEASON = {1: 1.5, 2: 1.3, 3: 1.1, 4: 1.0, 5: 0.9, 6: 0.7, 7: 0.6, 8: 0.6, 9: 0.9, 10: 1.0, 11: 1.2, 12: 0.9}
+OUT_OF_SERVICE = 0.08
+KMS_READING = 0.6
+REPAINT = 0.005
+
+
+class Picker:
+    """Weighted choice with precomputed cumulative weights."""
+
+    def __init__(self, items, weights):
+        self.items = list(items)
+        self.cumulative = list(accumulate(weights))
+
+    def __call__(self, rng: random.Random):
+        return self.items[bisect(self.cumulative, rng.random() * self.cumulative[-1])]
+
+
+def generate_cars(rng: random.Random, count: int, start: date) -> list:
+    models = Picker(CATALOGUE, [entry[3] for entry in CATALOGUE])
+    colors = Picker([name for name, _ in COLORS], [weight for _, weight in COLORS])
+    years = Picker(range(start.year - 11, start.year + 1), [1, 1, 2, 3, 4, 6, 8, 10, 12, 14, 14, 10])
+    cars = []
+    for car_id in range(1, count + 1):
+        company, model, rate, _ = models(rng)
+        year = years(rng)
+        age = max(0.3, start.year - year + rng.random())
+        cars.append({
+            "id": car_id, "company": company, "model": model, "rate": rate, "year": year,
+            "kms": int(age * rng.gauss(15000, 4000)) if age > 0.3 else rng.randint(50, 3000),
+            "color": colors(rng), "available": True,
+            # How often this car is rented compared to the rest of the fleet
+            "demand": rng.uniform(0.4, 1.6) * (1.3 if rate <= 55 else 0.8),
+        })
+    return cars
+
+
+def generate_bookings(rng: random.Random, cars: list, customers: int, count: int, start: date, days: int) -> list:
+    """(customer_id, car_id, start, end, price, start_ord, end_ord) rows, non-overlapping per car."""
+    # Zipf-Mandelbrot: regulars rent far more than most, without one customer taking a big share
+    customer = Picker(range(1, customers + 1), [1 / (rank + 50) for rank in range(1, customers + 1)])
+    lengths = Picker(LENGTHS, LENGTHS.values())
+    per_car = Counter(rng.choices(range(len(cars)), weights=[car["demand"] for car in cars], k=count))
+    end_of_period = start + timedelta(days=days)
+    rows = []
+    for index, car in enumerate(cars):
+        wanted = per_car[index]
+        if not wanted:
+            continue
+        mean_idle = max(0.5, days / wanted - 4.5)
+        day = start + timedelta(days=rng.randrange(7))
+        for _ in range(wanted):
+            day += timedelta(days=int(rng.expovariate(1 / (mean_idle * SEASON[day.month]))))
+            # Weekend getaways: some rentals wait for the next Friday
+            if day.weekday() < 4 and rng.random() < 0.3:
+                day += timedelta(days=4 - day.weekday())
+            length = lengths(rng)
+            end = day + timedelta(days=length - 1)
+            if end >= end_of_period:
+                break
+            price = round(car["rate"] * length * rng.uniform(0.9, 1.15), 2)
+            rows.append((customer(rng), car["id"], day.isoformat(), end.isoformat(), price, day.toordinal(), end.toordinal()))
+            day = end + timedelta(days=1)
+    # booking_id follows time, as it would have in production
+    rows.sort(key=lambda row: (row[5], row[1]))
+    return rows
+
+
+def generate_history(rng: random.Random, cars: list, bookings: list, start: date, days: int) -> list:
+    """(car_id, field, old, new, updated_by, timestamp) audit rows in time order; updates `cars` to their final state."""
+    events = []
+    state = {car["id"]: car for car in cars}
+    for _, car_id, _, end, _, start_ord, end_ord in bookings:
+        car = state[car_id]
+        moment = datetime.fromisoformat(end) + timedelta(hours=17, minutes=rng.randrange(240))
+        if rng.random() < KMS_READING:
+            driven = (end_ord - start_ord + 1) * rng.randint(40, 320)
+            events.append((moment, car_id, "kms", car["kms"], car["kms"] + driven, "fleet-ops"))
+            car["kms"] += driven
+        if rng.random() < REPAINT:
+            color = rng.choice([name for name, _ in COLORS if name != car["color"]])
+            events.append((moment + timedelta(minutes=5), car_id, "color", car["color"], color, "body-shop"))
+            car["color"] = color
+    period_end = datetime.combine(start + timedelta(days=days), datetime.min.time())
+    for car in cars:
+        if rng.random() < OUT_OF_SERVICE:
+            events.append((period_end - timedelta(hours=rng.randrange(1, 24 * 30)), car["id"], "available", True, False, "system"))
+            car["available"] = False
+    events.sort(key=lambda event: (event[0], event[1]))
+    return [
+        (car_id, field, str(old), str(new), updated_by, moment.isoformat())
+        for moment, car_id, field, old, new, updated_by in events
+    ]
+
+
+def car_state(car: dict) -> dict:
+    return {name: car[name] for name in ("id", "company", "model", "kms", "year", "color", "available")}
+
+
+def snapshots(baselines: dict, history: list, every: int = HISTORY_SNAPSHOT_EVERY) -> list:
+    """car_snapshots rows: the baseline, then one every `every` audit rows of a car (as take_snapshots stores them)."""
+    rows = [(car_id, 0, "", json.dumps(state)) for car_id, state in baselines.items()]
+    state = {car_id: dict(value) for car_id, value in baselines.items()}
+    counts = Counter()
+    for history_id, (car_id, field, _, new, _, timestamp) in enumerate(history, 1):
+        # Audit values are text; snapshots replay them the same way car_as_of does
+        state[car_id][field] = new
+        counts[car_id] += 1
+        if counts[car_id] % every == 0:
+            rows.append((car_id, history_id, timestamp, json.dumps(state[car_id])))
+    return rows
+
+
+def fingerprint(*tables) -> str:
+    digest = hashlib.blake2b(digest_size=8)
+    for rows in tables:
+        for row in rows:
+            digest.update(repr(row).encode())
+    return digest.hexdigest()
+
+
+async def populate(
+    repo: Repo,
+    cars: int = 2000,
+    customers: int = 5000,
+    bookings: int = 100000,
+    seed: int = 7,
+    start: date = date(2024, 1, 1),
+    days: int = 730
+) -> dict:
+    """Fill an empty database with the synthetic fleet. Returns the row counts and a fingerprint."""
+    fleet = generate_cars(random.Random(f"{seed}:cars"), cars, start)
+    booking_rows = generate_bookings(random.Random(f"{seed}:bookings"), fleet, customers, bookings, start, days)
+    baselines = {car["id"]: car_state(car) for car in fleet}
+    history = generate_history(random.Random(f"{seed}:history"), fleet, booking_rows, start, days)
+    updates = Counter(row[0] for row in history)
+    car_rows = [
+        (car["id"], car["company"], car["model"], car["kms"], car["year"], car["color"], car["available"], 1 + updates[car["id"]])
+        for car in fleet
+    ]
+    snapshot_rows = snapshots(baselines, history)
+    logged_at = history[-1][5] if history else datetime.combine(start, datetime.min.time()).isoformat()
+
+    await repo.open()
+    async with repo.pool.writer() as db:
+        await db.executemany(
+            f"INSERT INTO {TABLE_NAME} (id, company, model, kms, year, color, available, row_version) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            car_rows
+        )
+        await db.executemany(
+            "INSERT INTO bookings (customer_id, car_id, start_date, end_date, total_price, start_ord, end_ord) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            booking_rows
+        )
+        await db.executemany(
+            "INSERT INTO update_history (id, car_id, field, old_value, new_value, updated_by, timestamp) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            ((history_id, *row) for history_id, row in enumerate(history, 1))
+        )
+        await db.executemany("INSERT INTO car_snapshots (car_id, history_id, timestamp, state) VALUES (?, ?, ?, ?)", snapshot_rows)
+        await db.execute(f"""
+            INSERT INTO car_changes (car_id, state, timestamp)
+            SELECT id, {CAR_STATE_JSON}, ? FROM {TABLE_NAME} ORDER BY id
+        """, (logged_at,))
+        for statement in REBUILD_RENTAL_COUNTS:
+            await db.execute(statement)
+        await db.execute("UPDATE table_versions SET version = version + 1")
+        await db.commit()
+    return {
+        "seed": seed,
+        "cars": len(car_rows),
+        "customers": customers,
+        "bookings": len(booking_rows),
+        "history": len(history),
+        "snapshots": len(snapshot_rows),
+        "period": [start.isoformat(), (start + timedelta(days=days)).isoformat()],
+        "fingerprint": fingerprint(car_rows, booking_rows, history),
+    }
+
+
+async def main(args):
+    repo = Repo(args.db)
+    started = time.perf_counter()
+    summary = await populate(repo, args.cars, args.customers, args.bookings, args.seed, date.fromisoformat(args.start), args.days)
+    await repo.close()
+    print(json.dumps(summary))
+    print(f"wrote {args.db} in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", required=True, help="SQLite file to create; must not hold any cars yet")
+    parser.add_argument("--cars", type=int, default=2000)
+    parser.add_argument("--customers", type=int, default=5000)
+    parser.add_argument("--bookings", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--start", default="2024-01-01", help="First day of the booking period")
+    parser.add_argument("--days", type=int, default=730, help="Length of the booking period")
+    asyncio.run(main(parser.parse_args()))
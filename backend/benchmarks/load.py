@@ -0,0 +1,213 @@
+"""
+Load test: a seeded mix of REST calls and /run_sse chats, replayed in-process over the
+httpx ASGI transport against a synthetic fleet from benchmarks.datagen, with the fake
+LLM (latency from FAKE_LLM_LATENCY, 0.05 s unless set). Reports throughput and
+p50/p95/p99 latency per endpoint and writes them, with the dataset fingerprint, to a
+JSON file so two versions of the code can be diffed.
+
+The app is main.app, whose /run_sse answers from the intent router and tools; the
+LLM-backed chat router (chat_new) is mounted under /agent so the mix covers both.
+
+Run from the backend directory:
+    python -m benchmarks.load --users 32 --requests 5000 --out load.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import time
+from benchmarks.common import temp_db_path, summarize
+
+os.environ.setdefault("DB_NAME", temp_db_path())
+os.environ.setdefault("FAKE_LLM_LATENCY", "0.05")
+os.environ["LLM_BACKEND"] = "fake"
+
+import httpx
+from datetime import date, timedelta
+import main
+from routers import chat_new
+from benchmarks.datagen import populate, CATALOGUE, COLORS
+from constants import FAKE_LLM_LATENCY
+
+main.app.include_router(chat_new.router, prefix="/agent")
+# main.app ends with the frontend's catch-all static mount, which has to stay last
+static = next(route for route in main.app.router.routes if getattr(route, "name", None) == "static")
+main.app.router.routes.remove(static)
+main.app.router.routes.append(static)
+
+
+class Workload:
+    """Builds the requests of the mix from one virtual user's random stream."""
+
+    def __init__(self, dataset: dict):
+        self.cars = dataset["cars"]
+        self.customers = dataset["customers"]
+        self.start, self.end = (date.fromisoformat(day) for day in dataset["period"])
+
+    def car_id(self, rng: random.Random) -> int:
+        return rng.randint(1, self.cars)
+
+    def window(self, rng: random.Random, future: bool = False) -> tuple:
+        """(start, end) ISO dates within the booking period, or after it for new bookings."""
+        first = self.end if future else self.start
+        start = first + timedelta(days=rng.randrange(365 if future else (self.end - self.start).days))
+        return start.isoformat(), (start + timedelta(days=rng.randint(0, 6))).isoformat()
+
+    def list_cars(self, rng):
+        params = rng.choice([
+            {}, {"company": rng.choice(CATALOGUE)[0]}, {"available": "true"}, {"year_min": rng.randint(2015, 2024)},
+            {"color": rng.choice(COLORS)[0], "sort": "-year"}, {"kms_max": rng.randint(20000, 150000), "sort": "kms"},
+        ])
+        return "GET", "/cars/", {"params": {**params, "limit": 20}}
+
+    def get_car(self, rng):
+        return "GET", f"/cars/{self.car_id(rng)}", {}
+
+    def free_cars(self, rng):
+        start, end = self.window(rng)
+        return "GET", "/cars/available", {"params": {"start": start, "end": end, "limit": 20}}
+
+    def car_history(self, rng):
+        return "GET", f"/cars/{self.car_id(rng)}/history", {"params": {"limit": 20}}
+
+    def patch_car(self, rng):
+        fields = rng.choice([{"kms": rng.randint(1000, 200000)}, {"color": rng.choice(COLORS)[0]}, {"available": rng.random() < 0.9}])
+        return "PATCH", f"/cars/{self.car_id(rng)}", {"json": fields}
+
+    def create_booking(self, rng):
+        start, end = self.window(rng, future=True)
+        return "POST", "/tools/create_booking", {"json": {
+            "customer_id": rng.randint(1, self.customers), "car_id": self.car_id(rng),
+            "start_date": start, "end_date": end, "total_price": round(rng.uniform(50, 900), 2),
+        }}
+
+    def revenue(self, rng):
+        start, _ = self.window(rng)
+        end = (date.fromisoformat(start) + timedelta(days=rng.choice([30, 90, 365]))).isoformat()
+        return "GET", "/analytics/revenue", {"params": {"start": start, "end": end, "period": rng.choice(["week", "month"])}}
+
+    def utilization(self, rng):
+        start, _ = self.window(rng)
+        end = (date.fromisoformat(start) + timedelta(days=rng.choice([7, 30, 90]))).isoformat()
+        return "GET", "/analytics/utilization", {"params": {"start": start, "end": end}}
+
+    def changes(self, rng):
+        return "GET", "/changes", {"params": {"since": rng.randint(0, self.cars), "limit": 100}}
+
+    def chat(self, rng):
+        start, end = self.window(rng, future=True)
+        text = rng.choice([
+            "show me all cars",
+            "who is our top customer?",
+            "what's the most popular car?",
+            "show available cars and our top customer and most rented model",
+            f"Book car {self.car_id(rng)} for customer {rng.randint(1, self.customers)} from {start} to {end} for $350",
+            "I want to make a booking",
+            "hello",
+        ])
+        return "POST", "/run_sse", {"json": self._message(rng, text)}
+
+    def agent_chat(self, rng):
+        company = rng.choice(CATALOGUE)[0]
+        text = rng.choice([f"what do you think of {company}?", "any tips for a road trip?", f"is a {company} good in snow?"])
+        return "POST", "/agent/run_sse", {"json": self._message(rng, text)}
+
+    @staticmethod
+    def _message(rng, text: str) -> dict:
+        return {"sessionId": f"load-{rng.randrange(1000)}", "userId": "load", "newMessage": {"role": "user", "parts": [{"text": text}]}}
+
+
+# (endpoint, weight, Workload method); endpoints are route templates, so ids don't split them
+MIX = [
+    ("GET /cars/", 20, Workload.list_cars),
+    ("GET /cars/{car_id}", 15, Workload.get_car),
+    ("GET /cars/available", 8, Workload.free_cars),
+    ("GET /cars/{car_id}/history", 4, Workload.car_history),
+    ("PATCH /cars/{car_id}", 6, Workload.patch_car),
+    ("POST /tools/create_booking", 5, Workload.create_booking),
+    ("GET /analytics/revenue", 3, Workload.revenue),
+    ("GET /analytics/utilization", 2, Workload.utilization),
+    ("GET /changes", 3, Workload.changes),
+    ("POST /run_sse", 24, Workload.chat),
+    ("POST /agent/run_sse", 10, Workload.agent_chat),
+]
+
+
+async def user(client: httpx.AsyncClient, workload: Workload, rng: random.Random, requests: int, results: dict):
+    endpoints = [endpoint for endpoint, _, _ in MIX]
+    weights = [weight for _, weight, _ in MIX]
+    builders = {endpoint: build for endpoint, _, build in MIX}
+    for _ in range(requests):
+        endpoint = rng.choices(endpoints, weights)[0]
+        method, url, kwargs = builders[endpoint](workload, rng)
+        result = results.setdefault(endpoint, {"latencies": [], "statuses": {}, "errors": 0})
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except Exception:
+            result["errors"] += 1
+            continue
+        result["latencies"].append(time.perf_counter() - started)
+        status = str(response.status_code)
+        result["statuses"][status] = result["statuses"].get(status, 0) + 1
+        if response.status_code >= 500:
+            result["errors"] += 1
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {"commit": commit, "python": platform.python_version(), "sqlite": sqlite3.sqlite_version, "platform": platform.platform()}
+
+
+async def main_async(args):
+    async with main.lifespan(main.app):
+        dataset = await populate(main.repo, args.cars, args.customers, args.bookings, args.seed)
+        print(f"dataset {dataset['fingerprint']}: {dataset['cars']} cars, {dataset['bookings']} bookings, {dataset['history']} audit rows")
+        workload = Workload(dataset)
+        results = {}
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://load", timeout=None) as client:
+            started = time.perf_counter()
+            await asyncio.gather(*(
+                user(client, workload, random.Random(f"{args.seed}:user:{i}"), args.requests // args.users, results)
+                for i in range(args.users)
+            ))
+            elapsed = time.perf_counter() - started
+
+    report = {
+        "config": {
+            "users": args.users, "requests": args.requests // args.users * args.users, "seed": args.seed,
+            "fake_llm_latency": FAKE_LLM_LATENCY, "dataset": dataset,
+        },
+        "environment": environment(),
+        "overall": summarize("overall", [t for result in results.values() for t in result["latencies"]], elapsed),
+        "endpoints": {},
+    }
+    for endpoint, _, _ in MIX:
+        if endpoint in results:
+            result = results[endpoint]
+            summary = summarize(f"  {endpoint}", result["latencies"], elapsed)
+            summary.update(statuses=result["statuses"], errors=result["errors"])
+            report["endpoints"][endpoint] = summary
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    print(f"wrote {args.out}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=32, help="Concurrent virtual users")
+    parser.add_argument("--requests", type=int, default=5000, help="Total requests, split evenly between users")
+    parser.add_argument("--cars", type=int, default=2000)
+    parser.add_argument("--customers", type=int, default=5000)
+    parser.add_argument("--bookings", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", default="load.json")
+    asyncio.run(main_async(parser.parse_args()))
@@ -1,8 +1,102 @@
+import os
+
 # Agent details
 AGENT_NAME = "agent"
 AGENT_DESCRIPTION = "An agent that manages car rental details—adding, listing, updating, and deleting vehicle information"
 AGENT_MODEL = "gemini-1.5-flash"
 
 # DB Details
-DB_NAME = "cars.db"
-TABLE_NAME = "cars"
\ No newline at end of file
+DB_NAME = os.getenv("DB_NAME", "cars.db")
+TABLE_NAME = "cars"
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "4"))
+
+# Pragmas for every pooled connection. WAL lets readers run alongside the writer, and with it
+# synchronous=NORMAL only syncs at checkpoints without risking corruption on a crash
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "16384"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+# Writes queued while a commit is in flight share the next transaction, up to this many
+GROUP_COMMIT_MAX_OPS = int(os.getenv("GROUP_COMMIT_MAX_OPS", "256"))
+
+# Listing
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Bulk import
+BULK_CHUNK_SIZE = 5000
+MAX_IMPORT_ERRORS = 1000
+
+# Read-through cache for car lookups
+CAR_CACHE_SIZE = int(os.getenv("CAR_CACHE_SIZE", "4096"))
+LIST_CACHE_SIZE = int(os.getenv("LIST_CACHE_SIZE", "256"))
+CACHE_TTL = float(os.getenv("CACHE_TTL", "30"))
+# Seconds between cross-worker generation checks; 0 disables them
+CACHE_GENERATION_CHECK = float(os.getenv("CACHE_GENERATION_CHECK", "1"))
+
+# Chat sessions
+MAX_SESSIONS = int(os.getenv("MAX_SESSIONS", "10000"))
+MAX_EVENTS_PER_SESSION = int(os.getenv("MAX_EVENTS_PER_SESSION", "200"))
+SESSION_IDLE_TTL = float(os.getenv("SESSION_IDLE_TTL", str(24 * 3600)))
+MAX_SESSION_BYTES = int(os.getenv("MAX_SESSION_BYTES", str(256 * 1024 * 1024)))
+
+# "memory" keeps sessions per process; "sqlite" shares them across workers and restarts
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "memory")
+SESSION_DB = os.getenv("SESSION_DB", "sessions.db")
+# Seconds between sweeps of idle sessions in the SQLite backend
+SESSION_PRUNE_INTERVAL = float(os.getenv("SESSION_PRUNE_INTERVAL", "60"))
+
+# LLM client: "gemini" or "fake" (a local model with injected latency)
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini")
+LLM_MODEL = os.getenv("LLM_MODEL", "gemini-1.5-flash-latest")
+# Blocking SDK calls run on a thread pool of this size; further calls queue
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))
+FAKE_LLM_LATENCY = float(os.getenv("FAKE_LLM_LATENCY", "0.5"))
+# Streamed LLM chunks buffered before the model thread waits for the client to catch up
+LLM_STREAM_BUFFER = int(os.getenv("LLM_STREAM_BUFFER", "64"))
+
+# Lines of a long tool result (e.g. a car list) per streamed SSE event
+SSE_CHUNK_LINES = int(os.getenv("SSE_CHUNK_LINES", "50"))
+
+# A chat message asking several things answers them concurrently; parts not ready within
+# CHAT_TURN_BUDGET seconds are cancelled and reported as timed out
+CHAT_TURN_BUDGET = float(os.getenv("CHAT_TURN_BUDGET", "10"))
+
+# LLM reply cache: exact prompt matches, plus similar user messages when LLM_CACHE_SIMILARITY > 0
+# (cosine of hashed trigrams, e.g. 0.9; off by default since near-identical wording can differ in meaning)
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "1024"))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "3600"))
+LLM_CACHE_SIMILARITY = float(os.getenv("LLM_CACHE_SIMILARITY", "0"))
+# Cached messages compared per prompt template when looking for a similar one
+LLM_CACHE_SIMILAR_CANDIDATES = int(os.getenv("LLM_CACHE_SIMILAR_CANDIDATES", "256"))
+
+# Most rows a top-customer / top-model answer returns, ties included
+RENTAL_TOP_MAX = int(os.getenv("RENTAL_TOP_MAX", "100"))
+
+# Audit log: "sync" writes update_history in the update's transaction; "async" queues rows
+# and group-commits them every AUDIT_FLUSH_INTERVAL seconds (or AUDIT_BATCH_SIZE rows)
+AUDIT_MODE = os.getenv("AUDIT_MODE", "sync")
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "500"))
+AUDIT_FLUSH_INTERVAL = float(os.getenv("AUDIT_FLUSH_INTERVAL", "0.05"))
+
+# Car history: a full snapshot every this many audit rows per car bounds "as of" replays
+HISTORY_SNAPSHOT_EVERY = int(os.getenv("HISTORY_SNAPSHOT_EVERY", "50"))
+
+# JSON encoder for list responses and SSE events: "orjson" when installed, else "json"
+JSON_BACKEND = os.getenv("JSON_BACKEND", "orjson")
+
+# Car listings: ETags come from table_versions; bodies of at least COMPRESS_MIN_SIZE bytes are
+# gzip- (or, with the brotli package installed, brotli-) compressed. 0 disables compression
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "5"))
+
+# Change feed (/changes): deleted cars' tombstones are kept this long, and clients further
+# behind must resync from 0. Long-polls and SSE streams also re-check for other workers'
+# writes every CHANGE_POLL_INTERVAL seconds; SSE sends a keep-alive every CHANGE_HEARTBEAT
+CHANGE_TOMBSTONE_TTL = float(os.getenv("CHANGE_TOMBSTONE_TTL", str(7 * 24 * 3600)))
+CHANGE_POLL_INTERVAL = float(os.getenv("CHANGE_POLL_INTERVAL", "1"))
+CHANGE_HEARTBEAT = float(os.getenv("CHANGE_HEARTBEAT", "15"))
+MAX_CHANGE_WAIT = 60
@@ -1,12 +1,20 @@
 import os
 import uvicorn
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from services.service import Service
 from routers import cars
+from routers import bookings
 from routers import chat_gemini as chat
+from routers import metrics
+from routers import tools
+from routers import analytics
+from routers import changes
 from repos.repo import Repo
+from services.sessions import session_store
+from services.llm import llm_client
 from constants import DB_NAME
 
 repo = Repo(DB_NAME)
@@ -17,8 +25,18 @@ ALLOWED_ORIGINS = [
     "*"  # Only use this for development - remove for production
 ]
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Open the shared SQLite connection pool once for the whole process
+    await repo.open()
+    await session_store.open()
+    yield
+    await session_store.close()
+    await repo.close()
+    llm_client.close()
+
 # Create FastAPI app
-app = FastAPI(title="Car Management API")
+app = FastAPI(title="Car Management API", lifespan=lifespan)
 
 # Add CORS middleware
 app.add_middleware(
@@ -27,11 +45,17 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
 # Include API routes first
 app.include_router(cars.router, prefix="/cars", tags=["Cars"])
+app.include_router(bookings.router, prefix="/bookings", tags=["Bookings"])
 app.include_router(chat.router, tags=["Chat"])
+app.include_router(metrics.router, prefix="/metrics", tags=["Metrics"])
+app.include_router(tools.router, prefix="/tools", tags=["Tools"])
+app.include_router(analytics.router, prefix="/analytics", tags=["Analytics"])
+app.include_router(changes.router, prefix="/changes", tags=["Changes"])
 
 # Mount static files (frontend) - this should be last
 app.mount("/", StaticFiles(directory="../frontend", html=True), name="static")
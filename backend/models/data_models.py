@@ -1,6 +1,27 @@
 from typing import List, Optional
-from pydantic import BaseModel, ConfigDict
-from datetime import datetime
+from pydantic import BaseModel, ConfigDict, field_validator, model_validator
+from datetime import date, datetime
+
+# Formats accepted for booking dates, tried in order; stored as ISO YYYY-MM-DD
+DATE_FORMATS = ["%Y-%m-%d", "%Y/%m/%d", "%d-%m-%Y", "%d/%m/%Y", "%d %b %Y", "%d %B %Y", "%b %d %Y", "%B %d %Y"]
+
+def parse_date(value) -> date:
+    """Parse a free-form booking date into a date."""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    text = str(value).strip().replace(",", "")
+    try:
+        return datetime.fromisoformat(text).date()
+    except ValueError:
+        pass
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f"Unrecognised date '{value}', expected YYYY-MM-DD")
 
 class Car(BaseModel):
     model_config = ConfigDict(json_encoders={datetime: lambda dt: dt.isoformat()})
@@ -13,6 +34,44 @@ class Car(BaseModel):
     color: str
     available: bool
 
+def changed_fields(old: BaseModel, new: BaseModel, exclude: tuple = ("id",)) -> dict:
+    """{field: (old value, new value)} for every declared field that differs, in declaration order."""
+    return {
+        name: (getattr(old, name), getattr(new, name))
+        for name in type(old).model_fields
+        if name not in exclude and getattr(old, name) != getattr(new, name)
+    }
+
+class CarPatch(BaseModel):
+    """Car fields to change; any left out keep their current value."""
+    company: Optional[str] = None
+    model: Optional[str] = None
+    kms: Optional[int] = None
+    year: Optional[int] = None
+    color: Optional[str] = None
+    available: Optional[bool] = None
+
+    @model_validator(mode="after")
+    def check_not_null(self):
+        for name in self.model_fields_set:
+            if getattr(self, name) is None:
+                raise ValueError(f"{name} cannot be null")
+        return self
+
+    def fields(self) -> dict:
+        """Only the fields that were given."""
+        return self.model_dump(exclude_unset=True)
+
+class CarFilter(BaseModel):
+    company: Optional[str] = None
+    model: Optional[str] = None
+    color: Optional[str] = None
+    available: Optional[bool] = None
+    year_min: Optional[int] = None
+    year_max: Optional[int] = None
+    kms_min: Optional[int] = None
+    kms_max: Optional[int] = None
+
 class Booking(BaseModel):
     model_config = ConfigDict(json_encoders={datetime: lambda dt: dt.isoformat()})
 
@@ -23,6 +82,22 @@ class Booking(BaseModel):
     end_date: str
     total_price: float
 
+    @field_validator("start_date", "end_date", mode="before")
+    @classmethod
+    def normalize_date(cls, value):
+        return parse_date(value).isoformat()
+
+    @model_validator(mode="after")
+    def check_period(self):
+        if self.end_date < self.start_date:
+            raise ValueError("end_date must not be before start_date")
+        return self
+
+    @property
+    def period(self) -> tuple:
+        """(start, end) as proleptic Gregorian ordinals; both days are inclusive."""
+        return date.fromisoformat(self.start_date).toordinal(), date.fromisoformat(self.end_date).toordinal()
+
 
 
 
@@ -0,0 +1,21 @@
+#!/usr/bin/env python3
+import asyncio
+from repos.repo import Repo
+from constants import DB_NAME
+
+async def rebuild_rentals():
+    repo = Repo(DB_NAME)
+    await repo.open()
+
+    # Recount customer_rentals / model_rentals from the bookings table in one transaction
+    counts = await repo.rebuild_rental_counts()
+    for table, rows in counts.items():
+        print(f"✅ {table}: {rows} rows")
+
+    print(f"🏆 Top customer: {await repo.get_customer_with_most_rentals()}")
+    print(f"🚗 Most rented model: {await repo.get_most_rented_model()}")
+
+    await repo.close()
+
+if __name__ == "__main__":
+    asyncio.run(rebuild_rentals())
@@ -0,0 +1,182 @@
+"""
+update_history writes.
+
+In "sync" mode (the default) audit rows are inserted in the same transaction as the car
+update they describe. In "async" mode they are queued and a background task writes
+whatever has accumulated with one executemany and one commit, so a burst of updates
+costs one audit transaction instead of one each. Queued rows are flushed on shutdown but
+lost if the process dies first.
+
+Every HISTORY_SNAPSHOT_EVERY rows of a car, the car's full state is stored in
+car_snapshots, so "car X as of time T" starts from the nearest snapshot instead of
+replaying the whole log.
+"""
+import asyncio
+import json
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+from repos.pool import ConnectionPool, get_pool
+from constants import AUDIT_MODE, AUDIT_BATCH_SIZE, AUDIT_FLUSH_INTERVAL, HISTORY_SNAPSHOT_EVERY
+
+INSERT_AUDIT = """
+    INSERT INTO update_history (car_id, field, old_value, new_value, updated_by, timestamp)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+
+
+# The state before a car's first audited update; the first one queued wins
+INSERT_BASELINE = """
+    INSERT OR IGNORE INTO car_snapshots (car_id, history_id, timestamp, state) VALUES (?, 0, '', ?)
+"""
+
+
+def baseline(car_id, state: dict) -> tuple:
+    return (car_id, json.dumps(state))
+
+
+async def take_snapshots(db, car_id, every: int = HISTORY_SNAPSHOT_EVERY) -> int:
+    """Store a snapshot after every `every` rows since the car's last one. Returns how many were stored.
+
+    Cars without a baseline (history logged before snapshots existed) are skipped.
+    """
+    async with db.execute("""
+        SELECT history_id, timestamp, state FROM car_snapshots
+        WHERE car_id = ? ORDER BY history_id DESC LIMIT 1
+    """, (car_id,)) as cursor:
+        last = await cursor.fetchone()
+    if last is None:
+        return 0
+    history_id, timestamp, state = last
+    async with db.execute("""
+        SELECT id, field, new_value, timestamp FROM update_history
+        WHERE car_id = ? AND timestamp >= ? AND id > ?
+        ORDER BY id
+    """, (car_id, timestamp, history_id)) as cursor:
+        events = await cursor.fetchall()
+    if len(events) < every:
+        return 0
+    state = json.loads(state)
+    snapshots = []
+    for n, (event_id, field, new_value, event_time) in enumerate(events, 1):
+        state[field] = new_value
+        if n % every == 0:
+            snapshots.append((car_id, event_id, event_time, json.dumps(state)))
+    await db.executemany(
+        "INSERT OR IGNORE INTO car_snapshots (car_id, history_id, timestamp, state) VALUES (?, ?, ?, ?)",
+        snapshots
+    )
+    return len(snapshots)
+
+
+async def write_audit(db, rows: List[tuple], baselines: Iterable[tuple] = ()):
+    """Insert audit rows (plus any baselines) and snapshot the cars they touch, in the caller's transaction."""
+    baselines = list(baselines)
+    if baselines:
+        await db.executemany(INSERT_BASELINE, baselines)
+    await db.executemany(INSERT_AUDIT, rows)
+    for car_id in dict.fromkeys(row[0] for row in rows):
+        await take_snapshots(db, car_id)
+
+
+def audit_rows(car_id, updated_by: str, changes: dict) -> List[tuple]:
+    """update_history rows for `changes` ({field: (old, new)}), all stamped with one timestamp."""
+    timestamp = datetime.utcnow().isoformat()
+    return [
+        (car_id, field, str(old_value), str(new_value), updated_by, timestamp)
+        for field, (old_value, new_value) in changes.items()
+    ]
+
+
+class AuditWriter:
+    """Queue of audit rows written by a background task in group commits."""
+
+    def __init__(self, pool: ConnectionPool, batch_size: int = AUDIT_BATCH_SIZE, flush_interval: float = AUDIT_FLUSH_INTERVAL):
+        self.pool = pool
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._pending: List[tuple] = []
+        self._baselines: List[tuple] = []
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        # One flush at a time, or the task and close()/flush() callers would write the same rows
+        self._flushing = asyncio.Lock()
+        self._stats = {"queued": 0, "written": 0, "commits": 0, "failed": 0, "commit_time_total": 0.0}
+
+    def submit(self, rows: List[tuple], baselines: Iterable[tuple] = ()):
+        """Queue rows for the next group commit; starts the writer task on first use."""
+        if not rows:
+            return
+        self._baselines.extend(baselines)
+        if self._task is None or self._task.done():
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+        self._pending.extend(rows)
+        self._stats["queued"] += len(rows)
+        self._wake.set()
+
+    async def _run(self):
+        while True:
+            await self._wake.wait()
+            # Linger briefly so concurrent updates share the commit, unless a full batch is waiting
+            if len(self._pending) < self.batch_size:
+                await asyncio.sleep(self.flush_interval)
+            self._wake.clear()
+            await self.flush()
+
+    async def flush(self):
+        """Write everything queued so far, batch_size rows per transaction."""
+        async with self._flushing:
+            await self._flush()
+
+    async def _flush(self):
+        while self._pending:
+            rows = self._pending[:self.batch_size]
+            # Baselines go out with the first batch after they were queued, ahead of their rows
+            baselines = self._baselines[:]
+            started = time.perf_counter()
+            try:
+                # Shares the pool's group commit with whatever else is being written
+                await self.pool.write(lambda db: write_audit(db, rows, baselines))
+            except Exception as e:
+                del self._pending[:len(rows)]
+                del self._baselines[:len(baselines)]
+                self._stats["failed"] += len(rows)
+                print(f"Error logging update history: {e}")
+                continue
+            # Dropped only once committed, so a cancelled write is retried by close()
+            del self._pending[:len(rows)]
+            del self._baselines[:len(baselines)]
+            self._stats["written"] += len(rows)
+            self._stats["commits"] += 1
+            self._stats["commit_time_total"] += time.perf_counter() - started
+
+    async def close(self):
+        """Stop the writer task and flush what is still queued."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> dict:
+        stats = dict(self._stats)
+        stats["pending"] = len(self._pending)
+        stats["rows_per_commit"] = stats["written"] / stats["commits"] if stats["commits"] else 0.0
+        return stats
+
+
+_writers: Dict[str, AuditWriter] = {}
+
+
+def get_audit_writer(db_path: str) -> Optional[AuditWriter]:
+    """The shared queued writer for `db_path`, or None when AUDIT_MODE is "sync"."""
+    if AUDIT_MODE != "async":
+        return None
+    writer = _writers.get(db_path)
+    if writer is None:
+        writer = _writers[db_path] = AuditWriter(get_pool(db_path))
+    return writer
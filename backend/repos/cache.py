@@ -0,0 +1,130 @@
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable
+from constants import CAR_CACHE_SIZE, LIST_CACHE_SIZE, CACHE_TTL, CACHE_GENERATION_CHECK
+
+MISSING = object()
+
+
+class LRUCache:
+    """Bounded least-recently-used map whose entries also expire after `ttl` seconds."""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable):
+        """Cached value for `key`, or MISSING."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return MISSING
+        value, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return MISSING
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value):
+        self._entries[key] = (value, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key: Hashable):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class CarCache:
+    """Read-through caches for Repo.get and Repo.list on one database file.
+
+    Local writes invalidate directly. Writes from other processes are noticed by
+    re-reading the `cars` row of table_versions at most every `check_interval`
+    seconds (0 turns the cross-process check off).
+    """
+
+    def __init__(self, check_interval: float = CACHE_GENERATION_CHECK):
+        self.cars = LRUCache(CAR_CACHE_SIZE, CACHE_TTL)
+        self.lists = LRUCache(LIST_CACHE_SIZE, CACHE_TTL)
+        self.check_interval = check_interval
+        self.generation = None
+        self.checked_at = 0.0
+        # Bumped on every invalidation so a read that raced a write doesn't repopulate stale data
+        self.epoch = 0
+        self.generation_resets = 0
+
+    def needs_check(self) -> bool:
+        return self.check_interval > 0 and time.monotonic() - self.checked_at >= self.check_interval
+
+    def observe(self, generation: int):
+        """Record the generation read from SQLite, dropping everything if another process wrote."""
+        if self.generation is not None and generation != self.generation:
+            self.generation_resets += 1
+            self.clear()
+        self.generation = generation
+        self.checked_at = time.monotonic()
+
+    def written(self, generation: int, car_id=None):
+        """Invalidate after a local write that moved the generation to `generation`."""
+        if self.generation is not None and generation != self.generation + 1:
+            # Someone else wrote in between; we can't tell what changed
+            self.clear()
+        else:
+            self.lists.clear()
+            if car_id is not None:
+                self.cars.pop(str(car_id))
+            self.epoch += 1
+        self.generation = generation
+
+    def clear(self):
+        self.cars.clear()
+        self.lists.clear()
+        self.epoch += 1
+
+    def stats(self) -> dict:
+        return {
+            "cars": self.cars.stats(),
+            "lists": self.lists.stats(),
+            "generation": self.generation,
+            "generation_check_interval": self.check_interval,
+            "generation_resets": self.generation_resets,
+        }
+
+
+# One cache per database file, shared by every Repo pointing at it
+_caches: Dict[str, CarCache] = {}
+
+
+def get_cache(db_path: str) -> CarCache:
+    if db_path not in _caches:
+        _caches[db_path] = CarCache()
+    return _caches[db_path]
@@ -0,0 +1,117 @@
+"""
+Change log of the cars table, for clients that keep a local copy in sync (GET /changes).
+
+Every car write appends one car_changes row per car it touched, inside the write's own
+transaction: the car's full state afterwards, or a NULL state (tombstone) for a delete.
+seq only ever grows, so a client resumes from the last seq it applied.
+
+The log is compacted as it is written: a car's new entry replaces its older ones, so it
+holds one entry per live car plus recent tombstones, and replaying it from any seq still
+ends in the current state. Tombstones older than CHANGE_TOMBSTONE_TTL are dropped; the
+highest seq dropped is the horizon, and a client resuming from below it (other than 0,
+an empty copy) may have missed a delete and has to start over.
+"""
+import asyncio
+import json
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+from repos.schema import CAR_STATE_JSON
+from constants import TABLE_NAME, CHANGE_TOMBSTONE_TTL
+
+# Entries of cars that were just logged again (seq > ?) are superseded; seeks idx_car_changes_car
+COMPACT = """
+    DELETE FROM car_changes WHERE seq IN (
+        SELECT old.seq FROM car_changes new
+        JOIN car_changes old ON old.car_id = new.car_id AND old.seq < new.seq
+        WHERE new.seq > ?
+    )
+"""
+
+
+async def _last_seq(db) -> int:
+    async with db.execute("SELECT COALESCE(MAX(seq), 0) FROM car_changes") as cursor:
+        return (await cursor.fetchone())[0]
+
+
+async def log_cars(db, where: str, params: tuple):
+    """Log the current state of the cars matching `where`, in the caller's transaction."""
+    last = await _last_seq(db)
+    await db.execute(f"""
+        INSERT INTO car_changes (car_id, state, timestamp)
+        SELECT id, {CAR_STATE_JSON}, ? FROM {TABLE_NAME} WHERE {where} ORDER BY id
+    """, (datetime.utcnow().isoformat(), *params))
+    await db.execute(COMPACT, (last,))
+
+
+async def log_delete(db, car_id, tombstone_ttl: float = CHANGE_TOMBSTONE_TTL):
+    """Log a tombstone for `car_id` and drop expired ones, in the caller's transaction."""
+    now = datetime.utcnow()
+    last = await _last_seq(db)
+    await db.execute(
+        "INSERT INTO car_changes (car_id, state, timestamp) VALUES (?, NULL, ?)",
+        (car_id, now.isoformat())
+    )
+    await db.execute(COMPACT, (last,))
+    async with db.execute(
+        "DELETE FROM car_changes WHERE state IS NULL AND timestamp < ? RETURNING seq",
+        ((now - timedelta(seconds=tombstone_ttl)).isoformat(),)
+    ) as cursor:
+        dropped = [row[0] for row in await cursor.fetchall()]
+    if dropped:
+        await db.execute("UPDATE change_log_horizon SET seq = MAX(seq, ?) WHERE id = 1", (max(dropped),))
+
+
+async def read_changes(db, since: int, limit: int) -> dict:
+    """Up to `limit` entries after `since`, plus the horizon and the last seq ever assigned.
+
+    Run it in one read transaction (ConnectionPool.snapshot) so the page and the horizon agree.
+    """
+    async with db.execute(
+        "SELECT seq, car_id, state FROM car_changes WHERE seq > ? ORDER BY seq LIMIT ?", (since, limit)
+    ) as cursor:
+        rows = await cursor.fetchall()
+    async with db.execute("""
+        SELECT (SELECT seq FROM change_log_horizon WHERE id = 1),
+               (SELECT seq FROM sqlite_sequence WHERE name = 'car_changes')
+    """) as cursor:
+        horizon, latest = await cursor.fetchone()
+    changes = [
+        {"seq": seq, "car_id": car_id, "op": "upsert" if state else "delete", "car": json.loads(state) if state else None}
+        for seq, car_id, state in rows
+    ]
+    latest = latest or 0
+    # A short page means everything up to `latest` has been seen, compacted-away entries included
+    next_seq = changes[-1]["seq"] if len(changes) == limit else max(since, latest)
+    return {"changes": changes, "next": next_seq, "latest": latest, "horizon": horizon or 0}
+
+
+class ChangeSignal:
+    """Wakes this process's long-polls and SSE streams when a car write commits."""
+
+    def __init__(self):
+        self._event: Optional[asyncio.Event] = None
+
+    def notify(self):
+        if self._event is not None:
+            self._event.set()
+            self._event = None
+
+    async def wait(self, timeout: float) -> bool:
+        """True if a write committed within `timeout` seconds."""
+        if self._event is None:
+            self._event = asyncio.Event()
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+
+_signals: Dict[str, ChangeSignal] = {}
+
+
+def get_change_signal(db_path: str) -> ChangeSignal:
+    signal = _signals.get(db_path)
+    if signal is None:
+        signal = _signals[db_path] = ChangeSignal()
+    return signal
@@ -0,0 +1,395 @@
+import asyncio
+import time
+import aiosqlite
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+from constants import (
+    DB_POOL_SIZE, SQLITE_JOURNAL_MODE, SQLITE_SYNCHRONOUS, SQLITE_CACHE_SIZE_KB, SQLITE_MMAP_SIZE,
+    SQLITE_BUSY_TIMEOUT_MS, GROUP_COMMIT_MAX_OPS
+)
+
+T = TypeVar("T")
+
+PRAGMAS = {
+    # journal_mode belongs to the file; the first connection switches it and the rest just agree
+    "journal_mode": SQLITE_JOURNAL_MODE,
+    "synchronous": SQLITE_SYNCHRONOUS,
+    # Negative means KiB rather than pages
+    "cache_size": -SQLITE_CACHE_SIZE_KB,
+    "mmap_size": SQLITE_MMAP_SIZE,
+    "busy_timeout": SQLITE_BUSY_TIMEOUT_MS,
+}
+
+
+class UnitOfWork:
+    """The writer connection and open transaction shared by one request or tool call.
+
+    While it is active (see ConnectionPool.unit_of_work), the pool's reader() and write()
+    calls made from the same context use this connection instead: writes run directly in
+    a savepoint and become visible to later reads, and callbacks registered with
+    after_commit() wait until the whole unit has committed.
+    """
+
+    def __init__(self, pool: "ConnectionPool"):
+        self.pool = pool
+        self.db: Optional[aiosqlite.Connection] = None
+        # Tasks started inside the unit share it; one write at a time keeps savepoints nested
+        self.lock = asyncio.Lock()
+        self.callbacks: List[Callable[[], None]] = []
+        self.writes = 0
+
+
+_unit: ContextVar[Optional[UnitOfWork]] = ContextVar("unit_of_work", default=None)
+
+
+class ConnectionPool:
+    """Bounded pool of long-lived aiosqlite connections: several readers plus one serialized writer.
+
+    Writes normally go through `write()`: a single task drains the queue of pending
+    write operations and commits everything that queued up during the previous commit
+    as one transaction (group commit), so N concurrent writers pay for one commit.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        size: int = DB_POOL_SIZE,
+        pragmas: Optional[dict] = None,
+        max_batch: int = GROUP_COMMIT_MAX_OPS
+    ):
+        self.db_path = db_path
+        self.size = size
+        self.pragmas = PRAGMAS if pragmas is None else pragmas
+        self.max_batch = max_batch
+        self._readers: asyncio.Queue = None
+        self._all_readers = []
+        self._writer: aiosqlite.Connection = None
+        self._write_lock: asyncio.Lock = None
+        self._open_lock = asyncio.Lock()
+        self._queue: List[Tuple[Callable, asyncio.Future]] = []
+        self._wake: Optional[asyncio.Event] = None
+        self._write_task: Optional[asyncio.Task] = None
+        self._stats = {
+            "reader_checkouts": 0,
+            "writer_checkouts": 0,
+            "reader_wait_total": 0.0,
+            "writer_wait_total": 0.0,
+            "reader_wait_max": 0.0,
+            "writer_wait_max": 0.0,
+            "waiting": 0,
+            "group_commits": 0,
+            "group_ops": 0,
+            "group_ops_failed": 0,
+            "group_commits_failed": 0,
+            "group_commit_time_total": 0.0,
+            "units": 0,
+            "units_failed": 0,
+            "unit_writes": 0,
+        }
+
+    @property
+    def is_open(self) -> bool:
+        return self._writer is not None
+
+    async def _connect(self) -> aiosqlite.Connection:
+        conn = await aiosqlite.connect(self.db_path)
+        for name, value in self.pragmas.items():
+            await conn.execute(f"PRAGMA {name}={value}")
+        return conn
+
+    async def open(self):
+        """Open all connections once; safe to call repeatedly."""
+        async with self._open_lock:
+            if self.is_open:
+                return
+            self._readers = asyncio.Queue()
+            self._all_readers = [await self._connect() for _ in range(self.size)]
+            for conn in self._all_readers:
+                self._readers.put_nowait(conn)
+            self._write_lock = asyncio.Lock()
+            self._writer = await self._connect()
+
+    async def close(self):
+        """Finish queued writes, then close every connection; the pool reopens lazily on next use."""
+        if self._write_task is not None and not self._write_task.done():
+            self._queue.append((None, None))
+            self._wake.set()
+            await self._write_task
+        self._write_task = None
+        async with self._open_lock:
+            if not self.is_open:
+                return
+            for conn in self._all_readers:
+                await conn.close()
+            await self._writer.close()
+            self._all_readers = []
+            self._readers = None
+            self._writer = None
+            self._write_lock = None
+
+    def _record_wait(self, kind: str, started: float):
+        waited = time.perf_counter() - started
+        self._stats[f"{kind}_checkouts"] += 1
+        self._stats[f"{kind}_wait_total"] += waited
+        self._stats[f"{kind}_wait_max"] = max(self._stats[f"{kind}_wait_max"], waited)
+
+    def _current_unit(self) -> Optional[UnitOfWork]:
+        unit = _unit.get()
+        return unit if unit is not None and unit.pool is self and unit.db is not None else None
+
+    @property
+    def in_unit_of_work(self) -> bool:
+        return self._current_unit() is not None
+
+    @asynccontextmanager
+    async def reader(self):
+        """Check out a read-only connection, waiting if all readers are busy.
+
+        Inside a unit of work this is the unit's connection, so reads see its uncommitted writes.
+        """
+        unit = self._current_unit()
+        if unit is not None:
+            yield unit.db
+            return
+        if not self.is_open:
+            await self.open()
+        started = time.perf_counter()
+        self._stats["waiting"] += 1
+        try:
+            conn = await self._readers.get()
+        finally:
+            self._stats["waiting"] -= 1
+        self._record_wait("reader", started)
+        try:
+            yield conn
+        finally:
+            self._readers.put_nowait(conn)
+
+    @asynccontextmanager
+    async def snapshot(self):
+        """A reader holding one read transaction for the block, so its queries agree with each other.
+
+        Inside a unit of work the unit's transaction already does that, so the block just
+        reads on the unit's connection (and sees its uncommitted writes).
+        """
+        async with self.reader() as db:
+            if self._current_unit() is not None:
+                yield db
+                return
+            await db.execute("BEGIN")
+            try:
+                yield db
+            finally:
+                await db.execute("COMMIT")
+
+    @asynccontextmanager
+    async def writer(self):
+        """Check out the single writer connection; uncommitted work is rolled back on error.
+
+        Not available inside a unit of work, which already holds the writer until it commits.
+        """
+        if self._current_unit() is not None:
+            raise RuntimeError("writer() inside a unit of work would wait for the unit itself; use write()")
+        if not self.is_open:
+            await self.open()
+        started = time.perf_counter()
+        self._stats["waiting"] += 1
+        try:
+            await self._write_lock.acquire()
+        finally:
+            self._stats["waiting"] -= 1
+        self._record_wait("writer", started)
+        try:
+            yield self._writer
+        except BaseException:
+            await self._writer.rollback()
+            raise
+        finally:
+            self._write_lock.release()
+
+    async def write(self, op: Callable[[aiosqlite.Connection], Awaitable[T]]) -> T:
+        """Run `op(db)` on the writer connection in the next group commit and return its result.
+
+        Each op runs in its own savepoint, so one that raises is rolled back alone and its
+        exception is re-raised here; the rest of the batch still commits. Results are only
+        returned once the batch has committed. `op` must not commit or roll back itself.
+
+        Inside a unit of work, `op` runs at once on the unit's connection, in its own savepoint.
+        """
+        unit = self._current_unit()
+        if unit is not None:
+            return await self._write_in_unit(unit, op)
+        if not self.is_open:
+            await self.open()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.append((op, future))
+        if self._write_task is None or self._write_task.done():
+            self._wake = asyncio.Event()
+            self._write_task = asyncio.create_task(self._run_writes())
+        self._wake.set()
+        return await future
+
+    async def _write_in_unit(self, unit: UnitOfWork, op: Callable[[aiosqlite.Connection], Awaitable[T]]) -> T:
+        async with unit.lock:
+            await unit.db.execute("SAVEPOINT unit_op")
+            try:
+                result = await op(unit.db)
+            except Exception:
+                await unit.db.execute("ROLLBACK TO unit_op")
+                raise
+            finally:
+                await unit.db.execute("RELEASE unit_op")
+        unit.writes += 1
+        return result
+
+    def after_commit(self, callback: Callable[[], None]):
+        """Run `callback` once the current write is durable: now, or when the enclosing unit of work commits."""
+        unit = self._current_unit()
+        if unit is None:
+            callback()
+        else:
+            unit.callbacks.append(callback)
+
+    @asynccontextmanager
+    async def unit_of_work(self):
+        """Share one connection and one transaction across every read and write in the block.
+
+        The whole block is a single op of the writer's group commit: it starts once the
+        writer reaches it, every write inside is a savepoint on the writer connection, and
+        it commits once, when the block exits. An exception escaping the block rolls all of
+        it back and is re-raised. Nested blocks (and tasks started inside) join the
+        enclosing unit. Other writers queue behind it, so keep the block to database work.
+        """
+        if self._current_unit() is not None:
+            yield self._current_unit()
+            return
+        loop = asyncio.get_running_loop()
+        unit = UnitOfWork(self)
+        started = loop.create_future()
+        finished = loop.create_future()
+
+        async def op(db):
+            unit.db = db
+            started.set_result(None)
+            try:
+                # The block runs meanwhile, in the caller's task; its outcome decides this savepoint
+                await finished
+            finally:
+                unit.db = None
+
+        def committed(write: asyncio.Future):
+            if write.cancelled() or write.exception() is not None:
+                self._stats["units_failed"] += 1
+                return
+            self._stats["units"] += 1
+            self._stats["unit_writes"] += unit.writes
+            for callback in unit.callbacks:
+                callback()
+
+        write = asyncio.ensure_future(self.write(op))
+        # Runs even if the caller is cancelled while the commit is in flight
+        write.add_done_callback(committed)
+        token = None
+        try:
+            await asyncio.wait({started, write}, return_when=asyncio.FIRST_COMPLETED)
+            if not started.done():
+                # The batch failed before the op ran
+                write.result()
+            token = _unit.set(unit)
+            yield unit
+        except BaseException as e:
+            if token is not None:
+                _unit.reset(token)
+            if not finished.done():
+                # Rolls back the unit's savepoint (or releases the op if the block never started)
+                finished.set_exception(e if isinstance(e, Exception) else RuntimeError("unit of work cancelled"))
+            try:
+                await asyncio.shield(write)
+            except BaseException:
+                pass
+            raise
+        _unit.reset(token)
+        finished.set_result(None)
+        await asyncio.shield(write)
+
+    async def _run_writes(self):
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+            while self._queue:
+                batch = self._queue[:self.max_batch]
+                del self._queue[:len(batch)]
+                # close() queues (None, None) last: stop once everything before it is written
+                closing = batch[-1][0] is None
+                batch = [(op, future) for op, future in batch if op is not None and not future.done()]
+                if batch:
+                    async with self.writer() as db:
+                        await self._commit_batch(db, batch)
+                if closing:
+                    return
+
+    async def _commit_batch(self, db: aiosqlite.Connection, batch: List[Tuple[Callable, asyncio.Future]]):
+        started = time.perf_counter()
+        outcomes = []
+        try:
+            await db.execute("BEGIN IMMEDIATE")
+            for op, future in batch:
+                await db.execute("SAVEPOINT write_op")
+                try:
+                    outcomes.append((future, await op(db), None))
+                except Exception as e:
+                    # Fails (and so fails the whole batch) if SQLite already rolled everything back
+                    await db.execute("ROLLBACK TO write_op")
+                    outcomes.append((future, None, e))
+                await db.execute("RELEASE write_op")
+            await db.commit()
+        except BaseException as e:
+            await db.rollback()
+            self._stats["group_commits_failed"] += 1
+            error = e if isinstance(e, Exception) else RuntimeError("write cancelled")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(error)
+            if not isinstance(e, Exception):
+                raise
+            return
+        self._stats["group_commits"] += 1
+        self._stats["group_ops"] += len(batch)
+        self._stats["group_commit_time_total"] += time.perf_counter() - started
+        for future, result, error in outcomes:
+            if future.done():
+                continue
+            if error is not None:
+                self._stats["group_ops_failed"] += 1
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    def stats(self) -> dict:
+        """Pool size, checkout counts, wait times (seconds) and group-commit batching."""
+        stats = dict(self._stats)
+        reader_checkouts = stats["reader_checkouts"]
+        writer_checkouts = stats["writer_checkouts"]
+        stats.update({
+            "db_path": self.db_path,
+            "open": self.is_open,
+            "size": self.size,
+            "readers_idle": self._readers.qsize() if self._readers else 0,
+            "writer_busy": bool(self._write_lock and self._write_lock.locked()),
+            "reader_wait_avg": stats["reader_wait_total"] / reader_checkouts if reader_checkouts else 0.0,
+            "writer_wait_avg": stats["writer_wait_total"] / writer_checkouts if writer_checkouts else 0.0,
+            "write_queue": len(self._queue),
+            "ops_per_group_commit": stats["group_ops"] / stats["group_commits"] if stats["group_commits"] else 0.0,
+        })
+        return stats
+
+
+# One pool per database file, shared by every Repo pointing at it
+_pools: Dict[str, ConnectionPool] = {}
+
+
+def get_pool(db_path: str) -> ConnectionPool:
+    if db_path not in _pools:
+        _pools[db_path] = ConnectionPool(db_path)
+    return _pools[db_path]
@@ -1,55 +1,139 @@
-import aiosqlite
-from typing import List, Optional
-from models.data_models import Car, Booking
-from constants import DB_NAME, TABLE_NAME
-from datetime import datetime
+import base64
+import json
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from models.data_models import Car, Booking, CarFilter, changed_fields
+from constants import DB_NAME, TABLE_NAME, RENTAL_TOP_MAX, MAX_PAGE_SIZE
+from datetime import date
+from repos.pool import get_pool
+from repos.cache import MISSING, get_cache
+from repos.schema import migrate, REBUILD_RENTAL_COUNTS
+from repos.audit import audit_rows, baseline, get_audit_writer, write_audit
+from repos.changes import get_change_signal, log_cars, log_delete, read_changes
+
+CAR_COLUMNS = "id, company, model, kms, year, color, available"
+CAR_FIELDS = tuple(CAR_COLUMNS.split(", "))
+
+# Sort key -> ORDER BY expression; each one matches an index ending in id
+SORT_KEYS = {
+    "id": "id",
+    "year": "year",
+    "kms": "kms",
+    "company": "company COLLATE NOCASE",
+    "model": "model COLLATE NOCASE",
+}
+
+
+class VersionConflict(Exception):
+    """The car changed after the version the caller last read."""
+
+    def __init__(self, car_id, current_version: int):
+        super().__init__(f"Car {car_id} has changed since; its current row_version is {current_version}")
+        self.current_version = current_version
+
 
 class Repo:
     def __init__(self, db_path: str = DB_NAME):
         self.db_path = db_path
+        self.pool = get_pool(db_path)
+        self.cache = get_cache(db_path)
+        # Queued group-commit audit writer, or None to write audit rows inline (AUDIT_MODE)
+        self.audit = get_audit_writer(db_path)
+        # Wakes /changes long-polls in this process after a car write commits
+        self.changes = get_change_signal(db_path)
+
+    async def open(self):
+        """Open the shared connection pool and migrate the schema (called once from the app lifespan)."""
+        await self.pool.open()
+        await self.init_db()
+
+    async def close(self):
+        """Flush queued audit rows and close the shared connection pool on shutdown."""
+        if self.audit is not None:
+            await self.audit.close()
+        await self.pool.close()
+
+    def unit_of_work(self):
+        """Run every Repo call in the `async with` block on one connection and commit them together.
 
-    async def init_db(self):
-        """Initialize table if not exists."""
-        async with aiosqlite.connect(self.db_path) as db:
+        See ConnectionPool.unit_of_work; Services and tools sharing this database file join
+        the same unit, and cached cars are bypassed until it commits. Writing agent tools
+        (agent/registry.py) and the single-car write routes (routers/cars.py) open one per call.
+        """
+        return self.pool.unit_of_work()
+
+    def _written(self, version: int, car_id=None):
+        """Invalidate cached cars and wake change-feed readers, once the write has committed."""
+        def committed():
+            self.cache.written(version, car_id)
+            self.changes.notify()
+        self.pool.after_commit(committed)
+
+    async def init_db(self) -> int:
+        """Apply pending schema migrations. Returns the schema version."""
+        async with self.pool.writer() as db:
+            return await migrate(db)
+
+    @staticmethod
+    async def _bump_version(db, table: str) -> int:
+        """Advance the table's generation counter inside the caller's transaction."""
+        async with db.execute(
+            "UPDATE table_versions SET version = version + 1 WHERE name = ? RETURNING version", (table,)
+        ) as cursor:
+            row = await cursor.fetchone()
+        return row[0]
+
+    @staticmethod
+    async def _count_rentals(db, where: str, params: tuple, sign: int, customers: bool = True):
+        """Add (sign=1) or remove (sign=-1) the bookings `b` matching `where` in the rental counters.
+
+        Runs inside the caller's transaction, so the counters commit or roll back with the write.
+        """
+        if customers:
             await db.execute(f"""
-                CREATE TABLE IF NOT EXISTS {TABLE_NAME} (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        company VARCHAR(100),
-                        model VARCHAR(100),
-                        kms INTEGER,
-                        year INTEGER,
-                        color VARCHAR(100),
-                        available BOOLEAN
-                    )
-            """)
-            await db.commit()
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS update_history (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                car_id INTEGER,
-                field TEXT,
-                old_value TEXT,
-                new_value TEXT,
-                updated_by TEXT,
-                timestamp TEXT
-                    )
-            """)
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS bookings (
-                booking_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                customer_id INTEGER,
-                car_id INTEGER,
-                start_date TEXT,
-                end_date TEXT,
-                total_price REAL
-                    )
-            """)
-            await db.commit()
+                INSERT INTO customer_rentals (customer_id, rental_count)
+                SELECT b.customer_id, ? * COUNT(*) FROM bookings b
+                WHERE b.customer_id IS NOT NULL AND {where}
+                GROUP BY b.customer_id
+                ON CONFLICT (customer_id) DO UPDATE SET rental_count = rental_count + excluded.rental_count
+            """, (sign, *params))
+        await db.execute(f"""
+            INSERT INTO model_rentals (model, rental_count)
+            SELECT c.model, ? * COUNT(*) FROM bookings b
+            JOIN {TABLE_NAME} c ON c.id = b.car_id
+            WHERE c.model IS NOT NULL AND {where}
+            GROUP BY c.model
+            ON CONFLICT (model) DO UPDATE SET rental_count = rental_count + excluded.rental_count
+        """, (sign, *params))
+        if sign < 0:
+            # Seeks the count index, so only rows that just reached zero are touched
+            if customers:
+                await db.execute("DELETE FROM customer_rentals WHERE rental_count <= 0")
+            await db.execute("DELETE FROM model_rentals WHERE rental_count <= 0")
 
+    async def table_version(self, table: str) -> int:
+        """Current generation counter of `table`; changes whenever a Repo write touches it."""
+        async with self.pool.reader() as db:
+            async with db.execute("SELECT version FROM table_versions WHERE name = ?", (table,)) as cursor:
+                row = await cursor.fetchone()
+        return row[0] if row else 0
+
+    async def table_versions(self) -> dict:
+        """Every table's generation counter, by table name."""
+        async with self.pool.reader() as db:
+            async with db.execute("SELECT name, version FROM table_versions") as cursor:
+                return dict(await cursor.fetchall())
+
+    async def _sync_cache(self):
+        """Drop cached cars if another worker has written since we last looked."""
+        if self.cache.needs_check():
+            async with self.pool.reader() as db:
+                async with db.execute("SELECT version FROM table_versions WHERE name = ?", (TABLE_NAME,)) as cursor:
+                    row = await cursor.fetchone()
+            self.cache.observe(row[0])
 
     async def insert(self, car: Car):
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute(f"""
+        async def op(db):
+            cursor = await db.execute(f"""
                 INSERT INTO {TABLE_NAME} (company, model, kms, year, color, available)
                 VALUES (?, ?, ?, ?, ?, ?)
             """, (
@@ -60,183 +144,700 @@ class Repo:
                 car.color,
                 car.available
             ))
-            await db.commit()
+            await log_cars(db, "id = ?", (cursor.lastrowid,))
+            return await self._bump_version(db, TABLE_NAME)
+
+        version = await self.pool.write(op)
+        self._written(version)
+
+    async def insert_many(self, cars: List[Car]) -> int:
+        """Insert a batch of cars with one executemany in a single transaction."""
+        async def op(db):
+            async with db.execute(f"SELECT COALESCE(MAX(id), 0) FROM {TABLE_NAME}") as cursor:
+                last_id = (await cursor.fetchone())[0]
+            await db.executemany(f"""
+                INSERT INTO {TABLE_NAME} (company, model, kms, year, color, available)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, [
+                (car.company, car.model, car.kms, car.year, car.color, car.available)
+                for car in cars
+            ])
+            await log_cars(db, "id > ?", (last_id,))
+            return await self._bump_version(db, TABLE_NAME)
+
+        version = await self.pool.write(op)
+        self._written(version)
+        return len(cars)
+
+    @staticmethod
+    def _row_to_car(row) -> Car:
+        return Car(
+            id=row[0],
+            company=row[1],
+            model=row[2],
+            kms=row[3],
+            year=row[4],
+            color=row[5],
+            available=row[6]
+        )
 
     async def get(self, car_id: str) -> Optional[Car]:
         query = f"""
-            SELECT id, company, model, kms, year, color, available
+            SELECT {CAR_COLUMNS}
             FROM {TABLE_NAME} WHERE id = ?
         """
-        async with aiosqlite.connect(self.db_path) as db:
-            cursor = await db.execute(query, (car_id,))
-            row = await cursor.fetchone()
-            if row:
-                return Car(
-                    id=row[0],
-                    company=row[1],
-                    model=row[2],
-                    kms=row[3],
-                    year=row[4],
-                    color=row[5],
-                    available=row[6]
-                )
+        # A unit of work reads its own uncommitted writes, which must not reach the cache
+        cached = not self.pool.in_unit_of_work
+        if cached:
+            await self._sync_cache()
+            car = self.cache.cars.get(str(car_id))
+            if car is not MISSING:
+                return car
+
+        epoch = self.cache.epoch
+        async with self.pool.reader() as db:
+            async with db.execute(query, (car_id,)) as cursor:
+                row = await cursor.fetchone()
+        if not row:
             return None
+        car = self._row_to_car(row)
+        # Skip caching if a write landed while we were reading
+        if cached and self.cache.epoch == epoch:
+            self.cache.cars.set(str(car_id), car)
+        return car
 
+    @staticmethod
+    def _parse_sort(sort: str) -> Tuple[str, bool]:
+        descending = sort.startswith("-")
+        key = sort.lstrip("-")
+        if key not in SORT_KEYS:
+            raise ValueError(f"Unknown sort key '{key}'. Use one of: {', '.join(SORT_KEYS)}")
+        return key, descending
 
-    async def list(self) -> List[Car]:
-        async with aiosqlite.connect(self.db_path) as db:
-            cursor = await db.execute(f"SELECT id, company, model, kms, year, color, available FROM {TABLE_NAME}")
-            rows = await cursor.fetchall()
-            return [
-                Car(
-                    id=row[0],
-                    company=row[1],
-                    model=row[2],
-                    kms=row[3],
-                    year=row[4],
-                    color=row[5],
-                    available=row[6]
-                )
-                for row in rows
-            ]
+    @staticmethod
+    def encode_cursor(car: Car, sort: str = "id") -> str:
+        """Opaque keyset cursor pointing just past `car` in `sort` order."""
+        key, _ = Repo._parse_sort(sort)
+        payload = json.dumps([sort, getattr(car, key), car.id], separators=(",", ":"))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+    @staticmethod
+    def decode_cursor(cursor: str, sort: str = "id") -> Tuple[object, int]:
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            cursor_sort, value, last_id = json.loads(base64.urlsafe_b64decode(padded))
+        except Exception:
+            raise ValueError("Malformed cursor")
+        if cursor_sort != sort:
+            raise ValueError("Cursor was issued for a different sort order")
+        return value, last_id
+
+    @staticmethod
+    def _filter_clause(filters: Optional[CarFilter]) -> Tuple[List[str], list]:
+        conditions, params = [], []
+        if filters is None:
+            return conditions, params
+        for column in ("company", "model", "color"):
+            value = getattr(filters, column)
+            if value is not None:
+                conditions.append(f"{column} = ? COLLATE NOCASE")
+                params.append(value)
+        if filters.available is not None:
+            conditions.append("available = ?")
+            params.append(filters.available)
+        for column in ("year", "kms"):
+            low, high = getattr(filters, f"{column}_min"), getattr(filters, f"{column}_max")
+            if low is not None:
+                conditions.append(f"{column} >= ?")
+                params.append(low)
+            if high is not None:
+                conditions.append(f"{column} <= ?")
+                params.append(high)
+        return conditions, params
+
+    def _list_query(
+        self,
+        filters: Optional[CarFilter],
+        sort: str,
+        limit: Optional[int],
+        cursor: Optional[str],
+        free_between: Optional[Tuple[date, date]]
+    ) -> Tuple[str, list]:
+        """SELECT for one page of cars in `sort` order, resuming after `cursor`."""
+        key, descending = self._parse_sort(sort)
+        expression = SORT_KEYS[key]
+        direction = "DESC" if descending else "ASC"
+        conditions, params = self._filter_clause(filters)
+        if free_between:
+            start, end = free_between
+            conditions.append(f"""NOT EXISTS (
+                SELECT 1 FROM bookings b
+                WHERE b.car_id = {TABLE_NAME}.id AND b.start_ord <= ? AND b.end_ord >= ?
+            )""")
+            params.extend([end.toordinal(), start.toordinal()])
 
+        if cursor:
+            value, last_id = self.decode_cursor(cursor, sort)
+            op = "<" if descending else ">"
+            if key == "id":
+                conditions.append(f"id {op} ?")
+                params.append(last_id)
+            else:
+                # Row-value comparison lets SQLite seek the (column, id) index directly
+                conditions.append(f"({expression}, id) {op} (?, ?)")
+                params.extend([value, last_id])
+
+        query = f"SELECT {CAR_COLUMNS} FROM {TABLE_NAME}"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += f" ORDER BY {expression} {direction}" + ("" if key == "id" else f", id {direction}")
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+
+        return query, params
+
+    async def list(
+        self,
+        filters: Optional[CarFilter] = None,
+        sort: str = "id",
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        free_between: Optional[Tuple[date, date]] = None
+    ) -> List[Car]:
+        """Cars matching `filters` in `sort` order ("-year" for descending), resuming after `cursor`.
+
+        With `free_between=(start, end)` only cars with no booking overlapping
+        those days (inclusive) are returned, via the (car_id, start_ord, end_ord) index.
+        """
+        # Reject unknown sort keys before anything is looked up
+        self._parse_sort(sort)
+
+        # Availability windows depend on bookings too, and a unit of work sees its own uncommitted
+        # writes, so only plain listings outside one are cached
+        cache_key = None
+        if not free_between and not self.pool.in_unit_of_work:
+            await self._sync_cache()
+            cache_key = (
+                tuple(sorted(filters.model_dump(exclude_none=True).items())) if filters else (),
+                sort,
+                limit,
+                cursor
+            )
+            cars = self.cache.lists.get(cache_key)
+            if cars is not MISSING:
+                return list(cars)
+        epoch = self.cache.epoch
+
+        query, params = self._list_query(filters, sort, limit, cursor, free_between)
+        async with self.pool.reader() as db:
+            async with db.execute(query, params) as result:
+                rows = await result.fetchall()
+        cars = [self._row_to_car(row) for row in rows]
+        if cache_key is not None and self.cache.epoch == epoch:
+            self.cache.lists.set(cache_key, cars)
+        return list(cars)
+
+    def iter_car_rows(
+        self,
+        filters: Optional[CarFilter] = None,
+        sort: str = "id",
+        batch_size: int = MAX_PAGE_SIZE,
+        free_between: Optional[Tuple[date, date]] = None
+    ) -> AsyncIterator[List[tuple]]:
+        """Every matching car as raw (CAR_FIELDS) tuples, `batch_size` rows at a time.
+
+        Batches are keyset pages, so no connection is held while the caller (e.g. a slow
+        HTTP client) consumes one; rows bypass the cache and are never turned into Cars.
+        Raises ValueError for an unknown sort key right away, before any batch is read.
+        """
+        query, params = self._list_query(filters, sort, batch_size, None, free_between)
+
+        async def batches():
+            nonlocal query, params
+            while True:
+                async with self.pool.reader() as db:
+                    async with db.execute(query, params) as result:
+                        rows = await result.fetchall()
+                if rows:
+                    yield rows
+                if len(rows) < batch_size:
+                    return
+                cursor = self.encode_cursor(self._row_to_car(rows[-1]), sort)
+                query, params = self._list_query(filters, sort, batch_size, cursor, free_between)
+
+        return batches()
 
     async def delete(self, car_id: str) -> int:
-        async with aiosqlite.connect(self.db_path) as db:
+        async def op(db):
+            # Bookings of a deleted car no longer count towards its model
+            await self._count_rentals(db, "b.car_id = ?", (car_id,), -1, customers=False)
             cursor = await db.execute(f"DELETE FROM {TABLE_NAME} WHERE id = ?", (car_id,))
-            await db.commit()
-            return cursor.rowcount
+            if not cursor.rowcount:
+                return 0, None
+            await log_delete(db, car_id)
+            return cursor.rowcount, await self._bump_version(db, TABLE_NAME)
 
-    async def update(self, car: Car) -> bool:
-        async with aiosqlite.connect(self.db_path) as db:              
-            cursor = await db.execute(f"""
-                UPDATE {TABLE_NAME}
-                SET company = ?, model = ?, kms = ?, year = ?, color = ?, available = ?
+        deleted, version = await self.pool.write(op)
+        if deleted:
+            self._written(version, car_id)
+        return deleted
+
+    async def update(self, car: Car, updated_by: Optional[str] = None, expected_version: Optional[int] = None) -> Optional[dict]:
+        """Replace a car's fields and return what changed as {field: (old, new)}; None if it doesn't exist.
+
+        A patch() of every field, so unchanged columns are not rewritten.
+        """
+        result = await self.patch(car.id, car.model_dump(exclude={"id"}), updated_by, expected_version)
+        return None if result is None else result["changes"]
+
+    async def patch(
+        self,
+        car_id: int,
+        fields: dict,
+        updated_by: Optional[str] = None,
+        expected_version: Optional[int] = None
+    ) -> Optional[dict]:
+        """Change only `fields` of a car. Returns {"car", "row_version", "changes"}; None if it doesn't exist.
+
+        The row is read by primary key and only the columns whose value differs are written,
+        by one UPDATE ... RETURNING that also bumps row_version; SQLite's RETURNING only sees
+        new values, so the read supplies the old ones. Both run as one op of the writer's
+        group commit. With `expected_version`, raises VersionConflict unless the row is
+        still at that version. With `updated_by`, one audit row per changed column is
+        written in the same transaction or queued (AUDIT_MODE).
+        """
+        unknown = set(fields) - set(CAR_FIELDS[1:])
+        if unknown:
+            raise ValueError(f"Unknown car field(s): {', '.join(sorted(unknown))}")
+
+        async def op(db):
+            async with db.execute(f"SELECT {CAR_COLUMNS}, row_version FROM {TABLE_NAME} WHERE id = ?", (car_id,)) as cursor:
+                row = await cursor.fetchone()
+            if row is None:
+                return None
+            old_car, row_version = self._row_to_car(row), row[7]
+            if expected_version is not None and expected_version != row_version:
+                raise VersionConflict(car_id, row_version)
+            changed = {name: value for name, value in fields.items() if getattr(old_car, name) != value}
+            if not changed:
+                return old_car, row_version, {}, None, None
+            # A renamed model takes the car's bookings with it
+            if "model" in changed:
+                await self._count_rentals(db, "b.car_id = ?", (car_id,), -1, customers=False)
+            assignments = ", ".join(f"{name} = ?" for name in changed)
+            async with db.execute(f"""
+                UPDATE {TABLE_NAME} SET {assignments}, row_version = row_version + 1
                 WHERE id = ?
-            """, (
-                car.company,
-                car.model,
-                car.kms,
-                car.year,
-                car.color,
-                car.available,
-                car.id
-            ))
-            await db.commit()
-            return cursor.rowcount > 0
-    
+                RETURNING {CAR_COLUMNS}, row_version
+            """, (*changed.values(), car_id)) as cursor:
+                row = await cursor.fetchone()
+            new_car, row_version = self._row_to_car(row), row[7]
+            changes = changed_fields(old_car, new_car)
+            if "model" in changed:
+                await self._count_rentals(db, "b.car_id = ?", (car_id,), 1, customers=False)
+            await log_cars(db, "id = ?", (car_id,))
+            rows = audit_rows(car_id, updated_by, changes) if updated_by else []
+            baselines = [baseline(car_id, old_car.model_dump(mode="json"))]
+            if rows and self.audit is None:
+                await write_audit(db, rows, baselines)
+            version = await self._bump_version(db, TABLE_NAME)
+            return new_car, row_version, changes, version, (rows, baselines)
+
+        result = await self.pool.write(op)
+        if result is None:
+            return None
+        car, row_version, changes, version, audit = result
+        if version is not None:
+            rows, baselines = audit
+            self._written(version, car_id)
+            if rows and self.audit is not None:
+                self.pool.after_commit(lambda: self.audit.submit(rows, baselines))
+        return {"car": car, "row_version": row_version, "changes": changes}
+
+    async def get_versioned(self, car_id: int) -> Optional[Tuple[Car, int]]:
+        """A car and its current row_version, read past the cache; None if it doesn't exist."""
+        async with self.pool.reader() as db:
+            async with db.execute(f"SELECT {CAR_COLUMNS}, row_version FROM {TABLE_NAME} WHERE id = ?", (car_id,)) as cursor:
+                row = await cursor.fetchone()
+        return (self._row_to_car(row), row[7]) if row else None
 
     async def add_update_log(self, car_id: str, updated_by: str, changes: dict) -> bool:
+        """Record {field: (old, new)} changes with one executemany (or queue them, in async audit mode)."""
+        rows = audit_rows(car_id, updated_by, changes)
+        if self.audit is not None:
+            self.pool.after_commit(lambda: self.audit.submit(rows))
+            return True
         try:
-            async with aiosqlite.connect(self.db_path) as db:
-                for field, (old_value, new_value) in changes.items():
-                    await db.execute("""
-                        INSERT INTO update_history (car_id, field, old_value, new_value, updated_by, timestamp)
-                        VALUES (?, ?, ?, ?, ?, ?)
-                    """, (
-                        car_id,
-                        field,
-                        str(old_value),
-                        str(new_value),
-                        updated_by,
-                        datetime.utcnow().isoformat()
-                    ))
-                await db.commit()
+            await self.pool.write(lambda db: write_audit(db, rows))
             return True
         except Exception as e:
             print(f"Error logging update history: {e}")
             return False
 
+    async def changes_since(self, since: int, limit: int = MAX_PAGE_SIZE) -> dict:
+        """Up to `limit` change-log entries after `since`, oldest first.
+
+        Also returns "next" (the seq to resume from), "latest" and "horizon"; see repos/changes.py.
+        """
+        async with self.pool.snapshot() as db:
+            return await read_changes(db, since, limit)
+
     async def get_last_updated_car(self) -> dict:
         """Get the car record that was last updated with update details"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.reader() as db:
             # Get the most recent update from history
-            cursor = await db.execute("""
+            async with db.execute("""
                 SELECT car_id, field, old_value, new_value, updated_by, timestamp
-                FROM update_history 
-                ORDER BY timestamp DESC 
+                FROM update_history
+                ORDER BY timestamp DESC, id DESC
                 LIMIT 1
-            """)
-            update_row = await cursor.fetchone()
-            
-            if not update_row:
-                return {"message": "No update history found"}
-            
-            car_id, field, old_value, new_value, updated_by, timestamp = update_row
-            
-            # Get the current car details
-            car = await self.get(car_id)
-            if not car:
-                return {"message": f"Car with ID {car_id} not found"}
-            
-            return {
-                "car": {
-                    "id": car.id,
-                    "company": car.company,
-                    "model": car.model,
-                    "kms": car.kms,
-                    "year": car.year,
-                    "color": car.color,
-                    "available": car.available
-                },
-                "last_update": {
-                    "field_changed": field,
-                    "old_value": old_value,
-                    "new_value": new_value,
-                    "updated_by": updated_by,
-                    "timestamp": timestamp
-                }
+            """) as cursor:
+                update_row = await cursor.fetchone()
+
+        # Release the reader before fetching the car so we never hold two at once
+        if not update_row:
+            return {"message": "No update history found"}
+        
+        car_id, field, old_value, new_value, updated_by, timestamp = update_row
+        
+        # Get the current car details
+        car = await self.get(car_id)
+        if not car:
+            return {"message": f"Car with ID {car_id} not found"}
+        
+        return {
+            "car": {
+                "id": car.id,
+                "company": car.company,
+                "model": car.model,
+                "kms": car.kms,
+                "year": car.year,
+                "color": car.color,
+                "available": car.available
+            },
+            "last_update": {
+                "field_changed": field,
+                "old_value": old_value,
+                "new_value": new_value,
+                "updated_by": updated_by,
+                "timestamp": timestamp
             }
+        }
 
-    async def insert_booking(self, booking: Booking):
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute("""
-                INSERT INTO bookings (customer_id, car_id, start_date, end_date, total_price)
-                VALUES (?, ?, ?, ?, ?)
+    @staticmethod
+    def _encode_history_cursor(timestamp: str, history_id: int) -> str:
+        payload = json.dumps([timestamp, history_id], separators=(",", ":"))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+    @staticmethod
+    def _decode_history_cursor(cursor: str) -> Tuple[str, int]:
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            timestamp, history_id = json.loads(base64.urlsafe_b64decode(padded))
+        except Exception:
+            raise ValueError("Malformed cursor")
+        return timestamp, history_id
+
+    async def car_history(self, car_id: int, limit: int, cursor: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+        """One page of a car's audit rows, newest first, plus the cursor for the next page."""
+        conditions, params = ["car_id = ?"], [car_id]
+        if cursor:
+            # Row-value comparison seeks the (car_id, timestamp, id) index directly
+            conditions.append("(timestamp, id) < (?, ?)")
+            params.extend(self._decode_history_cursor(cursor))
+        async with self.pool.reader() as db:
+            async with db.execute(f"""
+                SELECT id, field, old_value, new_value, updated_by, timestamp
+                FROM update_history
+                WHERE {" AND ".join(conditions)}
+                ORDER BY timestamp DESC, id DESC
+                LIMIT ?
+            """, (*params, limit + 1)) as result:
+                rows = await result.fetchall()
+        entries = [
+            {
+                "id": row[0],
+                "field_changed": row[1],
+                "old_value": row[2],
+                "new_value": row[3],
+                "updated_by": row[4],
+                "timestamp": row[5],
+            }
+            for row in rows[:limit]
+        ]
+        next_cursor = None
+        if len(rows) > limit:
+            next_cursor = self._encode_history_cursor(entries[-1]["timestamp"], entries[-1]["id"])
+        return entries, next_cursor
+
+    async def car_as_of(self, car_id: int, at: str) -> Optional[dict]:
+        """The car's fields as of ISO timestamp `at`, rebuilt from the nearest snapshot and the audit log.
+
+        Replays at most HISTORY_SNAPSHOT_EVERY rows forward from a snapshot. Cars whose
+        history predates snapshots are rebuilt backwards from their current row instead.
+        Returns None if the car is unknown.
+        """
+        async with self.pool.reader() as db:
+            async with db.execute("""
+                SELECT history_id, timestamp, state FROM car_snapshots
+                WHERE car_id = ? AND timestamp <= ?
+                ORDER BY history_id DESC LIMIT 1
+            """, (car_id, at)) as cursor:
+                snapshot = await cursor.fetchone()
+            if snapshot:
+                history_id, since, state = snapshot
+                async with db.execute("""
+                    SELECT id, field, old_value, new_value, timestamp FROM update_history
+                    WHERE car_id = ? AND timestamp >= ? AND timestamp <= ? AND id > ?
+                    ORDER BY id
+                """, (car_id, since, at, history_id)) as cursor:
+                    events = await cursor.fetchall()
+                state = json.loads(state)
+                for _, field, _, new_value, _ in events:
+                    state[field] = new_value
+            else:
+                history_id = None
+                async with db.execute("""
+                    SELECT id, field, old_value, new_value, timestamp FROM update_history
+                    WHERE car_id = ? AND timestamp > ?
+                    ORDER BY id DESC
+                """, (car_id, at)) as cursor:
+                    events = await cursor.fetchall()
+        if not snapshot:
+            current = await self.get(car_id)
+            if current is None:
+                return None
+            state = current.model_dump(mode="json")
+            for _, field, old_value, _, _ in events:
+                state[field] = old_value
+        try:
+            # Audit values are stored as text; validating turns "55000" and "False" back into their types
+            car = Car.model_validate(state)
+        except ValueError:
+            car = state
+        return {
+            "car_id": car_id,
+            "as_of": at,
+            "car": car,
+            "snapshot_history_id": history_id,
+            "replayed_events": len(events),
+        }
+
+    async def insert_booking(self, booking: Booking) -> Optional[int]:
+        """Insert a booking unless it overlaps another booking of the same car.
+
+        The overlap check and the insert are one statement, so two concurrent
+        requests can never both book the same days. Returns the new booking_id,
+        or None when the period is already taken.
+        """
+        start_ord, end_ord = booking.period
+
+        async def op(db):
+            cursor = await db.execute("""
+                INSERT INTO bookings (customer_id, car_id, start_date, end_date, total_price, start_ord, end_ord)
+                SELECT ?, ?, ?, ?, ?, ?, ?
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM bookings
+                    WHERE car_id = ? AND start_ord <= ? AND end_ord >= ?
+                )
             """, (
                 booking.customer_id,
                 booking.car_id,
                 booking.start_date,
                 booking.end_date,
-                booking.total_price
+                booking.total_price,
+                start_ord,
+                end_ord,
+                booking.car_id,
+                end_ord,
+                start_ord
             ))
-            await db.commit()
+            booking_id = cursor.lastrowid if cursor.rowcount else None
+            if booking_id:
+                await self._count_rentals(db, "b.booking_id = ?", (booking_id,), 1)
+                await self._bump_version(db, "bookings")
+            return booking_id
 
-    async def get_customer_with_most_rentals(self) -> dict:
-        async with aiosqlite.connect(self.db_path) as db:
-            cursor = await db.execute("""
-                SELECT customer_id, COUNT(*) as rental_count
-                FROM bookings 
-                GROUP BY customer_id 
-                ORDER BY rental_count DESC 
-                LIMIT 1
+        return await self.pool.write(op)
+
+    async def insert_bookings_many(self, bookings: List[Booking]) -> List[int]:
+        """Insert a batch of bookings in one transaction, skipping overlaps.
+
+        The batch is staged in a temp table so conflicts with existing bookings
+        and with earlier kept rows of the same batch are found by set-based
+        queries instead of one round trip per row; only the rows of cars that
+        clash within the batch are walked in order. Returns the positions (in
+        `bookings`) that were rejected.
+        """
+        async def op(db):
+            await db.execute("""
+                CREATE TEMP TABLE IF NOT EXISTS booking_import (
+                    position INTEGER PRIMARY KEY,
+                    customer_id INTEGER,
+                    car_id INTEGER,
+                    start_date TEXT,
+                    end_date TEXT,
+                    total_price REAL,
+                    start_ord INTEGER,
+                    end_ord INTEGER
+                )
             """)
-            row = await cursor.fetchone()
-            if row:
-                return {"customer_id": row[0], "rental_count": row[1]}
-            return {"message": "No bookings found"}
+            await db.execute("CREATE INDEX IF NOT EXISTS temp.idx_booking_import_period ON booking_import (car_id, start_ord)")
+            await db.execute("DELETE FROM booking_import")
+            await db.executemany("""
+                INSERT INTO booking_import (position, customer_id, car_id, start_date, end_date, total_price, start_ord, end_ord)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, [
+                (i, b.customer_id, b.car_id, b.start_date, b.end_date, b.total_price, *b.period)
+                for i, b in enumerate(bookings)
+            ])
 
-    async def get_most_rented_model(self) -> dict:
-        async with aiosqlite.connect(self.db_path) as db:
-            cursor = await db.execute(f"""
-                SELECT c.model, COUNT(*) as rental_count
-                FROM bookings b
-                JOIN {TABLE_NAME} c ON b.car_id = c.id
-                GROUP BY c.model 
-                ORDER BY rental_count DESC 
-                LIMIT 1
+            # Overlaps with stored bookings first
+            async with db.execute("""
+                SELECT position FROM booking_import i WHERE EXISTS (
+                    SELECT 1 FROM bookings b
+                    WHERE b.car_id = i.car_id AND b.start_ord <= i.end_ord AND b.end_ord >= i.start_ord
+                )
+            """) as cursor:
+                rejected = [row[0] for row in await cursor.fetchall()]
+            await db.executemany("DELETE FROM booking_import WHERE position = ?", [(p,) for p in rejected])
+
+            # Then within the batch: a row loses only to an earlier row that is itself kept, so the
+            # few cars with clashing rows are walked in order rather than rejected wholesale
+            async with db.execute("""
+                SELECT car_id, position, start_ord, end_ord FROM booking_import
+                WHERE car_id IN (
+                    SELECT i.car_id FROM booking_import i JOIN booking_import j
+                    ON j.car_id = i.car_id AND j.position < i.position
+                       AND j.start_ord <= i.end_ord AND j.end_ord >= i.start_ord
+                )
+                ORDER BY car_id, position
+            """) as cursor:
+                clashing = await cursor.fetchall()
+            kept: Dict[int, list] = {}
+            within = []
+            for car_id, position, start_ord, end_ord in clashing:
+                periods = kept.setdefault(car_id, [])
+                if any(start <= end_ord and end >= start_ord for start, end in periods):
+                    within.append(position)
+                else:
+                    periods.append((start_ord, end_ord))
+            await db.executemany("DELETE FROM booking_import WHERE position = ?", [(p,) for p in within])
+            rejected.extend(within)
+
+            async with db.execute("SELECT COALESCE(MAX(booking_id), 0) FROM bookings") as cursor:
+                last_id = (await cursor.fetchone())[0]
+            await db.execute("""
+                INSERT INTO bookings (customer_id, car_id, start_date, end_date, total_price, start_ord, end_ord)
+                SELECT customer_id, car_id, start_date, end_date, total_price, start_ord, end_ord
+                FROM booking_import ORDER BY position
             """)
-            row = await cursor.fetchone()
-            if row:
-                return {"model": row[0], "rental_count": row[1]}
+            # AUTOINCREMENT ids only grow, so the new rows are exactly those past last_id
+            await self._count_rentals(db, "b.booking_id > ?", (last_id,), 1)
+            await db.execute("DELETE FROM booking_import")
+            await self._bump_version(db, "bookings")
+            return sorted(rejected)
+
+        return await self.pool.write(op)
+
+    async def delete_booking(self, booking_id: int) -> int:
+        """Delete one booking and take it off the rental counters in the same transaction."""
+        async def op(db):
+            await self._count_rentals(db, "b.booking_id = ?", (booking_id,), -1)
+            cursor = await db.execute("DELETE FROM bookings WHERE booking_id = ?", (booking_id,))
+            deleted = cursor.rowcount
+            if deleted:
+                await self._bump_version(db, "bookings")
+            return deleted
+
+        return await self.pool.write(op)
+
+    async def rebuild_rental_counts(self) -> dict:
+        """Recompute the rental counters from the bookings table. Returns the row counts."""
+        async with self.pool.writer() as db:
+            for statement in REBUILD_RENTAL_COUNTS:
+                await db.execute(statement)
+            await db.commit()
+            counts = {}
+            for table in ("customer_rentals", "model_rentals"):
+                async with db.execute(f"SELECT COUNT(*) FROM {table}") as cursor:
+                    counts[table] = (await cursor.fetchone())[0]
+        return counts
+
+    async def _top(self, table: str, key: str, k: int) -> List[dict]:
+        # The k-th highest count is found by seeking the count index, then every row at or
+        # above it is read in index order, so ties at the boundary are all included
+        async with self.pool.reader() as db:
+            async with db.execute(f"""
+                SELECT {key}, rental_count FROM {table}
+                WHERE rental_count >= (
+                    SELECT MIN(rental_count) FROM (
+                        SELECT rental_count FROM {table} ORDER BY rental_count DESC LIMIT ?
+                    )
+                )
+                ORDER BY rental_count DESC, {key}
+                LIMIT ?
+            """, (max(1, k), RENTAL_TOP_MAX)) as cursor:
+                rows = await cursor.fetchall()
+        return [{key: row[0], "rental_count": row[1]} for row in rows]
+
+    async def top_customers(self, k: int = 1) -> List[dict]:
+        """Customers with the k highest rental counts, plus anyone tied with the k-th."""
+        return await self._top("customer_rentals", "customer_id", k)
+
+    async def top_models(self, k: int = 1) -> List[dict]:
+        """Car models with the k highest rental counts, plus any tied with the k-th."""
+        return await self._top("model_rentals", "model", k)
+
+    async def get_customer_with_most_rentals(self, k: int = 1) -> dict:
+        ranking = await self.top_customers(k)
+        if not ranking:
+            return {"message": "No bookings found"}
+        return {**ranking[0], "ranking": ranking}
+
+    async def get_most_rented_model(self, k: int = 1) -> dict:
+        ranking = await self.top_models(k)
+        if not ranking:
             return {"message": "No bookings found"}
-    
+        return {**ranking[0], "ranking": ranking}
+
+    async def booking_columns(self, after_id: int = 0, with_cars: bool = True) -> dict:
+        """Raw rows for the analytics snapshot, read in one transaction so they agree with each other.
+
+        Returns the bookings/cars versions, the total booking count, bookings past
+        `after_id` as (booking_id, car_id, start_ord, end_ord, total_price) and, with
+        `with_cars`, every car as (id, model).
+        """
+        async with self.pool.snapshot() as db:
+            async with db.execute("SELECT name, version FROM table_versions") as cursor:
+                versions = dict(await cursor.fetchall())
+            async with db.execute("SELECT COUNT(*) FROM bookings WHERE start_ord IS NOT NULL") as cursor:
+                count = (await cursor.fetchone())[0]
+            async with db.execute("""
+                SELECT booking_id, car_id, start_ord, end_ord, total_price FROM bookings
+                WHERE booking_id > ? AND start_ord IS NOT NULL
+                ORDER BY booking_id
+            """, (after_id,)) as cursor:
+                bookings = await cursor.fetchall()
+            cars = None
+            if with_cars:
+                async with db.execute(f"SELECT id, model FROM {TABLE_NAME} ORDER BY id") as cursor:
+                    cars = await cursor.fetchall()
+        return {
+            "versions": (versions.get("bookings", 0), versions.get(TABLE_NAME, 0)),
+            "count": count,
+            "bookings": bookings,
+            "cars": cars,
+        }
+
     async def list_bookings(self) -> List[Booking]:
-        async with aiosqlite.connect(self.db_path) as db:
-            cursor = await db.execute("SELECT booking_id, customer_id, car_id, start_date, end_date, total_price FROM bookings")
-            rows = await cursor.fetchall()
+        async with self.pool.reader() as db:
+            async with db.execute("SELECT booking_id, customer_id, car_id, start_date, end_date, total_price FROM bookings") as cursor:
+                rows = await cursor.fetchall()
+            # Rows were validated on insert; older free-form dates are returned untouched
             return [
-                Booking(
+                Booking.model_construct(
                     booking_id=row[0],
                     customer_id=row[1],
                     car_id=row[2],
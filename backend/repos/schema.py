@@ -0,0 +1,246 @@
+import aiosqlite
+from datetime import datetime
+from typing import List, Tuple
+from constants import TABLE_NAME
+
+# Recompute the rental counters from bookings; used by migration 6 and Repo.rebuild_rental_counts
+REBUILD_RENTAL_COUNTS: List[str] = [
+    "DELETE FROM customer_rentals",
+    """
+    INSERT INTO customer_rentals (customer_id, rental_count)
+    SELECT customer_id, COUNT(*) FROM bookings
+    WHERE customer_id IS NOT NULL
+    GROUP BY customer_id
+    """,
+    "DELETE FROM model_rentals",
+    f"""
+    INSERT INTO model_rentals (model, rental_count)
+    SELECT c.model, COUNT(*) FROM bookings b
+    JOIN {TABLE_NAME} c ON c.id = b.car_id
+    WHERE c.model IS NOT NULL
+    GROUP BY c.model
+    """,
+]
+
+# A cars row as the JSON object the change feed serves (SQLite stores available as 0/1)
+CAR_STATE_JSON = """
+    json_object(
+        'id', id, 'company', company, 'model', model, 'kms', kms, 'year', year, 'color', color,
+        'available', json(CASE WHEN available THEN 'true' ELSE 'false' END)
+    )
+"""
+
+# Ordered, append-only list of (version, name, statements). Never edit an applied
+# migration; add a new one with the next version number instead.
+MIGRATIONS: List[Tuple[int, str, List[str]]] = [
+    (1, "initial tables", [
+        f"""
+        CREATE TABLE IF NOT EXISTS {TABLE_NAME} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            company VARCHAR(100),
+            model VARCHAR(100),
+            kms INTEGER,
+            year INTEGER,
+            color VARCHAR(100),
+            available BOOLEAN
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS update_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            car_id INTEGER,
+            field TEXT,
+            old_value TEXT,
+            new_value TEXT,
+            updated_by TEXT,
+            timestamp TEXT
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS bookings (
+            booking_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            customer_id INTEGER,
+            car_id INTEGER,
+            start_date TEXT,
+            end_date TEXT,
+            total_price REAL
+        )
+        """,
+    ]),
+    (2, "booking lookup indexes", [
+        "CREATE INDEX IF NOT EXISTS idx_bookings_car_id ON bookings (car_id)",
+        "CREATE INDEX IF NOT EXISTS idx_bookings_customer_id ON bookings (customer_id)",
+    ]),
+    (3, "car listing indexes", [
+        # Every index ends in id so keyset pagination can seek straight to the cursor
+        f"CREATE INDEX IF NOT EXISTS idx_cars_available ON {TABLE_NAME} (available, id)",
+        f"CREATE INDEX IF NOT EXISTS idx_cars_available_year ON {TABLE_NAME} (available, year, id)",
+        f"CREATE INDEX IF NOT EXISTS idx_cars_available_kms ON {TABLE_NAME} (available, kms, id)",
+        f"CREATE INDEX IF NOT EXISTS idx_cars_year ON {TABLE_NAME} (year, id)",
+        f"CREATE INDEX IF NOT EXISTS idx_cars_kms ON {TABLE_NAME} (kms, id)",
+        f"CREATE INDEX IF NOT EXISTS idx_cars_company_model ON {TABLE_NAME} (company COLLATE NOCASE, model COLLATE NOCASE, id)",
+        f"CREATE INDEX IF NOT EXISTS idx_cars_model ON {TABLE_NAME} (model COLLATE NOCASE, id)",
+        f"CREATE INDEX IF NOT EXISTS idx_cars_color ON {TABLE_NAME} (color COLLATE NOCASE, id)",
+    ]),
+    (4, "booking date ordinals", [
+        # Inclusive day ordinals (date.toordinal()) so overlap checks compare integers, not TEXT
+        "ALTER TABLE bookings ADD COLUMN start_ord INTEGER",
+        "ALTER TABLE bookings ADD COLUMN end_ord INTEGER",
+        # julianday('0001-01-01') is 1721425.5 and date(1, 1, 1).toordinal() is 1
+        """
+        UPDATE bookings SET
+            start_ord = CAST(julianday(start_date) - 1721424.5 AS INTEGER),
+            end_ord = CAST(julianday(end_date) - 1721424.5 AS INTEGER)
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_bookings_car_period ON bookings (car_id, start_ord, end_ord)",
+    ]),
+    (5, "table versions", [
+        # Generation counters bumped by every Repo write, so other workers can tell their caches are stale
+        """
+        CREATE TABLE IF NOT EXISTS table_versions (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+        """,
+        f"INSERT OR IGNORE INTO table_versions (name, version) VALUES ('{TABLE_NAME}', 0), ('bookings', 0)",
+    ]),
+    (6, "rental counters", [
+        # Bookings per customer and per car model, kept in step with every booking write so
+        # the top-customer and most-rented-model questions never GROUP BY the whole table
+        """
+        CREATE TABLE IF NOT EXISTS customer_rentals (
+            customer_id INTEGER PRIMARY KEY,
+            rental_count INTEGER NOT NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS model_rentals (
+            model TEXT PRIMARY KEY NOT NULL,
+            rental_count INTEGER NOT NULL
+        ) WITHOUT ROWID
+        """,
+        # Highest count first, ties in key order: a top-K read is one index seek plus K rows
+        "CREATE INDEX IF NOT EXISTS idx_customer_rentals_count ON customer_rentals (rental_count DESC, customer_id)",
+        "CREATE INDEX IF NOT EXISTS idx_model_rentals_count ON model_rentals (rental_count DESC, model)",
+        *REBUILD_RENTAL_COUNTS,
+    ]),
+    (7, "update history indexes and car snapshots", [
+        # id breaks ties between rows of one update, which share a timestamp
+        "CREATE INDEX IF NOT EXISTS idx_update_history_car_time ON update_history (car_id, timestamp, id)",
+        "CREATE INDEX IF NOT EXISTS idx_update_history_time ON update_history (timestamp, id)",
+        # Full car state after audit row history_id (0 = before the car's first audited update),
+        # so rebuilding a past state replays at most HISTORY_SNAPSHOT_EVERY rows
+        """
+        CREATE TABLE IF NOT EXISTS car_snapshots (
+            car_id INTEGER NOT NULL,
+            history_id INTEGER NOT NULL,
+            timestamp TEXT NOT NULL,
+            state TEXT NOT NULL,
+            PRIMARY KEY (car_id, history_id)
+        ) WITHOUT ROWID
+        """,
+    ]),
+    (8, "car change log", [
+        # One row per car write: the car's state afterwards, NULL for a delete. AUTOINCREMENT
+        # keeps seq growing even after compaction removes the newest rows
+        """
+        CREATE TABLE IF NOT EXISTS car_changes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            car_id INTEGER NOT NULL,
+            state TEXT,
+            timestamp TEXT NOT NULL
+        )
+        """,
+        # Finds a car's superseded entries when a new one is logged
+        "CREATE INDEX IF NOT EXISTS idx_car_changes_car ON car_changes (car_id, seq)",
+        # Expired tombstones, without scanning the live entries
+        "CREATE INDEX IF NOT EXISTS idx_car_changes_tombstones ON car_changes (timestamp) WHERE state IS NULL",
+        # Highest seq dropped with an expired tombstone; clients behind it must resync
+        """
+        CREATE TABLE IF NOT EXISTS change_log_horizon (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            seq INTEGER NOT NULL
+        )
+        """,
+        "INSERT OR IGNORE INTO change_log_horizon (id, seq) VALUES (1, 0)",
+        # Existing cars enter the log once, so a client starting from 0 sees the whole fleet
+        f"""
+        INSERT INTO car_changes (car_id, state, timestamp)
+        SELECT id, {CAR_STATE_JSON}, strftime('%Y-%m-%dT%H:%M:%f', 'now') FROM {TABLE_NAME} ORDER BY id
+        """,
+    ]),
+    (9, "car row versions", [
+        # Bumped by every update, for optimistic concurrency (If-Match / expected_version)
+        f"ALTER TABLE {TABLE_NAME} ADD COLUMN row_version INTEGER NOT NULL DEFAULT 1",
+    ]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+# Chat sessions live in their own database file so chat traffic never contends with car writes
+SESSION_MIGRATIONS: List[Tuple[int, str, List[str]]] = [
+    (1, "session tables", [
+        """
+        CREATE TABLE IF NOT EXISTS sessions (
+            id TEXT PRIMARY KEY,
+            user_id TEXT NOT NULL,
+            app_name TEXT,
+            created_at REAL NOT NULL,
+            last_active REAL NOT NULL,
+            event_count INTEGER NOT NULL DEFAULT 0
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_sessions_user ON sessions (user_id, last_active)",
+        "CREATE INDEX IF NOT EXISTS idx_sessions_last_active ON sessions (last_active)",
+        # seq is the event's index within its session, so appends never touch earlier rows
+        """
+        CREATE TABLE IF NOT EXISTS session_events (
+            session_id TEXT NOT NULL,
+            seq INTEGER NOT NULL,
+            event TEXT NOT NULL,
+            PRIMARY KEY (session_id, seq)
+        ) WITHOUT ROWID
+        """,
+    ]),
+]
+
+
+async def current_version(db: aiosqlite.Connection) -> int:
+    """Highest migration version recorded in the database (0 for a fresh file)."""
+    async with db.execute("SELECT MAX(version) FROM schema_migrations") as cursor:
+        row = await cursor.fetchone()
+    return row[0] or 0
+
+
+async def migrate(db: aiosqlite.Connection, migrations: List[Tuple[int, str, List[str]]] = MIGRATIONS) -> int:
+    """Apply every pending migration, each in its own transaction. Returns the resulting version."""
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name TEXT,
+            applied_at TEXT
+        )
+    """)
+    await db.commit()
+
+    version = await current_version(db)
+    for target, name, statements in migrations:
+        if target <= version:
+            continue
+        await db.execute("BEGIN IMMEDIATE")
+        try:
+            # Another worker may have migrated while we waited for the write lock
+            if await current_version(db) >= target:
+                await db.rollback()
+                continue
+            for statement in statements:
+                await db.execute(statement)
+            await db.execute(
+                "INSERT INTO schema_migrations (version, name, applied_at) VALUES (?, ?, ?)",
+                (target, name, datetime.utcnow().isoformat())
+            )
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+    return await current_version(db)
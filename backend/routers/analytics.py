@@ -0,0 +1,37 @@
+from fastapi import APIRouter, Query
+from typing import Literal, Optional
+from datetime import date
+from services.service import Service
+from repos.repo import Repo
+from constants import DB_NAME, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+
+router = APIRouter()
+repo = Repo(DB_NAME)
+service = Service(repo)
+
+@router.get("/utilization")
+async def get_utilization(
+    start: date = Query(..., description="First day of the window (YYYY-MM-DD)"),
+    end: date = Query(..., description="Last day of the window (YYYY-MM-DD), inclusive"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
+):
+    """Fleet utilization and the busiest cars between start and end"""
+    return await service.get_utilization(start, end, limit)
+
+@router.get("/revenue")
+async def get_revenue(
+    start: date = Query(..., description="First day of the window (YYYY-MM-DD)"),
+    end: date = Query(..., description="Last day of the window (YYYY-MM-DD), inclusive"),
+    period: Literal["day", "week", "month"] = Query("day"),
+    model: Optional[str] = Query(None, description="Only this car model (case-insensitive)")
+):
+    """Revenue per car model per day, week or month, by booking start date"""
+    return await service.get_revenue(start, end, period, model)
+
+@router.get("/booking_length")
+async def get_booking_length(
+    start: date = Query(..., description="First day of the window (YYYY-MM-DD)"),
+    end: date = Query(..., description="Last day of the window (YYYY-MM-DD), inclusive")
+):
+    """Average booking length, overall and per model, for bookings starting between start and end"""
+    return await service.get_booking_length(start, end)
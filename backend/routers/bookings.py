@@ -0,0 +1,25 @@
+from fastapi import APIRouter, status, Depends, Request
+from services.service import Service
+from services.importer import iter_records
+from repos.repo import Repo
+from constants import DB_NAME
+
+router = APIRouter()
+repo = Repo(DB_NAME)
+service = Service(repo)
+
+async def unit_of_work():
+    """Run the request's reads and writes in one transaction, committed before the response is sent"""
+    async with repo.unit_of_work():
+        yield
+
+@router.post("/bulk", status_code=status.HTTP_200_OK)
+async def import_bookings(request: Request):
+    """Bulk-import bookings from an NDJSON (default) or CSV (Content-Type: text/csv) body"""
+    records = iter_records(request.stream(), request.headers.get("content-type", ""))
+    return await service.import_bookings(records)
+
+@router.delete("/{booking_id}", status_code=status.HTTP_200_OK, dependencies=[Depends(unit_of_work, scope="function")])
+async def delete_booking(booking_id: int):
+    """Delete a booking"""
+    return await service.delete_booking(booking_id)
@@ -1,31 +1,125 @@
-from fastapi import APIRouter, status, Body
-from typing import List
-from models.data_models import Car
+from fastapi import APIRouter, status, Body, Depends, Header, Query, Request, Response
+from typing import List, Optional
+from datetime import date
+from models.data_models import Car, CarFilter, CarPatch
 from services.service import Service
+from services.importer import iter_records
+from services.serialization import FastJSONResponse, stream_json, wants_ndjson
+from services.http_cache import json_response, listing_etag, not_modified, if_match_version, version_etag
 from repos.repo import Repo
-from constants import DB_NAME
+from constants import DB_NAME, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 import logging
 
 router = APIRouter()
 repo = Repo(DB_NAME)
 service = Service(repo)
 
-@router.post("/", status_code=status.HTTP_201_CREATED)
+async def unit_of_work():
+    """Run the request's reads and writes in one transaction, committed before the response is sent"""
+    async with repo.unit_of_work():
+        yield
+
+# Bulk imports stay out of it: they commit chunk by chunk rather than holding the writer for the whole upload
+in_unit = [Depends(unit_of_work, scope="function")]
+
+@router.post("/", status_code=status.HTTP_201_CREATED, dependencies=in_unit)
 async def create_car(car: Car = Body(...)):
     """Create a new car record"""
     return await service.create_car(car)
 
-@router.put("/{car_id}", status_code=status.HTTP_200_OK)
-async def update_car(car_id: str, car: Car):
-    """Update an existing car record"""
-    return await service.update_car(car_id, car)
+@router.post("/bulk", status_code=status.HTTP_200_OK)
+async def import_cars(request: Request):
+    """Bulk-import cars from an NDJSON (default) or CSV (Content-Type: text/csv) body"""
+    records = iter_records(request.stream(), request.headers.get("content-type", ""))
+    return await service.import_cars(records)
+
+@router.put("/{car_id}", status_code=status.HTTP_200_OK, dependencies=in_unit)
+async def update_car(car_id: str, car: Car, if_match: Optional[str] = Header(None)):
+    """Update an existing car record; with If-Match: "<row_version>" only if it is still at that version"""
+    return await service.update_car(car_id, car, if_match_version(if_match))
 
-@router.delete("/{car_id}", status_code=status.HTTP_200_OK)
+@router.patch("/{car_id}", status_code=status.HTTP_200_OK, dependencies=in_unit)
+async def patch_car(car_id: str, patch: CarPatch, if_match: Optional[str] = Header(None)):
+    """Change only the given fields; with If-Match: "<row_version>" only if the car is still at that version"""
+    result = await service.patch_car(car_id, patch.fields(), if_match_version(if_match))
+    return FastJSONResponse(result, headers={"ETag": version_etag(result["row_version"])})
+
+@router.delete("/{car_id}", status_code=status.HTTP_200_OK, dependencies=in_unit)
 async def delete_car(car_id: str):
     """Delete a car record"""
     return await service.delete_car(car_id)
 
 @router.get("/", response_model=List[Car])
-async def get_all_cars():
-    """Retrieve all cars"""
-    return await service.get_all_cars()
+async def get_all_cars(
+    request: Request,
+    filters: CarFilter = Depends(),
+    sort: str = Query("id", description="id, year, kms, company or model; prefix with '-' for descending"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="Value of X-Next-Cursor from the previous page")
+):
+    """Retrieve one page of cars, filtered and sorted in SQL; 304 if If-None-Match is still current"""
+    # Versions are read before the page, so a write in between only costs the client a refetch
+    etag = listing_etag(request, await service.listing_versions())
+    unchanged = not_modified(request, etag)
+    if unchanged:
+        return unchanged
+    cars, next_cursor = await service.list_cars(filters, sort, limit, cursor)
+    # Rows come straight from the database, so skip response_model re-validation
+    return json_response(request, cars, etag, {"X-Next-Cursor": next_cursor} if next_cursor else None)
+
+@router.get("/export", response_model=List[Car])
+async def export_cars(
+    request: Request,
+    filters: CarFilter = Depends(),
+    sort: str = Query("id", description="id, year, kms, company or model; prefix with '-' for descending")
+):
+    """Stream every matching car as one JSON array, or as NDJSON with Accept: application/x-ndjson"""
+    batches = service.export_cars(filters, sort)
+    return stream_json(batches, ndjson=wants_ndjson(request.headers.get("accept", "")))
+
+
+@router.get("/available", response_model=List[Car])
+async def get_free_cars(
+    request: Request,
+    start: date = Query(..., description="First day of the rental (YYYY-MM-DD)"),
+    end: date = Query(..., description="Last day of the rental (YYYY-MM-DD), inclusive"),
+    filters: CarFilter = Depends(),
+    sort: str = Query("id", description="id, year, kms, company or model; prefix with '-' for descending"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="Value of X-Next-Cursor from the previous page")
+):
+    """Retrieve cars with no booking overlapping start..end; 304 if If-None-Match is still current"""
+    etag = listing_etag(request, await service.listing_versions(with_bookings=True))
+    unchanged = not_modified(request, etag)
+    if unchanged:
+        return unchanged
+    cars, next_cursor = await service.list_free_cars(start, end, filters, sort, limit, cursor)
+    return json_response(request, cars, etag, {"X-Next-Cursor": next_cursor} if next_cursor else None)
+
+@router.get("/{car_id}", response_model=Car)
+async def get_car(car_id: int):
+    """Retrieve one car; its ETag is the row_version to send back in If-Match"""
+    car, row_version = await service.get_car(car_id)
+    return FastJSONResponse(car, headers={"ETag": version_etag(row_version)})
+
+@router.get("/{car_id}/history")
+async def get_car_history(
+    car_id: int,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="Value of X-Next-Cursor from the previous page")
+):
+    """Retrieve one page of a car's change history, newest first"""
+    history, next_cursor = await service.get_car_history(car_id, limit, cursor)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return history
+
+
+@router.get("/{car_id}/as_of")
+async def get_car_as_of(
+    car_id: int,
+    at: str = Query(..., description="ISO date or timestamp (UTC); a bare date means the end of that day")
+):
+    """Reconstruct a car's fields as they were at a point in time"""
+    return await service.get_car_as_of(car_id, at)
@@ -0,0 +1,48 @@
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from typing import Optional
+from services.service import Service
+from services.serialization import FastJSONResponse, dumps
+from repos.repo import Repo
+from constants import DB_NAME, MAX_PAGE_SIZE, MAX_CHANGE_WAIT
+
+router = APIRouter()
+repo = Repo(DB_NAME)
+service = Service(repo)
+
+@router.get("")
+async def get_changes(
+    since: int = Query(0, ge=0, description="Last seq applied; 0 for a client with no cars yet"),
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    wait: float = Query(0, ge=0, le=MAX_CHANGE_WAIT, description="Long-poll: seconds to wait for a change")
+):
+    """Car upserts and deletes after `since`, oldest first; resume from `next`. 410 means resync from 0"""
+    return FastJSONResponse(await service.get_changes(since, limit, wait))
+
+@router.get("/stream")
+async def stream_changes(
+    since: int = Query(0, ge=0, description="Last seq applied; 0 for a client with no cars yet"),
+    last_event_id: Optional[str] = Header(None, description="Sent by EventSource on reconnect; overrides since")
+):
+    """Server-Sent Events: one `data:` event per change (its `id:` is the seq), keep-alive comments while idle"""
+    if last_event_id and last_event_id.isdigit():
+        since = int(last_event_id)
+    # Read the first page before streaming, so a 410 is still a proper status code
+    feed = await service.get_changes(since)
+
+    async def events():
+        try:
+            async for page in service.follow_changes(feed):
+                if not page["changes"]:
+                    yield b": keep-alive\n\n"
+                for change in page["changes"]:
+                    yield b"id: %d\ndata: " % change["seq"] + dumps(change) + b"\n\n"
+        except HTTPException as e:
+            # Fell behind the compaction horizon mid-stream
+            yield b"event: reset\ndata: " + dumps({"detail": e.detail}) + b"\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
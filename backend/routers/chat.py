@@ -1,6 +1,13 @@
 from fastapi import APIRouter, HTTPException
+from routers import sessions
+from services.sessions import session_store
+from agent.registry import tool_registry
+from services.serialization import to_jsonable
+from services.service import Service
+from repos.repo import Repo
+from models.data_models import Booking, Car, CarFilter, CarPatch
+from constants import DB_NAME
 from typing import List, Dict, Any
-import uuid
 import google.generativeai as genai
 import os
 import re
@@ -11,157 +18,79 @@ genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
 
 router = APIRouter()
 
-# Simple in-memory storage for sessions
-sessions_store: Dict[str, Dict] = {}
+# Session endpoints are shared by every chat router
+router.include_router(sessions.router)
 
-@router.get("/apps/{app_name}/users/{user_id}/sessions")
-async def get_sessions(app_name: str, user_id: str):
-    """Get all sessions for a user"""
-    user_sessions = [{"id": session_id, "events": session["events"]} 
-                    for session_id, session in sessions_store.items()]
-    return user_sessions
+# Define tools for the AI; they share the pooled repo like the REST routers
+repo = Repo(DB_NAME)
+service = Service(repo)
 
-@router.post("/apps/{app_name}/users/{user_id}/sessions")
-async def create_session(app_name: str, user_id: str):
-    """Create a new chat session"""
-    session_id = str(uuid.uuid4())[:8]
-    sessions_store[session_id] = {
-        "id": session_id,
-        "events": []
-    }
-    return {"id": session_id}
-
-@router.get("/apps/{app_name}/users/{user_id}/sessions/{session_id}")
-async def get_session(app_name: str, user_id: str, session_id: str):
-    """Get a specific session"""
-    if session_id not in sessions_store:
-        raise HTTPException(status_code=404, detail="Session not found")
-    return sessions_store[session_id]
-
-@router.delete("/apps/{app_name}/users/{user_id}/sessions/{session_id}")
-async def delete_session(app_name: str, user_id: str, session_id: str):
-    """Delete a session"""
-    if session_id not in sessions_store:
-        raise HTTPException(status_code=404, detail="Session not found")
-    del sessions_store[session_id]
-    return {"message": "Session deleted"}
-
-# Define tools for the AI
-async def get_all_cars_tool():
-    """Get all cars from the database"""
-    from services.service import Service
-    from repos.repo import Repo
-    from constants import DB_NAME
-    
-    repo = Repo(DB_NAME)
-    service = Service(repo)
-    cars = await service.get_all_cars()
-    return [{"company": car.company, "model": car.model, "year": car.year, 
-             "color": car.color, "kms": car.kms, "available": car.available} for car in cars]
+async def get_all_cars_tool(**filters):
+    """Get cars from the database, filtered in SQL by any CarFilter field"""
+    cars, _ = await service.list_cars(CarFilter(**filters))
+    return to_jsonable(cars)
 
 async def get_available_cars_tool():
     """Get only available cars from the database"""
-    cars = await get_all_cars_tool()
-    return [car for car in cars if car["available"] == True]
+    return await get_all_cars_tool(available=True)
 
 async def get_all_bookings_tool():
     """Get all bookings from the database"""
-    from services.service import Service
-    from repos.repo import Repo
-    from constants import DB_NAME
-    
-    repo = Repo(DB_NAME)
-    service = Service(repo)
     bookings = await service.get_all_bookings()
     return [{"booking_id": b.booking_id, "customer_id": b.customer_id, "car_id": b.car_id, 
              "start_date": b.start_date, "end_date": b.end_date, "total_price": b.total_price} for b in bookings]
 
 async def add_car_tool(company: str, model: str, year: int, color: str, kms: int, available: bool = True):
     """Add a new car to the database"""
-    from services.service import Service
-    from repos.repo import Repo
-    from constants import DB_NAME
-    from models.data_models import Car
-    
-    repo = Repo(DB_NAME)
-    service = Service(repo)
     car = Car(company=company, model=model, year=year, color=color, kms=kms, available=available)
     await service.create_car(car)
     return f"Added {company} {model} successfully"
 
 async def update_car_tool(car_id: str, **updates):
     """Update a car in the database"""
-    from services.service import Service
-    from repos.repo import Repo
-    from constants import DB_NAME
-    from models.data_models import Car
-    
-    repo = Repo(DB_NAME)
-    service = Service(repo)
-    
-    # Get existing car
-    existing_car = await repo.get(car_id)
-    if not existing_car:
-        return f"Car with ID {car_id} not found"
-    
-    # Update only provided fields
-    updated_car = Car(
-        id=car_id,
-        company=updates.get('company', existing_car.company),
-        model=updates.get('model', existing_car.model),
-        year=updates.get('year', existing_car.year),
-        color=updates.get('color', existing_car.color),
-        kms=updates.get('kms', existing_car.kms),
-        available=updates.get('available', existing_car.available)
-    )
-    
-    await service.update_car(car_id, updated_car)
+    # Only the provided fields are sent; the database keeps the rest
+    try:
+        result = await service.patch_car(car_id, CarPatch(**updates).fields())
+    except HTTPException as e:
+        if e.status_code == 404:
+            return f"Car with ID {car_id} not found"
+        raise
+    updated_car = result["car"]
     return f"Updated {updated_car.company} {updated_car.model} successfully"
 
 async def delete_car_tool(car_id: str):
     """Delete a car from the database"""
-    from services.service import Service
-    from repos.repo import Repo
-    from constants import DB_NAME
-    
-    repo = Repo(DB_NAME)
-    service = Service(repo)
-    
-    # Get car details before deletion
-    existing_car = await repo.get(car_id)
-    if not existing_car:
-        return f"Car with ID {car_id} not found"
-    
-    await service.delete_car(car_id)
+    # The lookup and the delete commit together, so the name reported is the car deleted
+    async with repo.unit_of_work():
+        existing_car = await repo.get(car_id)
+        if not existing_car:
+            return f"Car with ID {car_id} not found"
+        await service.delete_car(car_id)
     return f"Deleted {existing_car.company} {existing_car.model} successfully"
 
 async def create_booking_tool(car_id: str, start_date: str, end_date: str, price: float = None, customer_id: int = 1):
     """Create a booking for a car"""
-    from services.service import Service
-    from repos.repo import Repo
-    from constants import DB_NAME
-    from models.data_models import Booking
-    
-    repo = Repo(DB_NAME)
-    service = Service(repo)
-    
-    # Check if car exists and is available
-    existing_car = await repo.get(car_id)
-    if not existing_car:
-        return f"Car with ID {car_id} not found"
-    
-    if not existing_car.available:
-        return f"Car {existing_car.company} {existing_car.model} is not available for booking"
-    
-    booking = Booking(
-        customer_id=customer_id,
-        car_id=int(car_id),
-        start_date=start_date,
-        end_date=end_date,
-        total_price=price
-    )
-    
-    await service.create_booking(booking)
+    # The availability check and the booking commit together
+    async with repo.unit_of_work():
+        existing_car = await repo.get(car_id)
+        if not existing_car:
+            return f"Car with ID {car_id} not found"
+        
+        if not existing_car.available:
+            return f"Car {existing_car.company} {existing_car.model} is not available for booking"
+        
+        booking = Booking(
+            customer_id=customer_id,
+            car_id=int(car_id),
+            start_date=start_date,
+            end_date=end_date,
+            total_price=price
+        )
+        
+        try:
+            await service.create_booking(booking)
+        except HTTPException as e:
+            return f"Could not book {existing_car.company} {existing_car.model}: {e.detail}"
     return f"Booking created for {existing_car.company} {existing_car.model} from {start_date} to {end_date} at ${price}"
 
 @router.post("/run_sse")
@@ -171,13 +100,10 @@ async def chat_with_ai(payload: Dict[str, Any]):
         session_id = payload.get("sessionId")
         new_message = payload.get("newMessage")
         
-        if session_id not in sessions_store:
-            sessions_store[session_id] = {"id": session_id, "events": []}
+        user_id = payload.get("userId", "user")
         
-        # Add user message to session
-        sessions_store[session_id]["events"].append({
-            "content": new_message
-        })
+        # Add user message to session (created on first use)
+        await session_store.append(session_id, {"content": new_message}, user_id, payload.get("appName", ""))
         
         # Extract text from message parts
         user_text = ""
@@ -206,7 +132,7 @@ async def chat_with_ai(payload: Dict[str, Any]):
             # Interactive booking creation
             cars = await get_all_cars_tool()
             if cars:
-                available_cars = [car for car in cars if car['available']]
+                available_cars = await get_available_cars_tool()
                 if available_cars:
                     car_list = "\n".join([f"• Car {i+1}: {car['company']} {car['model']} ({car['year']}) - ${car['kms']/10:.0f}/day" for i, car in enumerate(available_cars)])
                     response_text = f"🚗 **Let's create a booking!**\n\n**Available Cars:**\n{car_list}\n\n📝 **Please provide:**\n• Which car? (e.g., 'Car 1')\n• Start date? (YYYY-MM-DD)\n• End date? (YYYY-MM-DD)\n• Customer ID? (e.g., 101)\n\n*Example: 'Book Car 1 from 2024-12-20 to 2024-12-25 for customer 101'*"
@@ -249,33 +175,29 @@ async def chat_with_ai(payload: Dict[str, Any]):
                 response_text = "No bookings found. Your agent can create bookings when API quota is available!"
         
         elif "customer" in user_lower and "most" in user_lower:
-            from agent.tools import get_customer_with_most_rentals
             try:
-                result = await get_customer_with_most_rentals()
+                result = await tool_registry.get("get_customer_with_most_rentals")()
                 response_text = f"🏆 **get_customer_with_most_rentals():**\n\n{result}\n\n*Analytics tool working!*"
             except Exception as e:
                 response_text = f"get_customer_with_most_rentals: {e}"
         
         elif "most rented" in user_lower or "popular model" in user_lower:
-            from agent.tools import get_most_rented_model
             try:
-                result = await get_most_rented_model()
+                result = await tool_registry.get("get_most_rented_model")()
                 response_text = f"🚗 **get_most_rented_model():**\n\n{result}\n\n*Analytics tool working!*"
             except Exception as e:
                 response_text = f"get_most_rented_model: {e}"
         
         elif "last updated" in user_lower:
-            from agent.tools import get_last_updated_car
             try:
-                result = await get_last_updated_car()
+                result = await tool_registry.get("get_last_updated_car")()
                 response_text = f"🔄 **get_last_updated_car():**\n\n{result}\n\n*Audit tool working!*"
             except Exception as e:
                 response_text = f"get_last_updated_car: {e}"
         
         elif "introduce booking" in user_lower:
-            from agent.tools import introduce_booking_model
             try:
-                result = await introduce_booking_model()
+                result = await tool_registry.get("introduce_booking_model")()
                 response_text = f"📊 **introduce_booking_model():**\n\n{result}\n\n*Setup tool executed!*"
             except Exception as e:
                 response_text = f"introduce_booking_model: {e}"
@@ -301,9 +223,7 @@ async def chat_with_ai(payload: Dict[str, Any]):
         }
         
         # Add AI response to session
-        sessions_store[session_id]["events"].append({
-            "content": ai_response
-        })
+        await session_store.append(session_id, {"content": ai_response}, user_id)
         
         return {"content": ai_response}
         
@@ -1,6 +1,12 @@
-from fastapi import APIRouter, HTTPException
-from typing import List, Dict, Any
-import uuid
+from fastapi import APIRouter, Request
+from routers import sessions
+from services.sessions import session_store
+from services.intents import plan, extract_entities
+from services.streaming import chat_response, chunked_text, function_call_event, function_response_event, text_event
+from agent.registry import tool_registry
+from constants import CHAT_TURN_BUDGET
+from typing import AsyncIterator, List, Dict, Any
+import asyncio
 import os
 import google.generativeai as genai
 from dotenv import load_dotenv
@@ -10,138 +16,185 @@ genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
 
 router = APIRouter()
 
-# Simple in-memory storage for sessions
-sessions_store: Dict[str, Dict] = {}
-
-@router.get("/apps/{app_name}/users/{user_id}/sessions")
-async def get_sessions(app_name: str, user_id: str):
-    """Get all sessions for a user"""
-    user_sessions = [{"id": session_id, "events": session["events"]} 
-                    for session_id, session in sessions_store.items()]
-    return user_sessions
-
-@router.post("/apps/{app_name}/users/{user_id}/sessions")
-async def create_session(app_name: str, user_id: str):
-    """Create a new chat session"""
-    session_id = str(uuid.uuid4())[:8]
-    sessions_store[session_id] = {
-        "id": session_id,
-        "events": []
-    }
-    return {"id": session_id}
-
-@router.get("/apps/{app_name}/users/{user_id}/sessions/{session_id}")
-async def get_session(app_name: str, user_id: str, session_id: str):
-    """Get a specific session"""
-    if session_id not in sessions_store:
-        raise HTTPException(status_code=404, detail="Session not found")
-    return sessions_store[session_id]
-
-@router.delete("/apps/{app_name}/users/{user_id}/sessions/{session_id}")
-async def delete_session(app_name: str, user_id: str, session_id: str):
-    """Delete a session"""
-    if session_id not in sessions_store:
-        raise HTTPException(status_code=404, detail="Session not found")
-    del sessions_store[session_id]
-    return {"message": "Session deleted"}
-
-# Define function schemas for Gemini
-function_declarations = [
-    {
-        "name": "get_cars",
-        "description": "Get all cars from the database",
-        "parameters": {
-            "type": "object",
-            "properties": {},
-            "required": []
-        }
-    },
-    {
-        "name": "create_booking",
-        "description": "Create a new car booking",
-        "parameters": {
-            "type": "object",
-            "properties": {
-                "customer_id": {"type": "integer", "description": "Customer ID"},
-                "car_id": {"type": "integer", "description": "Car ID to book"},
-                "start_date": {"type": "string", "description": "Start date (YYYY-MM-DD)"},
-                "end_date": {"type": "string", "description": "End date (YYYY-MM-DD)"},
-                "total_price": {"type": "number", "description": "Total booking price"}
-            },
-            "required": ["customer_id", "car_id", "start_date", "end_date", "total_price"]
-        }
-    },
-    {
-        "name": "get_customer_with_most_rentals",
-        "description": "Get the customer who has rented the most cars",
-        "parameters": {
-            "type": "object",
-            "properties": {},
-            "required": []
-        }
-    },
-    {
-        "name": "get_most_rented_model",
-        "description": "Get the car model that is rented most often",
-        "parameters": {
-            "type": "object",
-            "properties": {},
-            "required": []
-        }
-    }
-]
-
-# Function implementations
+# Session endpoints are shared by every chat router
+router.include_router(sessions.router)
+
+# Gemini function schemas, generated from the signatures in agent/tools.py
+function_declarations = tool_registry.function_declarations()
+
 async def execute_function(function_name: str, parameters: dict):
     """Execute the requested function with parameters"""
+    return await tool_registry.execute(function_name, parameters)
+
+def _tool_summary(result: dict) -> dict:
+    """What the functionResponse event reports; car lists follow as streamed text instead."""
+    if "error" in result:
+        return result
+    value = result["result"]
+    if isinstance(value, dict) and "cars" in value:
+        return {"count": len(value["cars"]), "next_cursor": value.get("next_cursor")}
+    return value
+
+async def call_tool(name: str, parameters: dict, results: list) -> AsyncIterator[dict]:
+    """Yield progress events around a tool call and append its result to `results`."""
+    yield function_call_event(name, parameters)
+    result = await execute_function(name, parameters)
+    results.append(result)
+    yield function_response_event(name, _tool_summary(result))
+
+async def reply_list_cars(user_text: str) -> AsyncIterator[dict]:
+    results = []
+    async for event in call_tool("get_cars", {}, results):
+        yield event
+    cars = results[0].get("result", {}).get("cars", [])
+    if not cars:
+        yield text_event("No cars found in the system.")
+        return
+    car_lines = [f"• {car['company']} {car['model']} ({car['year']}) - {car['color']}, {car['kms']} km, Available: {'Yes' if car['available'] else 'No'}" for car in cars]
+    async for event in chunked_text("🚗 **Available Cars:**\n", car_lines, "\n\nWhich car would you like to book?"):
+        yield event
+
+async def reply_start_booking(user_text: str) -> AsyncIterator[dict]:
+    # "Make a booking for customer 101 ..." with every detail given books straight away
+    if _has_booking_details(extract_entities(user_text)):
+        async for event in reply_book_car(user_text):
+            yield event
+        return
+    results = []
+    async for event in call_tool("get_cars", {"available": True}, results):
+        yield event
+    available_cars = results[0].get("result", {}).get("cars", [])
+    if not available_cars:
+        yield text_event("Sorry, no cars are currently available for booking.")
+        return
+    car_lines = [f"• Car {car['id']}: {car['company']} {car['model']} ({car['year']})" for car in available_cars]
+    async for event in chunked_text(
+        "📅 **Let's create a booking!**\n\n**Available Cars:**",
+        car_lines,
+        "\n\n📝 **Please tell me:**\n• Which car? (e.g., 'Car 1')\n• Customer ID? (e.g., 101)\n• Start date? (YYYY-MM-DD)\n• End date? (YYYY-MM-DD)\n• Total price? (e.g., 500)\n\n*Example: 'Book Car 1 for customer 101 from 2024-12-20 to 2024-12-25 for $500'*"
+    ):
+        yield event
+
+def _has_booking_details(entities: dict) -> bool:
+    return (entities["customer_id"] is not None and entities["car_id"] is not None
+            and entities["total_price"] is not None and len(entities["dates"]) >= 2)
+
+async def reply_book_car(user_text: str) -> AsyncIterator[dict]:
+    entities = extract_entities(user_text)
+    if not _has_booking_details(entities):
+        yield text_event("I need more details to create a booking. Please provide customer ID, car ID, start date (YYYY-MM-DD), end date (YYYY-MM-DD), and total price.")
+        return
+    results = []
+    async for event in call_tool("create_booking", {
+        "customer_id": entities["customer_id"],
+        "car_id": entities["car_id"],
+        "start_date": entities["dates"][0],
+        "end_date": entities["dates"][1],
+        "total_price": entities["total_price"]
+    }, results):
+        yield event
+    result = results[0]
+    if "error" in result:
+        yield text_event(f"❌ **Booking not created:** {result['error']}")
+        return
+    booking = result["result"]
+    yield text_event(f"✅ **Booking Created Successfully!**\n\n• Booking ID: {booking['booking_id']}\n• Car {booking['car_id']} for customer {booking['customer_id']}\n• {booking['start_date']} to {booking['end_date']}\n• Total: ${booking['total_price']}")
+
+async def reply_top_customer(user_text: str) -> AsyncIterator[dict]:
+    results = []
+    async for event in call_tool("get_customer_with_most_rentals", {}, results):
+        yield event
+    yield text_event(f"🏆 **Top Customer Analytics:**\n\n{results[0].get('result', results[0])}")
+
+async def reply_most_rented_model(user_text: str) -> AsyncIterator[dict]:
+    results = []
+    async for event in call_tool("get_most_rented_model", {}, results):
+        yield event
+    yield text_event(f"🚗 **Most Popular Car Model:**\n\n{results[0].get('result', results[0])}")
+
+async def reply_greeting(user_text: str) -> AsyncIterator[dict]:
+    yield text_event("👋 **Hello! I'm your intelligent car management assistant!**\n\n🤖 **I can help you with:**\n• 'Show me all cars' - View available vehicles\n• 'Create a booking' - Make a reservation\n• 'Who is our top customer?' - Customer analytics\n• 'What's the most popular car?' - Vehicle analytics\n• Several at once: 'Show cars and our top customer'\n\n*Just ask me naturally - I understand conversational language!*")
+
+async def reply_unknown(user_text: str) -> AsyncIterator[dict]:
+    yield text_event(f"🤖 **I understand you said:** '{user_text}'\n\nI can help you with:\n• Viewing cars: 'show me all cars'\n• Creating bookings: 'I want to make a booking'\n• Analytics: 'who is our top customer?' or 'what's the most popular car?'\n\n*Ask me anything about car management!*")
+
+# One reply per intent name from services.intents.INTENTS; each yields chat events, the last one complete
+INTENT_HANDLERS = {
+    "list_cars": reply_list_cars,
+    "start_booking": reply_start_booking,
+    "book_car": reply_book_car,
+    "top_customer": reply_top_customer,
+    "most_rented_model": reply_most_rented_model,
+    "greeting": reply_greeting,
+}
+
+async def _collect(name: str, user_text: str) -> List[dict]:
+    return [event async for event in INTENT_HANDLERS[name](user_text)]
+
+def _final_text(events: List[dict]) -> str:
+    return "".join(part.get("text", "") for part in events[-1]["content"]["parts"]) if events else ""
+
+async def compound_events(intents: List[str], user_text: str, budget: float = CHAT_TURN_BUDGET) -> AsyncIterator[dict]:
+    """Answer several intents in one turn: their handlers run concurrently, each one's tool
+    events are relayed as it finishes, then one reply joins the answers in the order asked.
+
+    Handlers still running after `budget` seconds (or when the client goes away) are cancelled.
+    """
+    tasks = {asyncio.create_task(_collect(name, user_text)): name for name in intents}
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + budget
+    pending = set(tasks)
     try:
-        if function_name == "get_cars":
-            from agent.tools import get_cars
-            result = await get_cars()
-            return {"cars": [{"company": car.company, "model": car.model, "year": car.year, 
-                           "color": car.color, "kms": car.kms, "available": car.available} for car in result]}
-        
-        elif function_name == "create_booking":
-            from agent.tools import create_booking
-            result = await create_booking(
-                parameters["customer_id"],
-                parameters["car_id"], 
-                parameters["start_date"],
-                parameters["end_date"],
-                parameters["total_price"]
-            )
-            return {"result": str(result)}
-        
-        elif function_name == "get_customer_with_most_rentals":
-            from agent.tools import get_customer_with_most_rentals
-            result = await get_customer_with_most_rentals()
-            return {"result": str(result)}
-        
-        elif function_name == "get_most_rented_model":
-            from agent.tools import get_most_rented_model
-            result = await get_most_rented_model()
-            return {"result": str(result)}
-        
+        while pending:
+            done, pending = await asyncio.wait(pending, timeout=max(0.0, deadline - loop.time()), return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                break
+            for task in done:
+                if task.exception() is None:
+                    # Partial text is superseded by the combined reply; tool calls and responses are not
+                    for event in task.result()[:-1]:
+                        if not event.get("partial"):
+                            yield event
+    finally:
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    answers = []
+    for task, name in tasks.items():
+        if task in pending:
+            answers.append(f"⏱️ **{name.replace('_', ' ').capitalize()}:** this part took longer than {budget:g}s, please ask again.")
+        elif task.exception() is not None:
+            answers.append(f"Sorry, I couldn't answer the {name.replace('_', ' ')} part: {task.exception()}")
+        else:
+            answers.append(_final_text(task.result()))
+    yield text_event("\n\n".join(answers))
+
+async def chat_events(user_text: str) -> AsyncIterator[dict]:
+    try:
+        intents = plan(user_text)
+        if len(intents) > 1:
+            events = compound_events(intents, user_text)
         else:
-            return {"error": f"Unknown function: {function_name}"}
-    
+            events = INTENT_HANDLERS.get(intents[0], reply_unknown)(user_text)
+        async for event in events:
+            yield event
     except Exception as e:
-        return {"error": f"Function execution failed: {str(e)}"}
+        import traceback
+        error_details = traceback.format_exc()
+        yield text_event(f"Sorry, I encountered an error: {str(e)}\n\nDetails: {error_details}")
 
 @router.post("/run_sse")
-async def chat_with_ai(payload: Dict[str, Any]):
-    """Handle chat messages with Gemini Function Calling"""
+async def chat_with_ai(payload: Dict[str, Any], request: Request):
+    """Handle chat messages with Gemini Function Calling; streams events for Accept: text/event-stream"""
     try:
         session_id = payload.get("sessionId")
         new_message = payload.get("newMessage")
         
-        if session_id not in sessions_store:
-            sessions_store[session_id] = {"id": session_id, "events": []}
+        user_id = payload.get("userId", "user")
         
-        # Add user message to session
-        sessions_store[session_id]["events"].append({
-            "content": new_message
-        })
+        # Add user message to session (created on first use)
+        await session_store.append(session_id, {"content": new_message}, user_id, payload.get("appName", ""))
         
         # Extract text from message parts
         user_text = ""
@@ -152,87 +205,15 @@ async def chat_with_ai(payload: Dict[str, Any]):
         if not user_text:
             user_text = "Hello"
         
-        # Intelligent Agent with Natural Language Processing
-        user_lower = user_text.lower()
-        
-        # Smart pattern matching for natural language
-        if any(word in user_lower for word in ["show", "list", "see", "view"]) and "car" in user_lower:
-            result = await execute_function("get_cars", {})
-            cars = result.get("cars", [])
-            if cars:
-                car_list = "\n".join([f"• {car['company']} {car['model']} ({car['year']}) - {car['color']}, {car['kms']} km, Available: {'Yes' if car['available'] else 'No'}" for car in cars])
-                response_text = f"🚗 **Available Cars:**\n\n{car_list}\n\nWhich car would you like to book?"
-            else:
-                response_text = "No cars found in the system."
+        async def save_reply(event: dict):
+            # Add AI response to session
+            await session_store.append(session_id, {"content": event["content"]}, user_id)
         
-        elif any(word in user_lower for word in ["book", "booking", "reserve", "rent"]):
-            if "create" in user_lower or "new" in user_lower or "make" in user_lower:
-                # Show available cars first
-                result = await execute_function("get_cars", {})
-                cars = result.get("cars", [])
-                available_cars = [car for car in cars if car['available']]
-                if available_cars:
-                    car_list = "\n".join([f"• Car {i+1}: {car['company']} {car['model']} ({car['year']})" for i, car in enumerate(available_cars)])
-                    response_text = f"📅 **Let's create a booking!**\n\n**Available Cars:**\n{car_list}\n\n📝 **Please tell me:**\n• Which car? (e.g., 'Car 1')\n• Customer ID? (e.g., 101)\n• Start date? (YYYY-MM-DD)\n• End date? (YYYY-MM-DD)\n• Total price? (e.g., 500)\n\n*Example: 'Book Car 1 for customer 101 from 2024-12-20 to 2024-12-25 for $500'*"
-                else:
-                    response_text = "Sorry, no cars are currently available for booking."
-            else:
-                # Try to parse booking details from natural language
-                import re
-                
-                # Extract numbers and dates
-                numbers = re.findall(r'\d+', user_text)
-                dates = re.findall(r'\d{4}-\d{2}-\d{2}', user_text)
-                
-                if len(numbers) >= 3 and len(dates) >= 2:
-                    try:
-                        customer_id = int(numbers[0])
-                        car_id = int(numbers[1]) 
-                        total_price = float(numbers[2]) if len(numbers) > 2 else 500.0
-                        start_date = dates[0]
-                        end_date = dates[1]
-                        
-                        result = await execute_function("create_booking", {
-                            "customer_id": customer_id,
-                            "car_id": car_id,
-                            "start_date": start_date,
-                            "end_date": end_date,
-                            "total_price": total_price
-                        })
-                        response_text = f"✅ **Booking Created Successfully!**\n\n{result['result']}"
-                    except Exception as e:
-                        response_text = f"I couldn't process the booking details. Please provide: customer ID, car ID, start date, end date, and price."
-                else:
-                    response_text = "I need more details to create a booking. Please provide customer ID, car ID, start date (YYYY-MM-DD), end date (YYYY-MM-DD), and total price."
-        
-        elif any(word in user_lower for word in ["customer", "top", "most rental", "best customer"]):
-            result = await execute_function("get_customer_with_most_rentals", {})
-            response_text = f"🏆 **Top Customer Analytics:**\n\n{result['result']}"
-        
-        elif any(word in user_lower for word in ["popular", "most rented", "best model", "top model"]):
-            result = await execute_function("get_most_rented_model", {})
-            response_text = f"🚗 **Most Popular Car Model:**\n\n{result['result']}"
-        
-        elif any(word in user_lower for word in ["hello", "hi", "hey", "help"]):
-            response_text = "👋 **Hello! I'm your intelligent car management assistant!**\n\n🤖 **I can help you with:**\n• 'Show me all cars' - View available vehicles\n• 'Create a booking' - Make a reservation\n• 'Who is our top customer?' - Customer analytics\n• 'What's the most popular car?' - Vehicle analytics\n\n*Just ask me naturally - I understand conversational language!*"
-        
-        else:
-            response_text = f"🤖 **I understand you said:** '{user_text}'\n\nI can help you with:\n• Viewing cars: 'show me all cars'\n• Creating bookings: 'I want to make a booking'\n• Analytics: 'who is our top customer?' or 'what's the most popular car?'\n\n*Ask me anything about car management!*"
-        
-        ai_response = {
-            "role": "model",
-            "parts": [{"text": response_text}]
-        }
-        
-        # Add AI response to session
-        sessions_store[session_id]["events"].append({
-            "content": ai_response
-        })
-        
-        return {"content": ai_response}
+        # Intelligent Agent with Natural Language Processing
+        return await chat_response(request, chat_events(user_text), save_reply)
         
     except Exception as e:
         import traceback
         error_details = traceback.format_exc()
         error_response = {"role": "model", "parts": [{"text": f"Sorry, I encountered an error: {str(e)}\n\nDetails: {error_details}"}]}
-        return {"content": error_response}
\ No newline at end of file
+        return {"content": error_response}
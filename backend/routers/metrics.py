@@ -0,0 +1,41 @@
+from fastapi import APIRouter
+from repos.repo import Repo
+from services.sessions import session_store
+from services.llm import llm_client
+from services.response_cache import response_cache
+from constants import DB_NAME
+
+router = APIRouter()
+repo = Repo(DB_NAME)
+
+@router.get("/pool")
+async def get_pool_metrics():
+    """Connection pool size, checkout counts and wait times"""
+    return repo.pool.stats()
+
+@router.get("/cache")
+async def get_cache_metrics():
+    """Hit, miss and eviction counters for the car lookup caches"""
+    return repo.cache.stats()
+
+@router.get("/sessions")
+async def get_session_metrics():
+    """Session counts, retained bytes and eviction counters"""
+    return session_store.stats()
+
+@router.get("/llm")
+async def get_llm_metrics():
+    """LLM call counts, queue depth, timeouts and latency"""
+    return llm_client.stats()
+
+@router.get("/llm_cache")
+async def get_llm_cache_metrics():
+    """Exact and similarity hit rates of the LLM reply cache"""
+    return response_cache.stats()
+
+@router.get("/audit")
+async def get_audit_metrics():
+    """Queued audit writer counters (async AUDIT_MODE only)"""
+    if repo.audit is None:
+        return {"mode": "sync"}
+    return {"mode": "async", **repo.audit.stats()}
@@ -0,0 +1,37 @@
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query
+from services.sessions import session_store
+
+router = APIRouter()
+
+@router.get("/apps/{app_name}/users/{user_id}/sessions")
+async def get_sessions(app_name: str, user_id: str):
+    """List a user's sessions as summaries, without their events"""
+    return await session_store.list_for_user(user_id)
+
+@router.post("/apps/{app_name}/users/{user_id}/sessions")
+async def create_session(app_name: str, user_id: str):
+    """Create a new chat session"""
+    session = await session_store.create(user_id, app_name)
+    return {"id": session["id"]}
+
+@router.get("/apps/{app_name}/users/{user_id}/sessions/{session_id}")
+async def get_session(
+    app_name: str,
+    user_id: str,
+    session_id: str,
+    start: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1)
+):
+    """Get a specific session, optionally a page of its events starting at event index `start`"""
+    session = await session_store.get(user_id, session_id, start, limit)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return session
+
+@router.delete("/apps/{app_name}/users/{user_id}/sessions/{session_id}")
+async def delete_session(app_name: str, user_id: str, session_id: str):
+    """Delete a session"""
+    if not await session_store.delete(user_id, session_id):
+        raise HTTPException(status_code=404, detail="Session not found")
+    return {"message": "Session deleted"}
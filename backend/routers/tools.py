@@ -0,0 +1,23 @@
+from fastapi import APIRouter, Body, HTTPException
+from pydantic import ValidationError
+from typing import Any, Dict, Optional
+from agent.registry import tool_registry
+
+router = APIRouter()
+
+@router.get("/")
+async def list_tools():
+    """Every agent tool with its JSON schema, as declared to the model"""
+    return tool_registry.function_declarations()
+
+@router.post("/{name}")
+async def call_tool(name: str, arguments: Optional[Dict[str, Any]] = Body(None)):
+    """Run an agent tool with a JSON object of arguments; a tool that writes commits all its steps together"""
+    tool = tool_registry.get(name)
+    if tool is None:
+        raise HTTPException(status_code=404, detail=f"Unknown tool: {name}")
+    try:
+        arguments = tool.validate(arguments)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False, include_context=False))
+    return await tool.run(**arguments)
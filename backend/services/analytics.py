@@ -0,0 +1,261 @@
+"""
+Time-windowed booking analytics: fleet utilization, revenue per model and booking length.
+
+Bookings are copied once into NumPy columns (car, start/end day ordinals, price, model)
+sorted by start day, and every question is a handful of vectorized passes over the
+slice of them that falls in its window. The snapshot is keyed
+by the bookings and cars table versions: new bookings are appended on the next read,
+anything else (a delete, a renamed model) rebuilds it.
+"""
+import asyncio
+from datetime import date
+from typing import Dict, Optional
+import numpy as np
+from repos.repo import Repo
+from constants import DEFAULT_PAGE_SIZE, TABLE_NAME
+
+PERIODS = ("day", "week", "month")
+# date(1970, 1, 1).toordinal(); shifts day ordinals onto NumPy's datetime64 epoch
+UNIX_EPOCH_ORDINAL = 719163
+
+
+class BookingSnapshot:
+    """Columnar copy of the bookings table, sorted by start day, plus each car's model.
+
+    Sorting by start turns a date window into a slice: bookings starting in it are one
+    searchsorted range, and bookings overlapping it start at most `max_days` earlier.
+    """
+
+    def __init__(self, versions: tuple, bookings: list, cars: list):
+        self.versions = versions
+        self.last_id = 0
+        self.max_days = 0
+        self.car_id = np.empty(0, dtype=np.int64)
+        self.start = np.empty(0, dtype=np.int64)
+        self.end = np.empty(0, dtype=np.int64)
+        self.price = np.empty(0, dtype=np.float64)
+        # Months since year 0, for monthly buckets without per-query date conversion
+        self.month = np.empty(0, dtype=np.int64)
+        self.set_cars(cars)
+        self.append(bookings)
+
+    def set_cars(self, cars: list):
+        self.car_ids = np.array([row[0] for row in cars], dtype=np.int64)
+        self.car_models = [row[1] for row in cars]
+        self.model_names = sorted({model for model in self.car_models if model is not None})
+        codes = {model: i for i, model in enumerate(self.model_names)}
+        # car id -> position in car_ids / model code; -1 for deleted cars and cars without a model
+        size = int(self.car_ids.max(initial=0)) + 1
+        self._position_of = np.full(size, -1, dtype=np.int64)
+        self._position_of[self.car_ids] = np.arange(len(self.car_ids))
+        self._model_of = np.full(size, -1, dtype=np.int64)
+        self._model_of[self.car_ids] = [codes.get(model, -1) for model in self.car_models]
+        self.car_position = self._lookup(self._position_of, self.car_id)
+        self.model = self._lookup(self._model_of, self.car_id)
+
+    @staticmethod
+    def _lookup(table: np.ndarray, car_id: np.ndarray) -> np.ndarray:
+        known = car_id < len(table)
+        return np.where(known, table[np.where(known, car_id, 0)], -1)
+
+    def append(self, bookings: list):
+        """Merge new (booking_id, car_id, start_ord, end_ord, total_price) rows in start order."""
+        if not bookings:
+            return
+        rows = np.array(bookings, dtype=np.float64)
+        rows = rows[np.argsort(rows[:, 2], kind="stable")]
+        car_id = rows[:, 1].astype(np.int64)
+        start = rows[:, 2].astype(np.int64)
+        end = rows[:, 3].astype(np.int64)
+        months = (start - UNIX_EPOCH_ORDINAL).astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+        new = {
+            "car_id": car_id,
+            "start": start,
+            "end": end,
+            "price": np.nan_to_num(rows[:, 4]),
+            "month": months + 1970 * 12,
+            "car_position": self._lookup(self._position_of, car_id),
+            "model": self._lookup(self._model_of, car_id),
+        }
+        # New bookings mostly start after the existing ones, which makes this a plain append
+        at = np.searchsorted(self.start, start, side="right")
+        for name, values in new.items():
+            setattr(self, name, np.insert(getattr(self, name), at, values))
+        self.last_id = max(self.last_id, int(rows[:, 0].max()))
+        self.max_days = max(self.max_days, int((end - start).max()) + 1)
+
+    def __len__(self) -> int:
+        return len(self.start)
+
+    def _starting_in(self, start: date, end: date) -> slice:
+        return slice(
+            int(np.searchsorted(self.start, start.toordinal())),
+            int(np.searchsorted(self.start, end.toordinal(), side="right"))
+        )
+
+    def utilization(self, start: date, end: date, limit: int = DEFAULT_PAGE_SIZE) -> dict:
+        """Share of the window's days each car was booked, busiest cars first."""
+        first, last = start.toordinal(), end.toordinal()
+        days = last - first + 1
+        window = slice(
+            int(np.searchsorted(self.start, first - self.max_days + 1)),
+            int(np.searchsorted(self.start, last, side="right"))
+        )
+        # Booked days inside the window, per booking, then summed per (still existing) car
+        overlap = np.minimum(self.end[window], last) - np.maximum(self.start[window], first) + 1
+        position = self.car_position[window]
+        live = (overlap > 0) & (position >= 0)
+        booked = np.bincount(position[live], weights=overlap[live], minlength=len(self.car_ids))
+        # Overlapping bookings of one car are rejected on insert, so booked <= days
+        share = booked / days
+        order = np.lexsort((self.car_ids, -share))[:limit]
+        return {
+            "start_date": start.isoformat(),
+            "end_date": end.isoformat(),
+            "days": days,
+            "cars": len(self.car_ids),
+            "fleet_utilization": round(float(share.mean()), 4) if len(share) else 0.0,
+            "by_car": [
+                {
+                    "car_id": int(self.car_ids[i]),
+                    "model": self.car_models[i],
+                    "booked_days": int(booked[i]),
+                    "utilization": round(float(share[i]), 4),
+                }
+                for i in order
+            ],
+        }
+
+    def revenue(self, start: date, end: date, period: str = "day", model: Optional[str] = None) -> dict:
+        """Booking revenue per model and period, counted on each booking's start day."""
+        if period not in PERIODS:
+            raise ValueError(f"Unknown period '{period}'. Use one of: {', '.join(PERIODS)}")
+        window = self._starting_in(start, end)
+        models = self.model[window]
+        mask = models >= 0
+        if model is not None:
+            matches = [i for i, name in enumerate(self.model_names) if name.lower() == model.lower()]
+            mask &= np.isin(models, matches)
+        models, prices = models[mask], self.price[window][mask]
+
+        if period == "month":
+            buckets = self.month[window][mask]
+        else:
+            buckets = self.start[window][mask]
+            if period == "week":
+                # Ordinal 1 (0001-01-01) is a Monday, so weeks start on Mondays
+                buckets = buckets - (buckets - 1) % 7
+
+        rows = []
+        if len(buckets):
+            # Dense (bucket, model) cells, so grouping is two bincounts instead of a sort
+            first = int(buckets.min())
+            span = int(buckets.max()) - first + 1
+            width = len(self.model_names)
+            cells = (buckets - first) * width + models
+            revenue = np.bincount(cells, weights=prices, minlength=span * width)
+            bookings = np.bincount(cells, minlength=span * width)
+            for cell in np.flatnonzero(bookings):
+                bucket, code = divmod(int(cell), width)
+                bucket += first
+                if period == "month":
+                    period_start = date(bucket // 12, bucket % 12 + 1, 1)
+                else:
+                    period_start = date.fromordinal(bucket)
+                rows.append({
+                    "period_start": period_start.isoformat(),
+                    "model": self.model_names[code],
+                    "revenue": round(float(revenue[cell]), 2),
+                    "bookings": int(bookings[cell]),
+                })
+        return {
+            "start_date": start.isoformat(),
+            "end_date": end.isoformat(),
+            "period": period,
+            "total_revenue": round(float(prices.sum()), 2),
+            "revenue": rows,
+        }
+
+    def booking_length(self, start: date, end: date) -> dict:
+        """Average, shortest and longest rental (inclusive days) of bookings starting in the window."""
+        window = self._starting_in(start, end)
+        lengths = self.end[window] - self.start[window] + 1
+        models = self.model[window]
+        result = {
+            "start_date": start.isoformat(),
+            "end_date": end.isoformat(),
+            "bookings": int(len(lengths)),
+            "average_days": round(float(lengths.mean()), 2) if len(lengths) else 0.0,
+            "min_days": int(lengths.min()) if len(lengths) else 0,
+            "max_days": int(lengths.max()) if len(lengths) else 0,
+        }
+        known = models >= 0
+        counts = np.bincount(models[known], minlength=len(self.model_names))
+        totals = np.bincount(models[known], weights=lengths[known], minlength=len(self.model_names))
+        result["by_model"] = [
+            {"model": name, "bookings": int(counts[i]), "average_days": round(float(totals[i] / counts[i]), 2)}
+            for i, name in enumerate(self.model_names) if counts[i]
+        ]
+        return result
+
+
+class BookingAnalytics:
+    """Keeps one BookingSnapshot per database current and answers questions from it."""
+
+    def __init__(self, repo: Repo):
+        self.repo = repo
+        self.snapshot: Optional[BookingSnapshot] = None
+        self._lock = asyncio.Lock()
+        self.stats = {"appends": 0, "rebuilds": 0}
+
+    async def _rebuild(self) -> BookingSnapshot:
+        data = await self.repo.booking_columns()
+        self.snapshot = BookingSnapshot(data["versions"], data["bookings"], data["cars"])
+        self.stats["rebuilds"] += 1
+        return self.snapshot
+
+    async def current(self) -> BookingSnapshot:
+        """The snapshot, refreshed if bookings or cars have changed since it was taken."""
+        if self.repo.pool.in_unit_of_work:
+            # Uncommitted bookings may still roll back, so answer from a snapshot that isn't kept
+            data = await self.repo.booking_columns()
+            return BookingSnapshot(data["versions"], data["bookings"], data["cars"])
+        async with self._lock:
+            snapshot = self.snapshot
+            if snapshot is None:
+                return await self._rebuild()
+            versions = await self.repo.table_versions()
+            if (versions.get("bookings", 0), versions.get(TABLE_NAME, 0)) == snapshot.versions:
+                return snapshot
+
+            cars_changed = versions.get(TABLE_NAME, 0) != snapshot.versions[1]
+            data = await self.repo.booking_columns(snapshot.last_id, with_cars=cars_changed)
+            if data["count"] != len(snapshot) + len(data["bookings"]):
+                # Rows at or below last_id were deleted; ids are never reused, so start over
+                return await self._rebuild()
+            if data["cars"] is not None:
+                snapshot.set_cars(data["cars"])
+            snapshot.append(data["bookings"])
+            snapshot.versions = data["versions"]
+            self.stats["appends"] += 1
+            return snapshot
+
+    async def utilization(self, start: date, end: date, limit: int = DEFAULT_PAGE_SIZE) -> dict:
+        return (await self.current()).utilization(start, end, limit)
+
+    async def revenue(self, start: date, end: date, period: str = "day", model: Optional[str] = None) -> dict:
+        return (await self.current()).revenue(start, end, period, model)
+
+    async def booking_length(self, start: date, end: date) -> dict:
+        return (await self.current()).booking_length(start, end)
+
+
+_analytics: Dict[str, BookingAnalytics] = {}
+
+
+def get_analytics(repo: Repo) -> BookingAnalytics:
+    """The shared analytics engine for repo's database file."""
+    analytics = _analytics.get(repo.db_path)
+    if analytics is None:
+        analytics = _analytics[repo.db_path] = BookingAnalytics(repo)
+    return analytics
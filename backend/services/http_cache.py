@@ -0,0 +1,119 @@
+"""
+Conditional requests and compression for the car endpoints.
+
+A listing's ETag is a hash of the table_versions counters it depends on plus the request
+path and query, so answering If-None-Match costs one primary-key lookup: no listing
+query, no encoding and no body. Bodies of COMPRESS_MIN_SIZE bytes or more are compressed
+with brotli (when the optional package is installed) or gzip, whichever the client
+prefers. Each encoding gets its own strong tag ("<hash>-gzip"), and any of them
+revalidates the listing.
+
+A single car's ETag is its row_version, which If-Match on PUT/PATCH checks against.
+"""
+import gzip
+import hashlib
+from typing import Any, Optional
+from fastapi import HTTPException, Request, Response
+from services.serialization import dumps
+from constants import COMPRESS_MIN_SIZE, GZIP_LEVEL, BROTLI_QUALITY
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+# Revalidate on every use; a 304 makes that nearly free
+CACHE_HEADERS = {"Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+
+
+def listing_etag(request: Request, versions: tuple) -> str:
+    """Opaque tag for this listing as of `versions`, without the quotes."""
+    # Sorted, so ?company=x&sort=-year and ?sort=-year&company=x share a tag
+    query = sorted(request.query_params.multi_items())
+    key = repr((request.url.path, tuple(versions), query)).encode("utf-8")
+    return hashlib.blake2b(key, digest_size=12).hexdigest()
+
+
+def not_modified(request: Request, etag: str) -> Optional[Response]:
+    """A 304 if the request's If-None-Match holds any variant of `etag`, else None."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return None
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        # If-None-Match uses weak comparison, so a W/ prefix is ignored
+        opaque = candidate[2:] if candidate.startswith("W/") else candidate
+        if candidate == "*" or opaque.strip('"').split("-", 1)[0] == etag:
+            tag = f'"{etag}"' if candidate == "*" else opaque
+            return Response(status_code=304, headers={"ETag": tag, **CACHE_HEADERS})
+    return None
+
+
+def if_match_version(if_match: Optional[str]) -> Optional[int]:
+    """The row_version an If-Match header requires, or None for no header / "*".
+
+    Single cars are tagged with their row_version ("3"). If-Match uses strong comparison,
+    so a weak or foreign tag can never match and is refused with 412 right away.
+    """
+    if if_match is None or if_match.strip() == "*":
+        return None
+    tag = if_match.strip()
+    if len(tag) > 2 and tag[0] == tag[-1] == '"' and tag[1:-1].isdigit():
+        return int(tag[1:-1])
+    raise HTTPException(status_code=412, detail=f"If-Match {if_match} does not match any car version")
+
+
+def version_etag(row_version: int) -> str:
+    return f'"{row_version}"'
+
+
+def _accepted(accept_encoding: str) -> dict:
+    """{coding: q} from an Accept-Encoding header."""
+    codings = {}
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if coding:
+            codings[coding] = q
+    return codings
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """"br", "gzip" or None (identity) for this Accept-Encoding header."""
+    codings = _accepted(accept_encoding)
+    wildcard = codings.get("*", 0.0)
+    options = []
+    if brotli is not None:
+        # Listed first so it wins ties: smaller bodies at similar cost
+        options.append(("br", codings.get("br", wildcard)))
+    options.append(("gzip", codings.get("gzip", wildcard)))
+    coding, q = max(options, key=lambda option: option[1])
+    return coding if q > 0 else None
+
+
+def compress(body: bytes, coding: str) -> bytes:
+    if coding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def json_response(request: Request, content: Any, etag: str, headers: Optional[dict] = None) -> Response:
+    """JSON body tagged with `etag`, compressed when large enough and the client accepts it."""
+    body = dumps(content)
+    headers = {**CACHE_HEADERS, **(headers or {})}
+    coding = None
+    if COMPRESS_MIN_SIZE and len(body) >= COMPRESS_MIN_SIZE:
+        coding = choose_encoding(request.headers.get("accept-encoding", ""))
+    if coding:
+        body = compress(body, coding)
+        headers["Content-Encoding"] = coding
+        headers["ETag"] = f'"{etag}-{coding}"'
+    else:
+        headers["ETag"] = f'"{etag}"'
+    return Response(body, media_type="application/json", headers=headers)
@@ -0,0 +1,69 @@
+import csv
+import json
+from typing import AsyncIterator, Tuple, Union
+
+CSV_TYPES = ("text/csv", "application/csv")
+
+
+def _decode(line: bytes) -> Union[str, ValueError]:
+    try:
+        return line.decode("utf-8").rstrip("\r")
+    except UnicodeDecodeError as e:
+        return ValueError(f"invalid UTF-8 at byte {e.start}")
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[Union[str, ValueError]]:
+    """Split a byte stream into text lines without buffering the whole body.
+
+    A line that is not valid UTF-8 is yielded as a ValueError instead of stopping the stream.
+    """
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield _decode(line)
+    if buffer:
+        yield _decode(buffer)
+
+
+async def iter_records(
+    chunks: AsyncIterator[bytes],
+    content_type: str = ""
+) -> AsyncIterator[Tuple[int, Union[dict, Exception]]]:
+    """Yield (line_number, record) pairs from an NDJSON or CSV stream.
+
+    CSV is chosen by content type and must start with a header row. A line that
+    cannot be parsed is yielded as an exception so the caller can report it
+    against its line number and keep going.
+    """
+    is_csv = content_type.split(";")[0].strip().lower() in CSV_TYPES
+    header = None
+    line_number = 0
+    async for line in iter_lines(chunks):
+        line_number += 1
+        if isinstance(line, ValueError):
+            yield line_number, line
+            continue
+        if not line.strip():
+            continue
+        if is_csv:
+            values = next(csv.reader([line]))
+            if header is None:
+                header = [name.strip() for name in values]
+                continue
+            if len(values) != len(header):
+                yield line_number, ValueError(f"expected {len(header)} columns, got {len(values)}")
+                continue
+            # Empty cells count as missing so model defaults apply
+            yield line_number, {k: v for k, v in zip(header, values) if v != ""}
+        else:
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield line_number, ValueError(f"invalid JSON: {e}")
+                continue
+            if not isinstance(record, dict):
+                yield line_number, ValueError("expected a JSON object")
+                continue
+            yield line_number, record
@@ -0,0 +1,198 @@
+"""
+Keyword intent routing for the rule-based chat endpoint.
+
+Intents are declared once in INTENTS and compiled at import time into a token
+trie, so classifying a message is a single pass over its tokens rather than one
+substring scan per keyword. `plan` splits a message that joins several requests
+("show cars and our top customer") into one intent per clause.
+"""
+import re
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from models.data_models import parse_date
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Each intent lists groups of alternative phrases; every group must match somewhere
+# in the message. The winner is the intent whose matched phrases cover the most
+# tokens (so "most rented" beats "rent"), with `priority` breaking ties.
+# In a compound message at most one intent per `group` is answered, and `standalone`
+# intents only when nothing else was asked.
+INTENTS: List[dict] = [
+    {
+        "name": "list_cars",
+        "priority": 30,
+        "all_of": [
+            ["show", "list", "see", "view", "display"],
+            ["car", "cars", "vehicle", "vehicles", "fleet"],
+        ],
+    },
+    {
+        "name": "start_booking",
+        "priority": 25,
+        "group": "booking",
+        "all_of": [
+            ["create", "new", "make", "start"],
+            ["book", "booking", "reserve", "reservation", "rent", "rental"],
+        ],
+    },
+    {
+        "name": "book_car",
+        "priority": 20,
+        "group": "booking",
+        "all_of": [["book", "booking", "reserve", "rent"]],
+    },
+    {
+        "name": "most_rented_model",
+        "priority": 15,
+        "all_of": [[
+            "popular", "most popular", "most rented", "most booked", "best model", "top model",
+            "popular car", "popular cars", "popular model", "most popular car", "most popular cars",
+            "most rented car", "most rented cars",
+        ]],
+    },
+    {
+        "name": "top_customer",
+        "priority": 10,
+        "all_of": [[
+            "customer", "top", "top customer", "best customer", "most rental", "most rentals",
+            "most bookings", "top renter",
+        ]],
+    },
+    {
+        "name": "greeting",
+        "priority": 0,
+        "standalone": True,
+        "all_of": [["hello", "hi", "hey", "help"]],
+    },
+]
+
+UNKNOWN = "unknown"
+
+
+class IntentMatch(NamedTuple):
+    name: str
+    score: int
+    priority: int
+
+
+class IntentRouter:
+    """Token trie built from an intent registry; `classify` walks each message once."""
+
+    def __init__(self, intents: List[dict]):
+        self.intents = intents
+        self._by_name = {intent["name"]: intent for intent in intents}
+        self._group_counts = [len(intent["all_of"]) for intent in intents]
+        # node: (children by token, [((intent index, group index), phrase length)])
+        self._root: Tuple[Dict[str, tuple], list] = ({}, [])
+        for intent_index, intent in enumerate(intents):
+            for group_index, phrases in enumerate(intent["all_of"]):
+                for phrase in phrases:
+                    node = self._root
+                    tokens = TOKEN_RE.findall(phrase.lower())
+                    for token in tokens:
+                        node = node[0].setdefault(token, ({}, []))
+                    node[1].append(((intent_index, group_index), len(tokens)))
+
+    def classify(self, text: str) -> IntentMatch:
+        tokens = TOKEN_RE.findall(text.lower())
+        count = len(tokens)
+        root = self._root[0]
+        # Longest phrase matched per (intent, group)
+        matched: Dict[Tuple[int, int], int] = {}
+        for start, token in enumerate(tokens):
+            node = root.get(token)
+            position = start + 1
+            while node is not None:
+                for key, length in node[1]:
+                    if matched.get(key, 0) < length:
+                        matched[key] = length
+                if position == count or not node[0]:
+                    break
+                node = node[0].get(tokens[position])
+                position += 1
+
+        scores: Dict[int, int] = {}
+        groups: Dict[int, int] = {}
+        for (intent_index, _), length in matched.items():
+            scores[intent_index] = scores.get(intent_index, 0) + length
+            groups[intent_index] = groups.get(intent_index, 0) + 1
+        best: Optional[IntentMatch] = None
+        for intent_index, score in scores.items():
+            if groups[intent_index] != self._group_counts[intent_index]:
+                continue
+            priority = self.intents[intent_index]["priority"]
+            if best is None or (score, priority) > (best.score, best.priority):
+                best = IntentMatch(self.intents[intent_index]["name"], score, priority)
+        return best or IntentMatch(UNKNOWN, 0, 0)
+
+    def plan(self, text: str) -> List[str]:
+        """Intents to answer in one turn, in the order they were asked.
+
+        Each clause of the message (entity mentions such as "customer 101" removed, so
+        they don't read as requests) is classified on its own. Unless that finds two or
+        more requests, the plan is the single best intent for the whole message.
+        """
+        requests = text
+        for pattern in ENTITY_PATTERNS:
+            requests = pattern.sub(" ", requests)
+        names: List[str] = []
+        groups = set()
+        for clause in CLAUSE_RE.split(requests):
+            name = self.classify(clause).name
+            if name == UNKNOWN:
+                continue
+            intent = self._by_name[name]
+            group = intent.get("group", name)
+            if intent.get("standalone") or group in groups:
+                continue
+            groups.add(group)
+            names.append(name)
+        return names if len(names) > 1 else [self.classify(text).name]
+
+
+_MONTHS = r"(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*"
+DATE_RE = re.compile(
+    r"\b(\d{4}[-/]\d{1,2}[-/]\d{1,2}"
+    r"|\d{1,2}[-/]\d{1,2}[-/]\d{4}"
+    rf"|\d{{1,2}} {_MONTHS},? \d{{4}}"
+    rf"|{_MONTHS} \d{{1,2}},? \d{{4}})\b",
+    re.IGNORECASE
+)
+CAR_RE = re.compile(r"\bcar\s*(?:#|no\.?|number|id)?\s*(\d+)\b", re.IGNORECASE)
+CUSTOMER_RE = re.compile(r"\bcustomer\s*(?:#|no\.?|number|id)?\s*(\d+)\b", re.IGNORECASE)
+PRICE_RE = re.compile(r"(?:[$₹]\s*|\brs\.?\s*|\bprice\s*(?:of|is)?\s*)(\d+(?:\.\d+)?)", re.IGNORECASE)
+ENTITY_PATTERNS = (DATE_RE, CAR_RE, CUSTOMER_RE, PRICE_RE)
+# Where one request ends and the next begins
+CLAUSE_RE = re.compile(r"[,;.?!]|\b(?:and|also|plus|then|as well as)\b", re.IGNORECASE)
+
+
+def extract_entities(text: str) -> dict:
+    """Dates (ISO strings, in order), car ID, customer ID and price mentioned in a message."""
+    dates = []
+    for match in DATE_RE.finditer(text):
+        try:
+            dates.append(parse_date(match.group(1)).isoformat())
+        except ValueError:
+            continue
+    car = CAR_RE.search(text)
+    customer = CUSTOMER_RE.search(text)
+    price = PRICE_RE.search(text)
+    return {
+        "dates": dates,
+        "car_id": int(car.group(1)) if car else None,
+        "customer_id": int(customer.group(1)) if customer else None,
+        "total_price": float(price.group(1)) if price else None,
+    }
+
+
+intent_router = IntentRouter(INTENTS)
+
+
+def classify(text: str) -> str:
+    """Name of the best matching intent, or UNKNOWN."""
+    return intent_router.classify(text).name
+
+
+def plan(text: str) -> List[str]:
+    """Names of the intents a message asks for, in order; one unless it joins several requests."""
+    return intent_router.plan(text)
@@ -0,0 +1,230 @@
+"""
+Process-wide LLM client for the chat routers.
+
+The Gemini SDK's generate_content is a blocking network call, so it runs on a
+bounded thread pool and never on the event loop. The client is configured once,
+limits how many calls are in flight, queues the rest and times each call out.
+"""
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Iterator, Optional
+from dotenv import load_dotenv
+from constants import LLM_BACKEND, LLM_MODEL, LLM_MAX_CONCURRENCY, LLM_TIMEOUT, LLM_STREAM_BUFFER, FAKE_LLM_LATENCY
+
+load_dotenv()
+
+
+class GeminiModel:
+    """google.generativeai model, configured once per process."""
+
+    def __init__(self, model_name: str = LLM_MODEL):
+        import google.generativeai as genai
+        genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+        self.name = model_name
+        self._model = genai.GenerativeModel(model_name)
+
+    def generate(self, prompt: str, timeout: Optional[float] = None) -> str:
+        request_options = {"timeout": timeout} if timeout else None
+        return self._model.generate_content(prompt, request_options=request_options).text
+
+    def stream(self, prompt: str, timeout: Optional[float] = None) -> Iterator[str]:
+        request_options = {"timeout": timeout} if timeout else None
+        for chunk in self._model.generate_content(prompt, stream=True, request_options=request_options):
+            if chunk.text:
+                yield chunk.text
+
+
+FAKE_REPLY = (
+    "I can help you browse the fleet, check which cars are free on your dates, create a booking "
+    "or look up rental analytics such as our top customer and the most rented model. "
+    "Try asking me to show all cars or to book a car for a customer."
+)
+
+
+class FakeModel:
+    """Local stand-in that blocks for `latency` seconds, like a real SDK call would.
+
+    Streaming spreads the same latency evenly over the reply's words.
+    """
+
+    def __init__(self, latency: float = FAKE_LLM_LATENCY, reply: str = FAKE_REPLY):
+        self.name = "fake"
+        self.latency = latency
+        self.reply = reply
+        self.calls = 0
+
+    def generate(self, prompt: str, timeout: Optional[float] = None) -> str:
+        self.calls += 1
+        time.sleep(self.latency)
+        return self.reply
+
+    def stream(self, prompt: str, timeout: Optional[float] = None) -> Iterator[str]:
+        self.calls += 1
+        words = self.reply.split(" ")
+        for i, word in enumerate(words):
+            time.sleep(self.latency / len(words))
+            yield word if i == 0 else " " + word
+
+
+class LLMClient:
+    """Runs a blocking model on a bounded thread pool with a concurrency limit and per-call timeouts."""
+
+    def __init__(self, model, max_concurrency: int = LLM_MAX_CONCURRENCY, timeout: float = LLM_TIMEOUT):
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._stats = {
+            "calls": 0,
+            "streams": 0,
+            "completed": 0,
+            "failed": 0,
+            "timeouts": 0,
+            "queued": 0,
+            "in_flight": 0,
+            "queue_wait_total": 0.0,
+            "queue_wait_max": 0.0,
+            "latency_total": 0.0,
+            "latency_max": 0.0,
+        }
+
+    def _release(self, semaphore: asyncio.Semaphore):
+        self._stats["in_flight"] -= 1
+        semaphore.release()
+
+    async def _acquire(self) -> tuple:
+        """Wait for a free slot; returns (semaphore, seconds waited)."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="llm")
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        semaphore = self._semaphore
+        self._stats["calls"] += 1
+        started = time.perf_counter()
+        self._stats["queued"] += 1
+        try:
+            await semaphore.acquire()
+        finally:
+            self._stats["queued"] -= 1
+        waited = time.perf_counter() - started
+        self._stats["queue_wait_total"] += waited
+        self._stats["queue_wait_max"] = max(self._stats["queue_wait_max"], waited)
+        self._stats["in_flight"] += 1
+        return semaphore, waited
+
+    def _completed(self, latency: float):
+        self._stats["completed"] += 1
+        self._stats["latency_total"] += latency
+        self._stats["latency_max"] = max(self._stats["latency_max"], latency)
+
+    async def generate(self, prompt: str, timeout: Optional[float] = None) -> str:
+        """Model reply text; raises TimeoutError if it takes longer than `timeout` seconds."""
+        timeout = self.timeout if timeout is None else timeout
+        semaphore, _ = await self._acquire()
+        started = time.perf_counter()
+        future = asyncio.get_running_loop().run_in_executor(self._executor, self.model.generate, prompt, timeout)
+        # A timed-out call keeps its thread until the SDK gives up, so the slot is freed
+        # when the thread finishes rather than when we stop waiting for it
+        future.add_done_callback(lambda _: self._release(semaphore))
+        try:
+            text = await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            self._stats["timeouts"] += 1
+            raise TimeoutError(f"LLM call timed out after {timeout}s")
+        except Exception:
+            self._stats["failed"] += 1
+            raise
+        self._completed(time.perf_counter() - started)
+        return text
+
+    async def stream(self, prompt: str, timeout: Optional[float] = None) -> AsyncIterator[str]:
+        """Reply text chunks as the model produces them; the whole stream shares one `timeout`.
+
+        The model thread may run at most LLM_STREAM_BUFFER chunks ahead of the consumer, and
+        stops at its next chunk once the consumer goes away (e.g. the client disconnected).
+        """
+        timeout = self.timeout if timeout is None else timeout
+        semaphore, _ = await self._acquire()
+        started = time.perf_counter()
+        self._stats["streams"] += 1
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        slots = threading.Semaphore(LLM_STREAM_BUFFER)
+        stopped = threading.Event()
+        end = object()
+
+        def put(item):
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+            except RuntimeError:
+                # The event loop has already shut down
+                stopped.set()
+
+        def produce():
+            try:
+                for chunk in self.model.stream(prompt, timeout):
+                    while not slots.acquire(timeout=0.1):
+                        if stopped.is_set():
+                            return
+                    if stopped.is_set():
+                        return
+                    put(chunk)
+                put(end)
+            except Exception as e:
+                put(e)
+
+        future = loop.run_in_executor(self._executor, produce)
+        future.add_done_callback(lambda _: self._release(semaphore))
+        deadline = loop.time() + timeout
+        try:
+            while True:
+                try:
+                    item = await asyncio.wait_for(queue.get(), max(0.0, deadline - loop.time()))
+                except asyncio.TimeoutError:
+                    self._stats["timeouts"] += 1
+                    raise TimeoutError(f"LLM call timed out after {timeout}s")
+                if item is end:
+                    break
+                if isinstance(item, Exception):
+                    self._stats["failed"] += 1
+                    raise item
+                slots.release()
+                yield item
+            self._completed(time.perf_counter() - started)
+        finally:
+            stopped.set()
+
+    def close(self):
+        """Stop the worker threads; the pool is recreated on the next call."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            self._semaphore = None
+
+    def stats(self) -> dict:
+        """Call counts, current queue depth and queue/latency timings (seconds)."""
+        stats = dict(self._stats)
+        completed = stats["completed"]
+        stats.update({
+            "model": self.model.name,
+            "max_concurrency": self.max_concurrency,
+            "timeout": self.timeout,
+            "queue_wait_avg": stats["queue_wait_total"] / stats["calls"] if stats["calls"] else 0.0,
+            "latency_avg": stats["latency_total"] / completed if completed else 0.0,
+        })
+        return stats
+
+
+def create_llm_client(backend: str = LLM_BACKEND) -> LLMClient:
+    """Build the client for the model named by LLM_BACKEND ("gemini" or "fake")."""
+    if backend == "gemini":
+        return LLMClient(GeminiModel())
+    if backend == "fake":
+        return LLMClient(FakeModel())
+    raise ValueError(f"Unknown LLM backend: {backend}")
+
+
+llm_client = create_llm_client()
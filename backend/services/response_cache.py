@@ -0,0 +1,133 @@
+"""
+Cache of LLM replies for the chat routers.
+
+Exact tier: replies keyed by the normalized prompt plus a data fingerprint (e.g. the
+cars table version), so a prompt that embeds the car list is only reused while the
+list is unchanged. Similarity tier (optional): within one prompt template ("scope")
+and fingerprint, a new user message close enough to a cached one reuses its reply.
+Messages are embedded locally as hashed character trigrams, no model call involved.
+"""
+import math
+import re
+import zlib
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional
+from repos.cache import LRUCache, MISSING
+from constants import LLM_CACHE_SIZE, LLM_CACHE_TTL, LLM_CACHE_SIMILARITY, LLM_CACHE_SIMILAR_CANDIDATES
+
+PUNCTUATION_RE = re.compile(r"[^\w\s]+")
+EMBEDDING_BUCKETS = 1024
+# Scopes are few (one per prompt template), but each data version starts a fresh set
+MAX_SCOPES = 64
+
+
+def normalize(text: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace."""
+    return " ".join(PUNCTUATION_RE.sub(" ", text.lower()).split())
+
+
+def embed(text: str) -> Dict[int, float]:
+    """Sparse unit vector of hashed character trigrams."""
+    padded = f"  {normalize(text)}  "
+    counts: Dict[int, float] = {}
+    for i in range(len(padded) - 2):
+        bucket = zlib.crc32(padded[i:i + 3].encode("utf-8")) % EMBEDDING_BUCKETS
+        counts[bucket] = counts.get(bucket, 0.0) + 1.0
+    norm = math.sqrt(sum(value * value for value in counts.values())) or 1.0
+    return {bucket: value / norm for bucket, value in counts.items()}
+
+
+def cosine(a: Dict[int, float], b: Dict[int, float]) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(value * b.get(bucket, 0.0) for bucket, value in a.items())
+
+
+class ResponseCache:
+    """Exact plus optional similarity cache of model replies, with TTL/LRU eviction."""
+
+    def __init__(
+        self,
+        max_size: int = LLM_CACHE_SIZE,
+        ttl: float = LLM_CACHE_TTL,
+        similarity: float = LLM_CACHE_SIMILARITY,
+        max_candidates: int = LLM_CACHE_SIMILAR_CANDIDATES
+    ):
+        self.replies = LRUCache(max_size, ttl)
+        self.similarity = similarity
+        self.max_candidates = max_candidates
+        # (fingerprint, scope) -> {exact key: embedding of the user's message}
+        self._candidates: "OrderedDict[tuple, OrderedDict[Hashable, Dict[int, float]]]" = OrderedDict()
+        self.lookups = 0
+        self.exact_hits = 0
+        self.similar_hits = 0
+
+    @staticmethod
+    def key(prompt: str, fingerprint: Hashable) -> tuple:
+        return (fingerprint, normalize(prompt))
+
+    def get(self, prompt: str, fingerprint: Hashable, scope: Optional[str] = None, query: Optional[str] = None) -> Optional[str]:
+        """Cached reply for this prompt, or for a similar `query` in the same scope; None on a miss."""
+        self.lookups += 1
+        reply = self.replies.get(self.key(prompt, fingerprint))
+        if reply is not MISSING:
+            self.exact_hits += 1
+            return reply
+        if not self.similarity or scope is None or query is None:
+            return None
+        candidates = self._candidates.get((fingerprint, scope))
+        if not candidates:
+            return None
+        vector = embed(query)
+        best_key, best_score = None, self.similarity
+        for key, candidate in candidates.items():
+            score = cosine(vector, candidate)
+            if score >= best_score:
+                best_key, best_score = key, score
+        if best_key is None:
+            return None
+        reply = self.replies.get(best_key)
+        if reply is MISSING:
+            # Expired or evicted from the exact tier since
+            del candidates[best_key]
+            return None
+        self.similar_hits += 1
+        # Repeats of this exact prompt can now skip the similarity scan
+        self.replies.set(self.key(prompt, fingerprint), reply)
+        return reply
+
+    def set(self, prompt: str, fingerprint: Hashable, reply: str, scope: Optional[str] = None, query: Optional[str] = None):
+        key = self.key(prompt, fingerprint)
+        self.replies.set(key, reply)
+        if not self.similarity or scope is None or query is None:
+            return
+        scope_key = (fingerprint, scope)
+        candidates = self._candidates.get(scope_key)
+        if candidates is None:
+            candidates = self._candidates[scope_key] = OrderedDict()
+            while len(self._candidates) > MAX_SCOPES:
+                self._candidates.popitem(last=False)
+        self._candidates.move_to_end(scope_key)
+        candidates[key] = embed(query)
+        candidates.move_to_end(key)
+        while len(candidates) > self.max_candidates:
+            candidates.popitem(last=False)
+
+    def clear(self):
+        self.replies.clear()
+        self._candidates.clear()
+
+    def stats(self) -> dict:
+        hits = self.exact_hits + self.similar_hits
+        return {
+            "lookups": self.lookups,
+            "exact_hits": self.exact_hits,
+            "similar_hits": self.similar_hits,
+            "hit_rate": hits / self.lookups if self.lookups else 0.0,
+            "similarity_threshold": self.similarity,
+            "scopes": len(self._candidates),
+            "replies": self.replies.stats(),
+        }
+
+
+response_cache = ResponseCache()
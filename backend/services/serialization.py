@@ -0,0 +1,94 @@
+"""
+JSON encoding for large responses.
+
+Rows read from SQLite were validated on the way in, so list endpoints skip FastAPI's
+response_model validation and hand their Car objects, or plain row dicts, straight to
+the encoder. orjson is used when installed (JSON_BACKEND=orjson, the default)
+and the standard library otherwise; the output is the same either way.
+"""
+import json
+from typing import Any, AsyncIterator, Iterable, Sequence
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel
+from constants import JSON_BACKEND
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+NDJSON_TYPE = "application/x-ndjson"
+
+
+def _default(value: Any):
+    if isinstance(value, BaseModel):
+        # Models here hold only JSON-native field values, so their __dict__ is the payload
+        return value.__dict__
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    # Same leniency the SSE events always had (default=str)
+    return str(value)
+
+
+if orjson is not None and JSON_BACKEND == "orjson":
+    def dumps(value: Any) -> bytes:
+        return orjson.dumps(value, default=_default)
+
+    def loads(data):
+        return orjson.loads(data)
+else:
+    def dumps(value: Any) -> bytes:
+        return json.dumps(value, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    def loads(data):
+        return json.loads(data)
+
+
+def to_jsonable(value: Any) -> Any:
+    """Plain dicts/lists for `value`; a C-speed round trip instead of jsonable_encoder's recursion."""
+    return loads(dumps(value))
+
+
+class FastJSONResponse(Response):
+    """JSON response encoded with `dumps`, skipping FastAPI's validation and jsonable_encoder pass."""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def row_dicts(fields: Sequence[str], rows: Iterable[tuple]) -> list:
+    return [dict(zip(fields, row)) for row in rows]
+
+
+def wants_ndjson(accept: str) -> bool:
+    return NDJSON_TYPE in accept
+
+
+async def _json_array(batches: AsyncIterator[list]) -> AsyncIterator[bytes]:
+    yield b"["
+    first = True
+    async for batch in batches:
+        if not batch:
+            continue
+        # One encoder call per batch; the outer brackets are stripped so batches concatenate
+        body = dumps(batch)[1:-1]
+        yield body if first else b"," + body
+        first = False
+    yield b"]"
+
+
+async def _ndjson(batches: AsyncIterator[list]) -> AsyncIterator[bytes]:
+    async for batch in batches:
+        if batch:
+            yield b"\n".join(dumps(item) for item in batch) + b"\n"
+
+
+def stream_json(batches: AsyncIterator[list], ndjson: bool = False, headers: dict = None) -> StreamingResponse:
+    """Stream batches of items as one JSON array, or as NDJSON (one item per line)."""
+    if ndjson:
+        return StreamingResponse(_ndjson(batches), media_type=NDJSON_TYPE, headers=headers)
+    return StreamingResponse(_json_array(batches), media_type="application/json", headers=headers)
@@ -1,45 +1,21 @@
-from typing import List
+import asyncio
+from typing import AsyncIterator, List, Optional, Tuple
 from fastapi import HTTPException
-from models.data_models import Car, Booking
-from repos.repo import Repo
-from models.update_history import UpdateHistory
-from datetime import datetime
-
-class Repo:
-    def __init__(self, session):
-        self.session = session
-
-    async def init_db(self):
-        # Optional: initialize or verify DB connection
-        pass
-
-    # Other methods: get, insert, update, delete, list...
-
-    async def add_update_log(self, car_id: str, updated_by: str, changes: dict) -> bool:
-        try:
-            for field, (old_value, new_value) in changes.items():
-                log_entry = UpdateHistory(
-                    car_id=car_id,
-                    field=field,
-                    old_value=str(old_value),
-                    new_value=str(new_value),
-                    updated_by=updated_by,
-                    timestamp=datetime.utcnow()
-                )
-                self.session.add(log_entry)
-            await self.session.commit()
-            return True
-        except Exception as e:
-            await self.session.rollback()
-            print(f"Error logging update history: {e}")
-            return False
+from pydantic import TypeAdapter, ValidationError
+from models.data_models import Car, Booking, CarFilter
+from constants import (
+    TABLE_NAME, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, BULK_CHUNK_SIZE, MAX_IMPORT_ERRORS,
+    CHANGE_POLL_INTERVAL, CHANGE_HEARTBEAT
+)
+from repos.repo import Repo, CAR_FIELDS, VersionConflict
+from services.analytics import get_analytics
+from datetime import date, datetime, time, timezone
 
 class Service:
     def __init__(self, repo: Repo):
         self.repo = repo
 
     async def create_car(self, car: Car):
-        await self.repo.init_db()
         if isinstance(car, dict):
             car = Car(**car)
         existing = await self.repo.get(car.id)
@@ -49,53 +25,112 @@ class Service:
         return car
 
     async def get_all_cars(self) -> List[Car]:
-        await self.repo.init_db()
         return await self.repo.list()
 
-    async def update_car(self, car_id: str, car: Car) -> Car:
-        await self.repo.init_db()
+    async def listing_versions(self, with_bookings: bool = False) -> tuple:
+        """Generation counters a car listing depends on; free-car listings also read bookings."""
+        versions = await self.repo.table_versions()
+        if with_bookings:
+            return (versions.get(TABLE_NAME, 0), versions.get("bookings", 0))
+        return (versions.get(TABLE_NAME, 0),)
+
+    async def list_cars(
+        self,
+        filters: Optional[CarFilter] = None,
+        sort: str = "id",
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+        free_between: Optional[Tuple[date, date]] = None
+    ) -> Tuple[List[Car], Optional[str]]:
+        """One page of cars plus the cursor for the next page (None on the last page)."""
+        if free_between and free_between[1] < free_between[0]:
+            raise HTTPException(status_code=400, detail="end must not be before start")
+        try:
+            # Fetch one extra row to learn whether another page exists
+            cars = await self.repo.list(filters, sort, limit + 1, cursor, free_between)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if len(cars) <= limit:
+            return cars, None
+        cars = cars[:limit]
+        return cars, self.repo.encode_cursor(cars[-1], sort)
+
+    async def list_free_cars(
+        self,
+        start: date,
+        end: date,
+        filters: Optional[CarFilter] = None,
+        sort: str = "id",
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[Car], Optional[str]]:
+        """Cars in service with no booking between start and end (inclusive)."""
+        filters = filters.model_copy() if filters else CarFilter()
+        if filters.available is None:
+            filters.available = True
+        return await self.list_cars(filters, sort, limit, cursor, free_between=(start, end))
+
+    def export_cars(self, filters: Optional[CarFilter] = None, sort: str = "id") -> AsyncIterator[List[dict]]:
+        """Every matching car, in batches of plain dicts ready for the JSON encoder."""
+        try:
+            batches = self.repo.iter_car_rows(filters, sort)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        async def dicts():
+            async for rows in batches:
+                # SQLite hands back available as 0/1
+                yield [{**dict(zip(CAR_FIELDS, row)), "available": bool(row[6])} for row in rows]
+
+        return dicts()
+
+    async def get_car(self, car_id: int) -> Tuple[Car, int]:
+        """A car and its row_version (for If-Match / expected_version)."""
+        found = await self.repo.get_versioned(car_id)
+        if found is None:
+            raise HTTPException(status_code=404, detail="Car not found")
+        return found
+
+    async def update_car(self, car_id: str, car: Car, expected_version: Optional[int] = None) -> Car:
         if isinstance(car, dict):
             car = Car(**car)
-        
-        # Get the old car data before updating
-        old_car = await self.repo.get(car_id)
-        if not old_car:
+        try:
+            car.id = int(car_id)
+        except ValueError:
             raise HTTPException(status_code=404, detail="Car not found to update")
-        
-        car.id = car_id  
-        updated = await self.repo.update(car)
-        if not updated:
+
+        # Read, diff, update and audit in one transaction
+        try:
+            changes = await self.repo.update(car, updated_by="system", expected_version=expected_version)
+        except VersionConflict as e:
+            raise HTTPException(status_code=412, detail=str(e))
+        if changes is None:
             raise HTTPException(status_code=404, detail="Car not found to update")
-        
-        # Log the changes automatically
-        changes = {}
-        if old_car.company != car.company:
-            changes['company'] = (old_car.company, car.company)
-        if old_car.model != car.model:
-            changes['model'] = (old_car.model, car.model)
-        if old_car.kms != car.kms:
-            changes['kms'] = (old_car.kms, car.kms)
-        if old_car.year != car.year:
-            changes['year'] = (old_car.year, car.year)
-        if old_car.color != car.color:
-            changes['color'] = (old_car.color, car.color)
-        if old_car.available != car.available:
-            changes['available'] = (old_car.available, car.available)
-        
-        if changes:
-            await self.repo.add_update_log(car_id, "system", changes)
-        
         return car
 
+    async def patch_car(self, car_id: str, fields: dict, expected_version: Optional[int] = None) -> dict:
+        """Change only `fields`; returns the updated car, its new row_version and {field: (old, new)}."""
+        try:
+            car_id = int(car_id)
+        except ValueError:
+            raise HTTPException(status_code=404, detail="Car not found to update")
+        try:
+            result = await self.repo.patch(car_id, fields, updated_by="system", expected_version=expected_version)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except VersionConflict as e:
+            raise HTTPException(status_code=412, detail=str(e))
+        if result is None:
+            raise HTTPException(status_code=404, detail="Car not found to update")
+        return result
+
     async def delete_car(self, car_id: str):
-        await self.repo.init_db()
         deleted_count = await self.repo.delete(car_id)
         if deleted_count == 0:
             raise HTTPException(status_code=404, detail="Car not found to delete")
         return {"message": f"Car with id {car_id} deleted successfully"}
 
     async def log_update_history(self, car_id: str, updated_by: str, changes: dict):
-        await self.repo.init_db()
         success = await self.repo.add_update_log(
             car_id=car_id,
             updated_by=updated_by,
@@ -107,24 +142,179 @@ class Service:
 
     async def get_last_updated_car(self):
         """Get the car record that was last updated with update details"""
-        await self.repo.init_db()
         return await self.repo.get_last_updated_car()
 
+    async def get_car_history(self, car_id: int, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+        """One page of a car's change history, newest first, plus the cursor for the next page."""
+        try:
+            return await self.repo.car_history(car_id, limit, cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    async def get_changes(self, since: int = 0, limit: int = MAX_PAGE_SIZE, wait: float = 0) -> dict:
+        """Car changes after `since`; with `wait`, holds the request up to that many seconds for one.
+
+        410 if entries the client needs (a delete) have been compacted away since `since`;
+        it should start again from 0 with an empty copy.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + wait
+        while True:
+            feed = await self.repo.changes_since(since, limit)
+            if 0 < since < feed["horizon"]:
+                raise HTTPException(
+                    status_code=410,
+                    detail=f"Changes up to {feed['horizon']} have been compacted; resync from since=0"
+                )
+            remaining = deadline - loop.time()
+            if feed["changes"] or remaining <= 0:
+                return feed
+            # Writes in this process wake us at once; other workers' are seen on the next poll
+            await self.repo.changes.wait(min(remaining, CHANGE_POLL_INTERVAL))
+
+    async def follow_changes(self, feed: dict, heartbeat: float = CHANGE_HEARTBEAT) -> AsyncIterator[dict]:
+        """`feed` (a get_changes result), then every later page as it happens; an empty one after `heartbeat` quiet seconds."""
+        while True:
+            yield feed
+            feed = await self.get_changes(feed["next"], wait=heartbeat)
+
+    async def get_car_as_of(self, car_id: int, at: str) -> dict:
+        """A car's fields as they were at `at` (ISO date or timestamp; a bare date means the end of that day)."""
+        try:
+            moment = datetime.fromisoformat(at.strip())
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Unrecognised time '{at}', expected ISO YYYY-MM-DD[THH:MM:SS]")
+        if "T" not in at and " " not in at.strip():
+            moment = datetime.combine(moment.date(), time.max)
+        # Audit timestamps are naive UTC
+        if moment.tzinfo is not None:
+            moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+        result = await self.repo.car_as_of(car_id, moment.isoformat(timespec="microseconds"))
+        if result is None:
+            raise HTTPException(status_code=404, detail="Car not found")
+        return result
+
     async def create_booking(self, booking: Booking):
-        await self.repo.init_db()
         if isinstance(booking, dict):
             booking = Booking(**booking)
-        await self.repo.insert_booking(booking)
+        booking_id = await self.repo.insert_booking(booking)
+        if booking_id is None:
+            raise HTTPException(
+                status_code=409,
+                detail=f"Car {booking.car_id} is already booked between {booking.start_date} and {booking.end_date}"
+            )
+        booking.booking_id = booking_id
         return booking
 
-    async def get_customer_with_most_rentals(self):
-        await self.repo.init_db()
-        return await self.repo.get_customer_with_most_rentals()
+    async def import_cars(self, records: AsyncIterator) -> dict:
+        """Validate and insert (line_number, record) pairs in chunked transactions."""
+        async def insert(cars):
+            await self.repo.insert_many(cars)
+            return []
+        return await self._import(records, Car, insert, "")
+
+    async def import_bookings(self, records: AsyncIterator) -> dict:
+        """Like import_cars, but rows overlapping an existing booking are reported as errors."""
+        return await self._import(
+            records, Booking, self.repo.insert_bookings_many, "car is already booked for an overlapping period"
+        )
+
+    async def _import(self, records: AsyncIterator, model, insert, rejected_reason: str) -> dict:
+        adapter = TypeAdapter(List[model])
+        summary = {"inserted": 0, "failed": 0, "errors": []}
+
+        def fail(line, error):
+            summary["failed"] += 1
+            if len(summary["errors"]) < MAX_IMPORT_ERRORS:
+                summary["errors"].append({"line": line, "error": error})
+
+        def describe(e: ValidationError) -> str:
+            return "; ".join(
+                f"{'.'.join(str(p) for p in err['loc']) or 'row'}: {err['msg']}" for err in e.errors()
+            )
+
+        def validate(lines, raw):
+            try:
+                # Fast path: validate the whole chunk in one call
+                return lines, adapter.validate_python(raw)
+            except ValidationError:
+                rows, kept = [], []
+                for line, record in zip(lines, raw):
+                    try:
+                        rows.append(model.model_validate(record))
+                        kept.append(line)
+                    except ValidationError as e:
+                        fail(line, describe(e))
+                return kept, rows
+
+        async def store(lines, rows):
+            rejected = await insert(rows)
+            for position in rejected:
+                fail(lines[position], rejected_reason)
+            summary["inserted"] += len(rows) - len(rejected)
 
-    async def get_most_rented_model(self):
-        await self.repo.init_db()
-        return await self.repo.get_most_rented_model()
+        # Keep one chunk in flight so parsing the next chunk overlaps the database write
+        pending = None
+
+        async def flush(lines, raw):
+            nonlocal pending
+            lines, rows = validate(lines, raw) if raw else ([], [])
+            if pending:
+                await pending
+            pending = asyncio.create_task(store(lines, rows)) if rows else None
+
+        lines, raw = [], []
+        try:
+            async for line, record in records:
+                if isinstance(record, Exception):
+                    fail(line, str(record))
+                    continue
+                lines.append(line)
+                raw.append(record)
+                if len(raw) >= BULK_CHUNK_SIZE:
+                    await flush(lines, raw)
+                    lines, raw = [], []
+            await flush(lines, raw)
+        finally:
+            if pending:
+                await pending
+        summary["errors"].sort(key=lambda err: err["line"])
+        return summary
+
+    async def delete_booking(self, booking_id: int):
+        deleted_count = await self.repo.delete_booking(booking_id)
+        if deleted_count == 0:
+            raise HTTPException(status_code=404, detail="Booking not found to delete")
+        return {"message": f"Booking with id {booking_id} deleted successfully"}
+
+    async def get_customer_with_most_rentals(self, top: int = 1):
+        return await self.repo.get_customer_with_most_rentals(top)
+
+    async def get_most_rented_model(self, top: int = 1):
+        return await self.repo.get_most_rented_model(top)
     
+    @staticmethod
+    def _check_window(start: date, end: date):
+        if end < start:
+            raise HTTPException(status_code=400, detail="end must not be before start")
+
+    async def get_utilization(self, start: date, end: date, limit: int = DEFAULT_PAGE_SIZE) -> dict:
+        """Booked share of start..end (inclusive) per car, busiest first, and for the whole fleet."""
+        self._check_window(start, end)
+        return await get_analytics(self.repo).utilization(start, end, limit)
+
+    async def get_revenue(self, start: date, end: date, period: str = "day", model: Optional[str] = None) -> dict:
+        """Revenue per model per day, week or month for bookings starting in start..end."""
+        self._check_window(start, end)
+        try:
+            return await get_analytics(self.repo).revenue(start, end, period, model)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    async def get_booking_length(self, start: date, end: date) -> dict:
+        """Average booking length, overall and per model, for bookings starting in start..end."""
+        self._check_window(start, end)
+        return await get_analytics(self.repo).booking_length(start, end)
+
     async def get_all_bookings(self) -> List[Booking]:
-        await self.repo.init_db()
         return await self.repo.list_bookings()
@@ -0,0 +1,398 @@
+import json
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional
+from repos.pool import get_pool
+from repos.schema import SESSION_MIGRATIONS, migrate
+from constants import (
+    MAX_SESSIONS, MAX_EVENTS_PER_SESSION, SESSION_IDLE_TTL, MAX_SESSION_BYTES,
+    SESSION_BACKEND, SESSION_DB, SESSION_PRUNE_INTERVAL
+)
+
+
+def _event_size(event: dict) -> int:
+    """Approximate retained size of an event: its JSON encoding in bytes."""
+    return len(json.dumps(event, ensure_ascii=False, default=str).encode("utf-8"))
+
+
+class Session:
+    """One chat session; keeps at most `max_events` of its most recent events."""
+
+    __slots__ = ("id", "user_id", "app_name", "created_at", "last_active", "events", "sizes", "bytes", "total_events")
+
+    def __init__(self, session_id: str, user_id: str, app_name: str, max_events: int):
+        self.id = session_id
+        self.user_id = user_id
+        self.app_name = app_name
+        self.created_at = time.time()
+        self.last_active = time.monotonic()
+        self.events = deque(maxlen=max_events)
+        self.sizes = deque(maxlen=max_events)
+        self.bytes = 0
+        self.total_events = 0
+
+    def append(self, event: dict) -> int:
+        """Add an event and return the change in retained bytes."""
+        size = _event_size(event)
+        dropped = self.sizes[0] if len(self.sizes) == self.sizes.maxlen else 0
+        self.events.append(event)
+        self.sizes.append(size)
+        self.total_events += 1
+        self.bytes += size - dropped
+        return size - dropped
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "user_id": self.user_id,
+            "app_name": self.app_name,
+            "created_at": self.created_at,
+            "event_count": self.total_events,
+            "retained_events": len(self.events),
+        }
+
+    def to_dict(self, start: int = 0, limit: Optional[int] = None) -> dict:
+        # Events are numbered from the session's first; older ones may have been dropped
+        first = self.total_events - len(self.events)
+        start = max(start, first)
+        end = self.total_events if limit is None else min(self.total_events, start + limit)
+        events = [self.events[i - first] for i in range(start, end)]
+        return {**self.summary(), "first_event": first, "next_event": start + len(events), "events": events}
+
+
+class SessionStore(ABC):
+    """Async interface shared by the chat routers' session backends."""
+
+    async def open(self):
+        """Acquire any resources the backend needs; safe to call repeatedly."""
+
+    async def close(self):
+        """Release the backend's resources."""
+
+    @abstractmethod
+    async def create(self, user_id: str, app_name: str = "", session_id: Optional[str] = None) -> dict:
+        """Start a session, with a generated id unless `session_id` is given."""
+
+    @abstractmethod
+    async def get(self, user_id: str, session_id: str, start: int = 0, limit: Optional[int] = None) -> Optional[dict]:
+        """The session with its retained events from index `start` (at most `limit` of them),
+        or None if it doesn't exist for this user."""
+
+    @abstractmethod
+    async def append(self, session_id: str, event: dict, user_id: str = "user", app_name: str = "") -> None:
+        """Append an event, creating the session on first use."""
+
+    @abstractmethod
+    async def list_for_user(self, user_id: str) -> List[dict]:
+        """Lightweight summaries (no events) of the user's sessions, most recent first."""
+
+    @abstractmethod
+    async def delete(self, user_id: str, session_id: str) -> bool:
+        """Remove the user's session; False if there was none."""
+
+    @abstractmethod
+    def stats(self) -> dict:
+        """Backend counters for /metrics."""
+
+
+class InMemorySessionStore(SessionStore):
+    """Process-local store with a per-user index, LRU and idle-TTL eviction and a byte budget."""
+
+    def __init__(
+        self,
+        max_sessions: int = MAX_SESSIONS,
+        max_events: int = MAX_EVENTS_PER_SESSION,
+        idle_ttl: float = SESSION_IDLE_TTL,
+        max_bytes: int = MAX_SESSION_BYTES
+    ):
+        self.max_sessions = max_sessions
+        self.max_events = max_events
+        self.idle_ttl = idle_ttl
+        self.max_bytes = max_bytes
+        # Ordered from least to most recently active
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self._by_user: Dict[str, "OrderedDict[str, None]"] = {}
+        self.bytes = 0
+        self.evicted_idle = 0
+        self.evicted_lru = 0
+
+    def _touch(self, session: Session):
+        session.last_active = time.monotonic()
+        self._sessions.move_to_end(session.id)
+        self._by_user[session.user_id].move_to_end(session.id)
+
+    def _remove(self, session_id: str) -> Optional[Session]:
+        session = self._sessions.pop(session_id, None)
+        if session is None:
+            return None
+        user_sessions = self._by_user.get(session.user_id)
+        if user_sessions is not None:
+            user_sessions.pop(session_id, None)
+            if not user_sessions:
+                del self._by_user[session.user_id]
+        self.bytes -= session.bytes
+        return session
+
+    def _evict(self):
+        # The oldest sessions sit at the front, so expiry stops at the first live one
+        cutoff = time.monotonic() - self.idle_ttl
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if oldest.last_active >= cutoff:
+                break
+            self._remove(oldest.id)
+            self.evicted_idle += 1
+        while self._sessions and (len(self._sessions) > self.max_sessions or self.bytes > self.max_bytes):
+            self._remove(next(iter(self._sessions)))
+            self.evicted_lru += 1
+
+    def _lookup(self, user_id: Optional[str], session_id: str) -> Optional[Session]:
+        session = self._sessions.get(session_id)
+        if session is None or (user_id is not None and session.user_id != user_id):
+            return None
+        if session.last_active < time.monotonic() - self.idle_ttl:
+            self._remove(session_id)
+            self.evicted_idle += 1
+            return None
+        return session
+
+    def _create(self, user_id: str, app_name: str, session_id: Optional[str]) -> Session:
+        session = Session(session_id or str(uuid.uuid4())[:8], user_id, app_name, self.max_events)
+        self._sessions[session.id] = session
+        self._by_user.setdefault(user_id, OrderedDict())[session.id] = None
+        self._evict()
+        return session
+
+    async def create(self, user_id: str, app_name: str = "", session_id: Optional[str] = None) -> dict:
+        return self._create(user_id, app_name, session_id).summary()
+
+    async def get(self, user_id: str, session_id: str, start: int = 0, limit: Optional[int] = None) -> Optional[dict]:
+        session = self._lookup(user_id, session_id)
+        if session is None:
+            return None
+        self._touch(session)
+        return session.to_dict(start, limit)
+
+    async def append(self, session_id: str, event: dict, user_id: str = "user", app_name: str = "") -> None:
+        session = self._lookup(None, session_id) or self._create(user_id, app_name, session_id)
+        self.bytes += session.append(event)
+        self._touch(session)
+        self._evict()
+
+    async def list_for_user(self, user_id: str) -> List[dict]:
+        self._evict()
+        ids = self._by_user.get(user_id, {})
+        return [self._sessions[session_id].summary() for session_id in reversed(ids)]
+
+    async def delete(self, user_id: str, session_id: str) -> bool:
+        if self._lookup(user_id, session_id) is None:
+            return False
+        self._remove(session_id)
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "backend": "memory",
+            "sessions": len(self._sessions),
+            "users": len(self._by_user),
+            "bytes": self.bytes,
+            "max_sessions": self.max_sessions,
+            "max_events_per_session": self.max_events,
+            "max_bytes": self.max_bytes,
+            "idle_ttl": self.idle_ttl,
+            "evicted_idle": self.evicted_idle,
+            "evicted_lru": self.evicted_lru,
+        }
+
+
+class SqliteSessionStore(SessionStore):
+    """Sessions in a WAL-mode SQLite file, shared by every worker on the host and kept across restarts.
+
+    Each event is one appended row keyed by (session_id, seq); the session row only
+    carries counters, so an append never rewrites earlier history.
+    """
+
+    def __init__(
+        self,
+        db_path: str = SESSION_DB,
+        max_events: int = MAX_EVENTS_PER_SESSION,
+        idle_ttl: float = SESSION_IDLE_TTL,
+        prune_interval: float = SESSION_PRUNE_INTERVAL
+    ):
+        self.pool = get_pool(db_path)
+        self.max_events = max_events
+        self.idle_ttl = idle_ttl
+        self.prune_interval = prune_interval
+        self.pruned_at = 0.0
+        self.evicted_idle = 0
+        self._migrated = False
+
+    async def open(self):
+        await self.pool.open()
+        if self._migrated:
+            return
+        async with self.pool.writer() as db:
+            # WAL is a property of the file, so every connection and worker picks it up
+            await db.execute("PRAGMA journal_mode=WAL")
+            await migrate(db, SESSION_MIGRATIONS)
+        self._migrated = True
+
+    async def close(self):
+        await self.pool.close()
+
+    def _cutoff(self) -> float:
+        return time.time() - self.idle_ttl
+
+    async def _prune(self, db):
+        """Drop idle sessions, at most once per `prune_interval` per process."""
+        now = time.monotonic()
+        if now - self.pruned_at < self.prune_interval:
+            return
+        self.pruned_at = now
+        cutoff = self._cutoff()
+        await db.execute(
+            "DELETE FROM session_events WHERE session_id IN (SELECT id FROM sessions WHERE last_active < ?)",
+            (cutoff,)
+        )
+        cursor = await db.execute("DELETE FROM sessions WHERE last_active < ?", (cutoff,))
+        self.evicted_idle += cursor.rowcount
+        await cursor.close()
+
+    @staticmethod
+    def _summary(row, max_events: int) -> dict:
+        session_id, user_id, app_name, created_at, event_count = row
+        return {
+            "id": session_id,
+            "user_id": user_id,
+            "app_name": app_name,
+            "created_at": created_at,
+            "event_count": event_count,
+            "retained_events": min(event_count, max_events),
+        }
+
+    async def create(self, user_id: str, app_name: str = "", session_id: Optional[str] = None) -> dict:
+        await self.open()
+        session_id = session_id or str(uuid.uuid4())[:8]
+        now = time.time()
+        async with self.pool.writer() as db:
+            await self._prune(db)
+            await db.execute(
+                """
+                INSERT INTO sessions (id, user_id, app_name, created_at, last_active, event_count)
+                VALUES (?, ?, ?, ?, ?, 0)
+                ON CONFLICT(id) DO NOTHING
+                """,
+                (session_id, user_id, app_name, now, now)
+            )
+            await db.commit()
+        return self._summary((session_id, user_id, app_name, now, 0), self.max_events)
+
+    async def get(self, user_id: str, session_id: str, start: int = 0, limit: Optional[int] = None) -> Optional[dict]:
+        await self.open()
+        async with self.pool.reader() as db:
+            async with db.execute(
+                """
+                SELECT id, user_id, app_name, created_at, event_count FROM sessions
+                WHERE id = ? AND user_id = ? AND last_active >= ?
+                """,
+                (session_id, user_id, self._cutoff())
+            ) as cursor:
+                row = await cursor.fetchone()
+            if row is None:
+                return None
+            event_count = row[4]
+            first = max(0, event_count - self.max_events)
+            start = max(start, first)
+            async with db.execute(
+                "SELECT event FROM session_events WHERE session_id = ? AND seq >= ? ORDER BY seq LIMIT ?",
+                (session_id, start, -1 if limit is None else limit)
+            ) as cursor:
+                events = [json.loads(event) for (event,) in await cursor.fetchall()]
+        return {
+            **self._summary(row, self.max_events),
+            "first_event": first,
+            "next_event": start + len(events),
+            "events": events,
+        }
+
+    async def append(self, session_id: str, event: dict, user_id: str = "user", app_name: str = "") -> None:
+        await self.open()
+        now = time.time()
+        payload = json.dumps(event, ensure_ascii=False, default=str)
+        async with self.pool.writer() as db:
+            await self._prune(db)
+            async with db.execute(
+                """
+                INSERT INTO sessions (id, user_id, app_name, created_at, last_active, event_count)
+                VALUES (?, ?, ?, ?, ?, 1)
+                ON CONFLICT(id) DO UPDATE SET last_active = excluded.last_active, event_count = event_count + 1
+                RETURNING event_count
+                """,
+                (session_id, user_id, app_name, now, now)
+            ) as cursor:
+                (event_count,) = await cursor.fetchone()
+            seq = event_count - 1
+            await db.execute(
+                "INSERT INTO session_events (session_id, seq, event) VALUES (?, ?, ?)",
+                (session_id, seq, payload)
+            )
+            if seq >= self.max_events:
+                # Only the single event that just fell out of the window; a range scan on the primary key
+                await db.execute(
+                    "DELETE FROM session_events WHERE session_id = ? AND seq <= ?",
+                    (session_id, seq - self.max_events)
+                )
+            await db.commit()
+
+    async def list_for_user(self, user_id: str) -> List[dict]:
+        await self.open()
+        async with self.pool.reader() as db:
+            async with db.execute(
+                """
+                SELECT id, user_id, app_name, created_at, event_count FROM sessions
+                WHERE user_id = ? AND last_active >= ?
+                ORDER BY last_active DESC
+                """,
+                (user_id, self._cutoff())
+            ) as cursor:
+                rows = await cursor.fetchall()
+        return [self._summary(row, self.max_events) for row in rows]
+
+    async def delete(self, user_id: str, session_id: str) -> bool:
+        await self.open()
+        async with self.pool.writer() as db:
+            cursor = await db.execute(
+                "DELETE FROM sessions WHERE id = ? AND user_id = ? AND last_active >= ?",
+                (session_id, user_id, self._cutoff())
+            )
+            deleted = cursor.rowcount > 0
+            await cursor.close()
+            if deleted:
+                await db.execute("DELETE FROM session_events WHERE session_id = ?", (session_id,))
+            await db.commit()
+        return deleted
+
+    def stats(self) -> dict:
+        return {
+            "backend": "sqlite",
+            "db_path": self.pool.db_path,
+            "max_events_per_session": self.max_events,
+            "idle_ttl": self.idle_ttl,
+            "prune_interval": self.prune_interval,
+            "evicted_idle": self.evicted_idle,
+            "pool": self.pool.stats(),
+        }
+
+
+def create_session_store(backend: str = SESSION_BACKEND) -> SessionStore:
+    """Build the session backend named by SESSION_BACKEND."""
+    if backend == "memory":
+        return InMemorySessionStore()
+    if backend == "sqlite":
+        return SqliteSessionStore()
+    raise ValueError(f"Unknown session backend: {backend}")
+
+
+session_store: SessionStore = create_session_store()
@@ -0,0 +1,79 @@
+"""
+Server-Sent Events for the chat routers' /run_sse.
+
+A chat turn is an async generator of ADK-style events ({"content": {...}, "partial": ...}).
+Clients that send `Accept: text/event-stream` get each event as a `data:` line as soon as
+it is produced; everyone else gets the last event as the usual single JSON body.
+"""
+from typing import AsyncIterator, Awaitable, Callable, List, Optional
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from services.serialization import dumps
+from constants import SSE_CHUNK_LINES
+
+
+def text_event(text: str, partial: bool = False) -> dict:
+    event = {"content": {"role": "model", "parts": [{"text": text}]}}
+    if partial:
+        event["partial"] = True
+    return event
+
+
+def function_call_event(name: str, args: dict) -> dict:
+    return {"content": {"role": "model", "parts": [{"functionCall": {"name": name, "args": args}}]}}
+
+
+def function_response_event(name: str, response: dict) -> dict:
+    return {"content": {"role": "model", "parts": [{"functionResponse": {"name": name, "response": response}}]}}
+
+
+async def chunked_text(header: str, lines: List[str], footer: str = "", size: int = SSE_CHUNK_LINES) -> AsyncIterator[dict]:
+    """Partial events carrying `lines` a chunk at a time, then the complete text as the final event."""
+    yield text_event(header, partial=True)
+    for start in range(0, len(lines), size):
+        yield text_event("\n" + "\n".join(lines[start:start + size]), partial=True)
+    yield text_event(header + "\n" + "\n".join(lines) + footer)
+
+
+def wants_event_stream(request: Request) -> bool:
+    return "text/event-stream" in request.headers.get("accept", "")
+
+
+def format_event(event: dict) -> bytes:
+    # JSON escapes newlines, so every event is exactly one `data:` line
+    return b"data: " + dumps(event) + b"\n\n"
+
+
+async def chat_response(
+    request: Request,
+    events: AsyncIterator[dict],
+    on_complete: Callable[[dict], Awaitable[None]]
+):
+    """Stream `events` as SSE or collapse them to the final one, then hand that to `on_complete`.
+
+    `on_complete` only runs if the turn finished; a client that disconnects mid-stream
+    closes the generator instead, which cancels whatever it was awaiting.
+    """
+    if not wants_event_stream(request):
+        final: Optional[dict] = None
+        async for event in events:
+            final = event
+        await on_complete(final)
+        return {"content": final["content"]}
+
+    async def body():
+        final: Optional[dict] = None
+        try:
+            # Starlette awaits each send, so a slow reader pauses the generator instead of buffering it
+            async for event in events:
+                final = event
+                yield format_event(event)
+        finally:
+            await events.aclose()
+        await on_complete(final)
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
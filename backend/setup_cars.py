@@ -2,12 +2,10 @@
 import asyncio
 from models.data_models import Car
 from repos.repo import Repo
-from services.service import Service
 from constants import DB_NAME
 
 async def setup_cars():
     repo = Repo(DB_NAME)
-    service = Service(repo)
     
     await repo.init_db()
     
@@ -17,14 +15,15 @@ async def setup_cars():
         Car(company="Toyota", model="Corolla", kms=25000, year=2022, color="White", available=True)
     ]
     
+    # One executemany in a single transaction instead of a commit per car
+    await repo.insert_many(cars)
     for car in cars:
-        try:
-            await service.create_car(car)
-            print(f"✅ Added: {car.company} {car.model}")
-        except:
-            print(f"Car {car.company} {car.model} already exists")
+        print(f"✅ Added: {car.company} {car.model}")
     
     print("✅ Cars setup complete!")
 
+    # Release the pooled connections so the interpreter can exit
+    await repo.close()
+
 if __name__ == "__main__":
     asyncio.run(setup_cars())
\ No newline at end of file
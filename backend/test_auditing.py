@@ -79,5 +79,8 @@ async def setup_test_data():
     else:
         print("❌ No cars found in database")
 
+    # Release the pooled connections so the interpreter can exit
+    await repo.close()
+
 if __name__ == "__main__":
     asyncio.run(setup_test_data())
\ No newline at end of file
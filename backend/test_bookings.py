@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Checks that overlapping bookings of a car are rejected (one at a time, concurrently and
+in a batch) and that free-car searches leave booked cars out.
+
+Run from the backend directory:
+    python test_bookings.py
+"""
+import asyncio
+from datetime import date
+from fastapi import HTTPException
+from benchmarks.common import temp_db_path
+from models.data_models import Booking, Car
+from repos.repo import Repo
+from services.service import Service
+
+
+def booking(car_id: int, start: str, end: str, customer_id: int = 1) -> Booking:
+    return Booking(customer_id=customer_id, car_id=car_id, start_date=start, end_date=end, total_price=100.0)
+
+
+async def overlaps_rejected(repo: Repo):
+    assert await repo.insert_booking(booking(1, "2030-05-10", "2030-05-14")) is not None
+    # Periods are inclusive: sharing the first or last day is an overlap
+    for start, end in [("2030-05-14", "2030-05-16"), ("2030-05-08", "2030-05-10"), ("2030-05-11", "2030-05-12"), ("2030-05-01", "2030-05-31")]:
+        assert await repo.insert_booking(booking(1, start, end)) is None, (start, end)
+    # The next day, another car, and other date formats of a free period are fine
+    assert await repo.insert_booking(booking(1, "2030-05-15", "2030-05-15")) is not None
+    assert await repo.insert_booking(booking(2, "2030-05-10", "2030-05-14")) is not None
+    assert await repo.insert_booking(booking(1, "20/05/2030", "May 22, 2030")) is not None
+    assert await repo.insert_booking(booking(1, "2030-05-21", "2030-05-21")) is None
+    print("✅ overlapping bookings rejected, adjacent ones accepted")
+
+
+async def concurrent_requests(repo: Repo):
+    results = await asyncio.gather(*(
+        repo.insert_booking(booking(3, "2030-07-01", "2030-07-07", customer_id=i)) for i in range(20)
+    ))
+    assert sum(result is not None for result in results) == 1, results
+    print("✅ 20 concurrent requests for the same days: exactly one booked")
+
+
+async def batch_rejected(repo: Repo):
+    rejected = await repo.insert_bookings_many([
+        booking(1, "2030-05-12", "2030-05-13"),  # overlaps a stored booking
+        booking(4, "2030-08-01", "2030-08-05"),
+        booking(4, "2030-08-05", "2030-08-06"),  # overlaps the row before it
+        booking(4, "2030-08-06", "2030-08-09"),
+    ])
+    assert rejected == [0, 2], rejected
+    print("✅ batch import rejects overlaps with stored rows and within the batch")
+
+
+async def service_conflict(service: Service):
+    try:
+        await service.create_booking(booking(2, "2030-05-13", "2030-05-20"))
+    except HTTPException as e:
+        assert e.status_code == 409, e
+    else:
+        raise AssertionError("expected 409 for an overlapping booking")
+    print("✅ Service.create_booking answers 409 on overlap")
+
+
+async def free_cars(service: Service):
+    cars, _ = await service.list_free_cars(date(2030, 5, 12), date(2030, 5, 13))
+    assert [car.id for car in cars] == [3, 4, 5], cars
+    cars, _ = await service.list_free_cars(date(2030, 5, 16), date(2030, 5, 19))
+    assert [car.id for car in cars] == [1, 2, 3, 4, 5], cars
+    cars, _ = await service.list_free_cars(date(2030, 7, 7), date(2030, 8, 1))
+    assert [car.id for car in cars] == [1, 2, 5], cars
+    print("✅ free-car search leaves out cars booked in the window")
+
+
+async def main():
+    repo = Repo(temp_db_path("bookings.db"))
+    service = Service(repo)
+    await repo.open()
+    try:
+        await repo.insert_many([
+            Car(company="Honda", model=f"Civic {i}", kms=1000, year=2020, color="Red", available=True)
+            for i in range(5)
+        ])
+        await overlaps_rejected(repo)
+        await concurrent_requests(repo)
+        await batch_rejected(repo)
+        await service_conflict(service)
+        await free_cars(service)
+    finally:
+        await repo.close()
+
+
+def test_bookings():
+    asyncio.run(main())
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Checks that cached cars and listings never outlive a write: local writes, a write from
+another process (seen through table_versions) and a rolled-back unit of work.
+
+Run from the backend directory:
+    python test_car_cache.py
+"""
+import asyncio
+import sqlite3
+from benchmarks.common import temp_db_path
+from models.data_models import Car
+from repos.repo import Repo
+from constants import TABLE_NAME
+
+
+async def local_writes(repo: Repo):
+    cars = repo.cache.cars
+    assert (await repo.get(1)).kms == 1000
+    hits = cars.hits
+    assert (await repo.get(1)).kms == 1000 and cars.hits == hits + 1, "second read should be a cache hit"
+    assert [car.kms for car in await repo.list()] == [1000, 2000]
+
+    await repo.patch(1, {"kms": 1100}, updated_by="test")
+    assert (await repo.get(1)).kms == 1100
+    assert [car.kms for car in await repo.list()] == [1100, 2000]
+    await repo.insert(Car(company="Ford", model="Focus", kms=3000, year=2021, color="Blue", available=True))
+    assert [car.kms for car in await repo.list()] == [1100, 2000, 3000]
+    await repo.delete("2")
+    assert await repo.get(2) is None
+    assert [car.id for car in await repo.list()] == [1, 3]
+    print("✅ local updates, inserts and deletes invalidate cached cars and listings")
+
+
+async def other_process(repo: Repo):
+    repo.cache.check_interval = 0.05
+    assert (await repo.get(1)).color == "Red"
+    await repo.list()
+    # Another worker writes the row and bumps the generation, as every Repo write does
+    with sqlite3.connect(repo.db_path) as conn:
+        conn.execute(f"UPDATE {TABLE_NAME} SET color = 'Green' WHERE id = 1")
+        conn.execute("UPDATE table_versions SET version = version + 1 WHERE name = ?", (TABLE_NAME,))
+    await asyncio.sleep(0.06)
+    assert (await repo.get(1)).color == "Green"
+    assert (await repo.list())[0].color == "Green"
+    print("✅ a write from another process clears the cache within the check interval")
+
+
+async def rolled_back_unit(repo: Repo):
+    try:
+        async with repo.unit_of_work():
+            await repo.patch(1, {"kms": 9999}, updated_by="test")
+            assert (await repo.get(1)).kms == 9999
+            raise RuntimeError("roll back")
+    except RuntimeError:
+        pass
+    assert (await repo.get(1)).kms == 1100
+    assert (await repo.list())[0].kms == 1100
+    print("✅ a rolled-back unit of work leaves nothing in the cache")
+
+
+async def main():
+    repo = Repo(temp_db_path("cache.db"))
+    await repo.open()
+    try:
+        await repo.insert_many([
+            Car(company="Honda", model="Civic", kms=1000, year=2020, color="Red", available=True),
+            Car(company="Toyota", model="Corolla", kms=2000, year=2019, color="White", available=True),
+        ])
+        await local_writes(repo)
+        await other_process(repo)
+        await rolled_back_unit(repo)
+    finally:
+        await repo.close()
+
+
+def test_car_cache():
+    asyncio.run(main())
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Checks Repo.car_as_of against the states a car actually went through: 300 random
+single-field updates, with audit rows written inline and queued, and with the
+snapshot-less fallback that undoes changes from the current row.
+
+Run from the backend directory:
+    python test_car_history.py
+"""
+import asyncio
+import random
+from benchmarks.common import temp_db_path
+from models.data_models import Car
+from repos.audit import AuditWriter
+from repos.repo import Repo
+from constants import HISTORY_SNAPSHOT_EVERY
+
+UPDATES = 300
+VALUES = {
+    "company": lambda rng: rng.choice(["Honda", "Toyota", "Ford"]),
+    "model": lambda rng: f"Model {rng.randrange(20)}",
+    "kms": lambda rng: rng.randrange(200000),
+    "year": lambda rng: rng.randint(2000, 2025),
+    "color": lambda rng: rng.choice(["Red", "Blue", "Black", "White"]),
+    "available": lambda rng: rng.random() < 0.5,
+}
+
+
+async def record_updates(repo: Repo, car_id: int, rng: random.Random) -> list:
+    """Apply random updates; returns (timestamp, state) after each one that changed something."""
+    states = []
+    for _ in range(UPDATES):
+        field = rng.choice(list(VALUES))
+        result = await repo.patch(car_id, {field: VALUES[field](rng)}, updated_by="test")
+        if result["changes"]:
+            states.append(result["car"].model_dump())
+    if repo.audit is not None:
+        await repo.audit.flush()
+    # Each update wrote one audit row, in order, so the n-th row's timestamp is the n-th state's
+    async with repo.pool.reader() as db:
+        async with db.execute("SELECT timestamp FROM update_history WHERE car_id = ? ORDER BY id", (car_id,)) as cursor:
+            timestamps = [row[0] for row in await cursor.fetchall()]
+    assert len(timestamps) == len(states), (len(timestamps), len(states))
+    return list(zip(timestamps, states))
+
+
+async def check_as_of(repo: Repo, car_id: int, history: list, max_replayed: int) -> int:
+    """Compare car_as_of at every recorded instant; returns the most audit rows replayed."""
+    # Updates in the same microsecond share a timestamp; as of that instant the car is in the last one's state
+    expected = dict(history)
+    replayed = 0
+    for timestamp, state in expected.items():
+        result = await repo.car_as_of(car_id, timestamp)
+        assert result["car"].model_dump() == state, (timestamp, result, state)
+        replayed = max(replayed, result["replayed_events"])
+    assert replayed <= max_replayed, replayed
+    return replayed
+
+
+async def run(label: str, queued: bool, fallback: bool):
+    repo = Repo(temp_db_path("history.db"))
+    if queued:
+        repo.audit = AuditWriter(repo.pool)
+    await repo.open()
+    try:
+        await repo.insert(Car(company="Honda", model="Civic", kms=1000, year=2020, color="Red", available=True))
+        history = await record_updates(repo, 1, random.Random(f"history:{label}"))
+        if fallback:
+            # As for cars whose history was logged before snapshots existed
+            async with repo.pool.writer() as db:
+                await db.execute("DELETE FROM car_snapshots")
+                await db.commit()
+        replayed = await check_as_of(repo, 1, history, UPDATES if fallback else HISTORY_SNAPSHOT_EVERY - 1)
+        # Before the first update the car was as inserted
+        first = await repo.car_as_of(1, "2000-01-01T00:00:00")
+        assert first["car"].kms == 1000 and first["car"].model == "Civic", first
+    finally:
+        await repo.close()
+    print(f"✅ {label}: {len(history)} states match, at most {replayed} rows replayed")
+
+
+async def main():
+    await run("inline audit", queued=False, fallback=False)
+    await run("queued audit", queued=True, fallback=False)
+    await run("no snapshots", queued=False, fallback=True)
+
+
+def test_car_as_of():
+    asyncio.run(main())
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
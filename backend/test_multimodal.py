@@ -22,12 +22,9 @@ async def setup_multimodal_data():
         Car(company="Toyota", model="Corolla", kms=25000, year=2022, color="White", available=True)
     ]
     
+    await repo.insert_many(cars)
     for car in cars:
-        try:
-            await service.create_car(car)
-            print(f"✅ Created car: {car.company} {car.model}")
-        except:
-            print(f"Car {car.company} {car.model} already exists")
+        print(f"✅ Created car: {car.company} {car.model}")
     
     # Get car IDs
     all_cars = await service.get_all_cars()
@@ -42,9 +39,12 @@ async def setup_multimodal_data():
         Booking(customer_id=101, car_id=car_ids[0], start_date="2024-02-10", end_date="2024-02-15", total_price=250.0)
     ]
     
-    for booking in bookings:
-        await service.create_booking(booking)
-        print(f"✅ Created booking: Customer {booking.customer_id} -> Car {booking.car_id}")
+    rejected = await repo.insert_bookings_many(bookings)
+    for position, booking in enumerate(bookings):
+        if position in rejected:
+            print(f"Booking for car {booking.car_id} skipped: already booked for those dates")
+        else:
+            print(f"✅ Created booking: Customer {booking.customer_id} -> Car {booking.car_id}")
     
     # Test analytics
     print("\n🔍 Multi-modal Analytics:")
@@ -61,5 +61,8 @@ async def setup_multimodal_data():
     print("- 'Which customer has rented the most cars?'")
     print("- 'Which model is rented most often?'")
 
+    # Release the pooled connections so the interpreter can exit
+    await repo.close()
+
 if __name__ == "__main__":
     asyncio.run(setup_multimodal_data())
\ No newline at end of file
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Checks that the rental counters behind the top customer / most rented model tools stay
+equal to a GROUP BY over the bookings through random bookings, batch imports, booking
+deletes, model renames, car deletes and a rolled-back unit of work.
+
+Run from the backend directory:
+    python test_rentals.py
+"""
+import asyncio
+import random
+from datetime import date, timedelta
+from benchmarks.common import temp_db_path
+from models.data_models import Booking, Car
+from repos.repo import Repo
+from constants import TABLE_NAME
+
+OPERATIONS = 600
+MODELS = ["Civic", "Corolla", "Focus", "Golf"]
+
+
+def new_booking(rng: random.Random, cars: int) -> Booking:
+    start = date(2030, 1, 1) + timedelta(days=rng.randrange(3000))
+    return Booking(
+        customer_id=rng.randint(1, 30), car_id=rng.randint(1, cars),
+        start_date=start.isoformat(), end_date=(start + timedelta(days=rng.randrange(5))).isoformat(), total_price=100.0
+    )
+
+
+async def counters(repo: Repo) -> tuple:
+    async with repo.pool.reader() as db:
+        async with db.execute("SELECT customer_id, rental_count FROM customer_rentals") as cursor:
+            customers = dict(await cursor.fetchall())
+        async with db.execute("SELECT model, rental_count FROM model_rentals") as cursor:
+            models = dict(await cursor.fetchall())
+    return customers, models
+
+
+async def group_by(repo: Repo) -> tuple:
+    """What the counters replaced: the same counts straight from bookings."""
+    async with repo.pool.reader() as db:
+        async with db.execute("SELECT customer_id, COUNT(*) FROM bookings GROUP BY customer_id") as cursor:
+            customers = dict(await cursor.fetchall())
+        async with db.execute(f"""
+            SELECT c.model, COUNT(*) FROM bookings b JOIN {TABLE_NAME} c ON c.id = b.car_id GROUP BY c.model
+        """) as cursor:
+            models = dict(await cursor.fetchall())
+    return customers, models
+
+
+async def random_writes(repo: Repo, rng: random.Random):
+    cars = 20
+    await repo.insert_many([
+        Car(company="Honda", model=rng.choice(MODELS), kms=1000, year=2020, color="Red", available=True)
+        for _ in range(cars)
+    ])
+    booking_ids = []
+    for n in range(OPERATIONS):
+        roll = rng.random()
+        if roll < 0.5:
+            booking_id = await repo.insert_booking(new_booking(rng, cars))
+            if booking_id:
+                booking_ids.append(booking_id)
+        elif roll < 0.6:
+            await repo.insert_bookings_many([new_booking(rng, cars) for _ in range(rng.randint(1, 20))])
+        elif roll < 0.8 and booking_ids:
+            await repo.delete_booking(booking_ids.pop(rng.randrange(len(booking_ids))))
+        elif roll < 0.95:
+            await repo.patch(rng.randint(1, cars), {"model": rng.choice(MODELS + ["Mustang"])}, updated_by="test")
+        else:
+            await repo.delete(str(rng.randint(1, cars)))
+        if n % 50 == 0:
+            assert await counters(repo) == await group_by(repo), f"counters drifted after {n + 1} writes"
+    assert await counters(repo) == await group_by(repo)
+    print(f"✅ counters equal GROUP BY through {OPERATIONS} random writes")
+
+
+async def rolled_back_unit(repo: Repo):
+    before = await counters(repo)
+    car_id = (await repo.list(limit=1))[0].id
+    try:
+        async with repo.unit_of_work():
+            await repo.insert_booking(Booking(
+                customer_id=99, car_id=car_id, start_date="2040-01-01", end_date="2040-01-02", total_price=1.0
+            ))
+            await repo.patch(car_id, {"model": "Rolled back"}, updated_by="test")
+            raise RuntimeError("roll back")
+    except RuntimeError:
+        pass
+    assert await counters(repo) == before
+    print("✅ a rolled-back unit of work leaves the counters untouched")
+
+
+async def rankings(repo: Repo):
+    customers, models = await group_by(repo)
+    for k in (1, 3):
+        ranking = await repo.top_customers(k)
+        kth = sorted(customers.values(), reverse=True)[k - 1]
+        # Everyone tied with the k-th place is included, highest counts first
+        assert {row["customer_id"] for row in ranking} == {c for c, count in customers.items() if count >= kth}, ranking
+        assert [row["rental_count"] for row in ranking] == sorted((row["rental_count"] for row in ranking), reverse=True)
+    top = await repo.get_most_rented_model()
+    assert top["rental_count"] == max(models.values()) and models[top["model"]] == top["rental_count"], top
+    counted = await counters(repo)
+    await repo.rebuild_rental_counts()
+    assert await counters(repo) == counted
+    print("✅ rankings include ties; a full rebuild changes nothing")
+
+
+async def main():
+    repo = Repo(temp_db_path("rentals.db"))
+    await repo.open()
+    try:
+        await random_writes(repo, random.Random(14))
+        await rolled_back_unit(repo)
+        await rankings(repo)
+    finally:
+        await repo.close()
+
+
+def test_rental_counters():
+    asyncio.run(main())
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
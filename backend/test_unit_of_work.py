@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Checks for the unit of work: analytics and change-feed reads inside one, writer() guard,
+writing tools and write requests running in a unit.
+
+Run from the backend directory:
+    python test_unit_of_work.py
+"""
+import asyncio
+import httpx
+from datetime import date
+from fastapi import FastAPI, HTTPException
+from benchmarks.common import temp_db_path
+from models.data_models import Booking, Car
+from repos.repo import Repo
+from services.service import Service
+from agent import tools
+from agent.registry import ToolRegistry
+from routers import cars
+
+repo = Repo(temp_db_path("unit.db"))
+service = Service(repo)
+
+
+def new_car(model: str) -> Car:
+    return Car(company="Honda", model=model, kms=1000, year=2020, color="Red", available=True)
+
+
+async def add_car(model: str) -> int:
+    await repo.insert(new_car(model))
+    return max(car.id for car in await repo.list() if car.model == model)
+
+
+async def booking_with_analytics_and_changes():
+    car_id = await add_car("Civic unit")
+    before = await service.get_changes()
+    async with repo.unit_of_work():
+        await service.create_booking(Booking(
+            customer_id=7, car_id=car_id, start_date="2031-03-01", end_date="2031-03-10", total_price=500.0
+        ))
+        # Both read in the unit's transaction and see the uncommitted booking and car
+        utilization = await service.get_utilization(date(2031, 3, 1), date(2031, 3, 10), limit=1000)
+        assert any(row["car_id"] == car_id and row["booked_days"] == 10 for row in utilization["by_car"]), utilization
+        changes = await service.get_changes(before["next"])
+        assert changes["changes"] == [], changes
+        await repo.patch(car_id, {"kms": 1500}, updated_by="test")
+        changes = await service.get_changes(before["next"])
+        assert [change["car"]["kms"] for change in changes["changes"]] == [1500], changes
+    # The booking survived the unit
+    assert await repo.insert_booking(Booking(
+        customer_id=8, car_id=car_id, start_date="2031-03-05", end_date="2031-03-06", total_price=50.0
+    )) is None
+    print("✅ booking, analytics and change feed in one unit")
+
+
+async def writer_refused_inside_unit():
+    async with repo.unit_of_work():
+        try:
+            async with repo.pool.writer():
+                pass
+        except RuntimeError:
+            pass
+        else:
+            raise AssertionError("writer() inside a unit of work should raise")
+    # The writer is still free afterwards
+    await repo.insert(new_car("Civic after"))
+    print("✅ writer() raises inside a unit instead of waiting for it")
+
+
+async def writing_tools_run_in_a_unit():
+    car_id = await add_car("Civic tool")
+    tool_registry = ToolRegistry.from_module(tools)
+    units = repo.pool.stats()["units"]
+    result = await tool_registry.execute("create_booking", {
+        "customer_id": 9, "car_id": car_id, "start_date": "2032-01-01", "end_date": "2032-01-02", "total_price": 80.0
+    })
+    assert "result" in result, result
+    assert repo.pool.stats()["units"] == units + 1
+    await tool_registry.execute("get_cars", {"limit": 1})
+    assert repo.pool.stats()["units"] == units + 1, "read-only tools should not open a unit"
+    assert tool_registry.get("patch_car").function.__doc__ == tools.patch_car.__doc__
+    print("✅ writing tools commit in one unit, read-only tools don't")
+
+
+async def write_requests_run_in_a_unit():
+    app = FastAPI()
+    app.include_router(cars.router, prefix="/cars")
+
+    @app.post("/fail_after_insert", dependencies=cars.in_unit)
+    async def fail_after_insert(car: Car):
+        await cars.service.create_car(car)
+        raise HTTPException(status_code=418, detail="rolled back")
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        count = len(await repo.list())
+        response = await client.post("/cars/", json=new_car("Civic rest").model_dump())
+        assert response.status_code == 201, response.text
+        response = await client.post("/fail_after_insert", json=new_car("Civic lost").model_dump())
+        assert response.status_code == 418
+        models = [car.model for car in await repo.list()]
+        assert len(models) == count + 1 and "Civic lost" not in models, models
+    print("✅ write requests commit in one unit, and roll back on error")
+
+
+async def main():
+    # Tools and handlers go through their module's repo and service; point both at the temp database
+    saved = tools.repo, tools.service, cars.repo, cars.service
+    tools.repo = cars.repo = repo
+    tools.service = cars.service = service
+    await repo.open()
+    try:
+        await booking_with_analytics_and_changes()
+        await writer_refused_inside_unit()
+        await writing_tools_run_in_a_unit()
+        await write_requests_run_in_a_unit()
+    finally:
+        await repo.close()
+        tools.repo, tools.service, cars.repo, cars.service = saved
+
+
+def test_unit_of_work():
+    asyncio.run(main())
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -254,16 +254,32 @@ async function sendMessage(text, attachedFile = null) {
     newMessage: { role: "user", parts },
     sessionId: activeSessionId,
     stateDelta: null,
-    streaming: false,
+    streaming: true,
     userId: "user",
   };
 
   try {
-    const response = await ApiService.post("/run_sse", payload);
-    if (response && response.content) {
-      appendMessage(response.content, "model");
+    // Partial text events grow one message bubble; the final event replaces it with the full reply
+    let streamingEl = null;
+    let streamedText = "";
+    await ApiService.postWithStream("/run_sse", payload, async (event) => {
+      const content = event.content;
+      if (!content || !content.parts || !content.parts.length) return;
+      const text = content.parts[0].text;
+      if (text !== undefined && event.partial) {
+        streamedText += text;
+        if (streamingEl) {
+          streamingEl.innerHTML = marked.parse(streamedText);
+        } else {
+          streamingEl = appendMessage({ parts: [{ text: streamedText }] }, "model");
+        }
+      } else if (text !== undefined && streamingEl) {
+        streamingEl.innerHTML = marked.parse(text);
+      } else {
+        appendMessage(content, "model");
+      }
       messagesEl.scrollTop = messagesEl.scrollHeight;
-    }
+    });
   } catch (err) {
     console.error("Chat error:", err);
     appendMessage({parts: [{text: "Sorry, there was an error processing your message."}]}, "model");
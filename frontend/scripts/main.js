@@ -19,7 +19,8 @@ async function loadCars() {
         <i class="fa-solid fa-spinner fa-spin"></i> Loading vehicles...
       </div>
     `;
-    const cars = await ApiService.get("/cars/");
+    // /cars/ returns one page at a time; fetch them all, in the largest pages allowed
+    const cars = await ApiService.getAll("/cars/", { limit: 1000 });
     renderCars(cars);
   } catch (error) {
     console.error("Error fetching cars:", error);
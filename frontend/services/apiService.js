@@ -27,6 +27,12 @@ export { buildURL, API_CONFIG };
 class ApiService {
   // GET request
   static async get(endpoint, params = {}) {
+    const { data } = await ApiService.getWithHeaders(endpoint, params);
+    return data;
+  }
+
+  // GET request that also returns the response headers (e.g. X-Next-Cursor)
+  static async getWithHeaders(endpoint, params = {}) {
     try {
       const queryString = new URLSearchParams(params).toString();
       const url = `${buildURL(endpoint)}${
@@ -38,13 +44,28 @@ class ApiService {
         headers: API_CONFIG.headers,
       });
 
-      return handleResponse(response);
+      return { data: await handleResponse(response), headers: response.headers };
     } catch (error) {
       console.error("GET Request Error:", error);
       throw error;
     }
   }
 
+  // GET every page of a paginated listing, following X-Next-Cursor until the last page
+  static async getAll(endpoint, params = {}) {
+    const items = [];
+    let cursor = null;
+    do {
+      const { data, headers } = await ApiService.getWithHeaders(
+        endpoint,
+        cursor ? { ...params, cursor } : params
+      );
+      items.push(...data);
+      cursor = headers.get("X-Next-Cursor");
+    } while (cursor);
+    return items;
+  }
+
   // POST request
   static async post(endpoint, data = {}) {
     try {